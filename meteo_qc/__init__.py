@@ -1,16 +1,50 @@
+from ._archive import Archive
+from ._archive import open_archive
+from ._archive import write_archive
 from ._colum_mapping import ColumnMapping
+from ._consistency import consistency_check
+from ._dask import apply_qc_dask
+from ._dask import mask_qc_dask
 from ._data import get_plugin_args
 from ._data import register
+from ._data import register_consistency
+from ._data import register_flags
 from ._data import Result
+from ._incremental import update_qc
+from ._iter import iter_qc
+from ._iter import QCIterator
 from ._main import apply_qc
 from ._main import FinalResult
+from ._plan import ColumnPlan
+from ._plan import compile_plan
+from ._plan import PlannedCheck
+from ._plan import QCPlan
+from ._plugins.generic import duplicate_timestamps
+from ._plugins.generic import missing_timestamps
+from ._plugins.generic import null_values
 from ._plugins.values import infer_freq
 from ._plugins.values import persistence_check
 from ._plugins.values import range_check
+from ._plugins.values import robust_outlier_check
+from ._plugins.values import seasonal_range_check
 from ._plugins.values import spike_dip_check
+from ._sharded import apply_qc_sharded
+from ._spatial import buddy_check
+from ._spatial import StationIndex
+from ._store import ResultStore
+from ._summary import QCSummary
+from ._summary import summarize_qc
+from ._sweep import sweep_qc
 
 __all__ = [
-    'ColumnMapping', 'get_plugin_args', 'register', 'Result', 'apply_qc',
-    'FinalResult', 'infer_freq', 'range_check', 'persistence_check',
-    'spike_dip_check',
+    'ColumnMapping', 'get_plugin_args', 'register', 'register_flags',
+    'Result', 'apply_qc', 'FinalResult', 'infer_freq', 'range_check',
+    'persistence_check', 'spike_dip_check', 'QCSummary', 'summarize_qc',
+    'apply_qc_sharded', 'compile_plan', 'QCPlan', 'ColumnPlan', 'PlannedCheck',
+    'update_qc', 'ResultStore', 'iter_qc', 'QCIterator',
+    'buddy_check', 'StationIndex', 'robust_outlier_check',
+    'Archive', 'open_archive', 'write_archive', 'sweep_qc',
+    'seasonal_range_check', 'consistency_check', 'register_consistency',
+    'apply_qc_dask', 'mask_qc_dask', 'missing_timestamps',
+    'duplicate_timestamps', 'null_values',
 ]
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._main import _validate_index
+from meteo_qc._shm import _is_shareable
+
+ARCHIVE_FORMAT = 'meteo-qc-archive'
+ARCHIVE_VERSION = 1
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.bin'
+
+
+class Archive(NamedTuple):
+    """A station archive opened by :func:`meteo_qc.open_archive`.
+
+    :param df: the data, a ``pandas.DataFrame`` whose columns are read-only
+        memory-mapped arrays.
+    :param column_mapping: the :func:`meteo_qc.ColumnMapping` stored with the
+        data or ``None``
+    """
+    df: pd.DataFrame
+    column_mapping: ColumnMapping | None
+
+
+def _memmap(path: str, dtype: str, length: int) -> npt.NDArray[Any]:
+    if length == 0:
+        # empty files can't be memory-mapped
+        return np.empty(0, dtype=dtype)
+    values = np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+    # a plain array, so pandas doesn't return memmaps from its operations
+    return values.view(np.ndarray)
+
+
+def write_archive(
+        path: str,
+        df: pd.DataFrame,
+        column_mapping: ColumnMapping | None = None,
+) -> None:
+    """
+    Write a ``pandas.DataFrame`` to a directory in a simple binary columnar
+    format that can be opened using :func:`meteo_qc.open_archive` without
+    parsing it. The directory contains the sorted timestamps as int64
+    (``index.bin``), one file of raw values per column and a small json
+    header (``meta.json``) with the dtypes, the timezone and optionally the
+    column mapping.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        meteo_qc.write_archive('station_1', df, column_mapping)
+
+    :param path: the directory to write to, it is created if it does not
+        exist. Existing files of an archive are overwritten.
+    :param df: the data with a timezone aware :func:`pd.DatetimeIndex` and
+        only numeric or boolean columns
+    :param column_mapping: a :func:`meteo_qc.ColumnMapping` to store with the
+        data
+    """
+    _validate_index(df)
+    df_sorted = df.sort_index()
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    for column, dtype in df_sorted.dtypes.items():
+        if not _is_shareable(dtype):
+            raise TypeError(
+                f'the column {column!r} must be numeric or boolean, not '
+                f'{dtype}',
+            )
+
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, META_FILE)
+    # the header is written last, so an incomplete archive can't be opened
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    df_sorted.index.asi8.tofile(os.path.join(path, INDEX_FILE))
+    columns = []
+    for i, column in enumerate(df_sorted.columns):
+        values = np.ascontiguousarray(df_sorted[column].to_numpy())
+        file_name = f'{i}.bin'
+        values.tofile(os.path.join(path, file_name))
+        columns.append(
+            {'name': column, 'dtype': values.dtype.str, 'file': file_name},
+        )
+
+    mapping = None
+    if column_mapping is not None:
+        mapping = {
+            column: list(column_mapping[column]) for column in column_mapping
+        }
+    meta = {
+        'format': ARCHIVE_FORMAT,
+        'version': ARCHIVE_VERSION,
+        'length': len(df_sorted),
+        'index': {
+            'name': df_sorted.index.name,
+            'unit': df_sorted.index.unit,
+            'tz': str(df_sorted.index.tz),
+        },
+        'columns': columns,
+        'column_mapping': mapping,
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def open_archive(path: str) -> Archive:
+    """
+    Open an archive written by :func:`meteo_qc.write_archive`. The columns
+    are memory-mapped using ``numpy.memmap`` and passed to the
+    ``pandas.DataFrame`` without copying them, so opening even large archives
+    is instant and only the parts of the files the checks access are read
+    from disk. Only the timestamps are read into memory once, since pandas
+    can't make a timezone aware index of them without copying.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        archive = meteo_qc.open_archive('station_1')
+        result = meteo_qc.apply_qc(archive.df, archive.column_mapping)
+
+    :param path: the directory of the archive
+
+    :returns: an :func:`meteo_qc.Archive` with the data and the column
+        mapping
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get('format') != ARCHIVE_FORMAT:
+        raise ValueError(f'{path}: not a {ARCHIVE_FORMAT}')
+    elif meta['version'] > ARCHIVE_VERSION:
+        raise ValueError(
+            f'{path}: unsupported archive version: {meta["version"]}',
+        )
+
+    length = meta['length']
+    unit = meta['index']['unit']
+    timestamps = _memmap(os.path.join(path, INDEX_FILE), 'int64', length)
+    index = pd.DatetimeIndex(
+        timestamps.view(f'M8[{unit}]'),
+        name=meta['index']['name'],
+    ).tz_localize('UTC').tz_convert(meta['index']['tz'])
+    columns = {
+        column['name']: _memmap(
+            os.path.join(path, column['file']),
+            column['dtype'],
+            length,
+        )
+        for column in meta['columns']
+    }
+    df = pd.DataFrame(columns, index=index, copy=False)
+
+    column_mapping = None
+    if meta['column_mapping'] is not None:
+        column_mapping = ColumnMapping()
+        for column, groups in meta['column_mapping'].items():
+            for group in groups:
+                # the generic group is always part of the groups
+                if group not in column_mapping[column]:
+                    column_mapping[column].add_group(group)
+    return Archive(df=df, column_mapping=column_mapping)
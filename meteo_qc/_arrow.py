@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import Protocol
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from meteo_qc._data import _import_optional
+
+
+class ArrowStreamExportable(Protocol):
+    """Any table implementing the `Arrow PyCapsule interface
+    <https://arrow.apache.org/docs/format/CDataInterface/PyCapsuleInterface.html>`_,
+    e.g. a ``pyarrow.Table`` or a ``polars.DataFrame``.
+    """  # noqa: E501
+
+    def __arrow_c_stream__(
+            self,
+            requested_schema: object | None = None,
+    ) -> object:
+        ...
+
+
+DataFrameLike = Union[pd.DataFrame, ArrowStreamExportable]
+
+
+def _column_to_numpy(col: Any) -> Any:
+    pyarrow = _import_optional('pyarrow', 'arrow')
+
+    numeric = (
+        pyarrow.types.is_floating(col.type) or
+        pyarrow.types.is_integer(col.type)
+    )
+    if numeric and col.num_chunks == 1 and col.null_count == 0:
+        # a read-only view of the arrow buffer, integers are not converted to
+        # floats, so they stay exact
+        return col.chunk(0).to_numpy(zero_copy_only=True)
+    elif numeric:
+        # nulls become NaN like reading the data using pandas
+        return col.to_numpy().astype(np.float64, copy=False)
+    else:
+        return col.to_pandas().to_numpy()
+
+
+def _arrow_to_pandas(data: ArrowStreamExportable) -> pd.DataFrame:
+    pyarrow = _import_optional('pyarrow', 'arrow')
+
+    table = pyarrow.table(data)
+    index_cols = [
+        field.name for field in table.schema
+        if pyarrow.types.is_timestamp(field.type)
+    ]
+    if not index_cols:
+        raise TypeError('the table must have a column of timestamps')
+    index_col = index_cols[0]
+    index_type = table.schema.field(index_col).type
+    if index_type.tz is None:
+        raise TypeError(
+            f'the timestamps of the column {index_col!r} must be timezone '
+            f'aware',
+        )
+
+    timestamps = table[index_col]
+    if timestamps.null_count:
+        raise ValueError(
+            f'the timestamps of the column {index_col!r} must not be null',
+        )
+    index = pd.DatetimeIndex(
+        timestamps.to_numpy(),
+        name=index_col,
+    ).tz_localize('UTC').tz_convert(index_type.tz)
+    columns = {
+        name: _column_to_numpy(table[name])
+        for name in table.column_names if name != index_col
+    }
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def _as_dataframe(df: DataFrameLike) -> pd.DataFrame:
+    if isinstance(df, pd.DataFrame):
+        return df
+    elif hasattr(df, '__arrow_c_stream__'):
+        return _arrow_to_pandas(df)
+    else:
+        raise TypeError(
+            f'expected a pandas.DataFrame or a table implementing the arrow '
+            f'PyCapsule interface, not {type(df)}',
+        )
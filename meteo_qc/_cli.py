@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import inspect
+import json
+import os
+import sys
+import time
+from collections.abc import Sequence
+from concurrent.futures import as_completed
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any
+from typing import IO
+
+import pandas as pd
+
+from meteo_qc._data import FUNCS
+from meteo_qc._data import get_plugin_args
+from meteo_qc._io import _read_file
+from meteo_qc._io import _result_to_json
+from meteo_qc._io import _set_plugin_args
+from meteo_qc._io import _to_column_mapping
+from meteo_qc._io import _validate_column_mapping
+from meteo_qc._io import PLUGIN_ARG_T
+from meteo_qc._main import apply_qc
+from meteo_qc._server import COLUMN_MAPPING_HEADER
+from meteo_qc._server import serve
+
+SUFFIXES = ('.csv', '.parquet')
+
+
+def _find_files(paths: Sequence[str]) -> list[str]:
+    files: dict[str, None] = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in sorted(os.walk(path)):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(SUFFIXES):
+                        files[os.path.join(root, filename)] = None
+        elif glob.has_magic(path):
+            for filename in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(filename):
+                    files[filename] = None
+        elif os.path.isfile(path):
+            files[path] = None
+        else:
+            raise FileNotFoundError(f'no such file or directory: {path!r}')
+    return list(files)
+
+
+def _parse_plugin_arg(s: str) -> PLUGIN_ARG_T:
+    name, sep, value = s.partition('=')
+    group, _, rest = name.partition('.')
+    check, _, arg = rest.partition('.')
+    if not sep or not group or not check or not arg:
+        raise argparse.ArgumentTypeError(
+            f'expected GROUP.CHECK.ARG=VALUE, got {s!r}',
+        )
+
+    funcs = [
+        func_info['func'] for func_info in FUNCS.get(group, [])
+        if func_info['func'].__name__ == check
+    ]
+    if not funcs:
+        raise argparse.ArgumentTypeError(f'unknown plugin argument: {name}')
+    # any argument of the check can be set, not only the registered ones.
+    # The first argument is the series
+    _, *params = inspect.signature(funcs[0]).parameters.values()
+    param = next((p for p in params if p.name == arg), None)
+    if param is None:
+        raise argparse.ArgumentTypeError(f'unknown plugin argument: {name}')
+
+    # convert the value to the type of the registered default, the default of
+    # the argument or its annotation
+    default = get_plugin_args()[group][check].get(arg, param.default)
+    parsed: Any
+    if value == 'null':
+        parsed = None
+    elif (
+            isinstance(default, timedelta) or
+            'timedelta' in str(param.annotation)
+    ):
+        parsed = pd.Timedelta(value).to_pytimedelta()
+    else:
+        try:
+            parsed = json.loads(value)
+        except json.JSONDecodeError:
+            parsed = value
+    return group, check, arg, parsed
+
+
+def _qc_file(
+        path: str,
+        mapping: dict[str, list[str]] | None,
+        index_col: str | None,
+        tz: str,
+) -> dict[str, Any]:
+    start = time.monotonic()
+    try:
+        df = _read_file(path, index_col=index_col, tz=tz)
+        column_mapping = _to_column_mapping(df, mapping)
+        final_res = apply_qc(df, column_mapping)
+    except Exception as e:
+        return {
+            'path': path,
+            'error': f'{type(e).__name__}: {e}',
+            'seconds': time.monotonic() - start,
+        }
+    return {
+        'path': path,
+        'rows': len(df),
+        'passed': final_res['passed'],
+        'result': _result_to_json(final_res),
+        'seconds': time.monotonic() - start,
+    }
+
+
+def _write_record(record: dict[str, Any], output: IO[str]) -> None:
+    output.write(json.dumps(record) + '\n')
+    output.flush()
+
+
+def _run(args: argparse.Namespace, output: IO[str]) -> int:
+    files = _find_files(args.paths)
+    if not files:
+        raise FileNotFoundError('no files found')
+    mapping = None
+    if args.column_mapping is not None:
+        with open(args.column_mapping) as f:
+            mapping = _validate_column_mapping(
+                json.load(f),
+                source=args.column_mapping,
+            )
+    _set_plugin_args(args.plugin_args)
+
+    start = time.monotonic()
+    n_rows = n_failed = 0
+    qc_args = (mapping, args.index_col, args.tz)
+    if args.jobs == 1:
+        records = (_qc_file(path, *qc_args) for path in files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=args.jobs,
+            # the workers may not inherit the changes to the plugin arguments
+            initializer=_set_plugin_args,
+            initargs=(args.plugin_args,),
+        )
+        futures: list[Future[dict[str, Any]]] = [
+            executor.submit(_qc_file, path, *qc_args) for path in files
+        ]
+        records = (future.result() for future in as_completed(futures))
+
+    try:
+        for i, record in enumerate(records, start=1):
+            _write_record(record, output)
+            if 'error' in record:
+                n_failed += 1
+                status = f'error: {record["error"]}'
+            else:
+                n_rows += record['rows']
+                status = 'passed' if record['passed'] else 'failed'
+            if not args.quiet:
+                print(
+                    f'[{i}/{len(files)}] {record["path"]}: {status}',
+                    file=sys.stderr,
+                )
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    seconds = time.monotonic() - start
+    print(
+        f'processed {len(files)} files ({n_rows} rows) in {seconds:.2f}s: '
+        f'{len(files) / seconds:.2f} files/s, {n_rows / seconds:.0f} rows/s, '
+        f'{n_failed} errors',
+        file=sys.stderr,
+    )
+    return 1 if n_failed else 0
+
+
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='meteo-qc',
+        description='quality control meteorological data',
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser(
+        'run',
+        help='apply the quality control to csv or parquet files',
+        description=(
+            'Apply the quality control to csv or parquet files, writing one '
+            'JSON line per file in the order the files finished.'
+        ),
+    )
+    run_parser.add_argument(
+        'paths',
+        nargs='+',
+        help=(
+            'files, directories (searched for *.csv and *.parquet files '
+            'recursively) or glob patterns'
+        ),
+    )
+    run_parser.add_argument(
+        '-m', '--column-mapping',
+        help=(
+            'a JSON file mapping column names to a list of groups e.g. '
+            '{"temp": ["temperature"]}. If omitted, the groups are detected '
+            'from the column names of every file.'
+        ),
+    )
+    run_parser.add_argument(
+        '--index-col',
+        help=(
+            'the column with the timestamps. Defaults to the first column '
+            '(or the index of parquet files).'
+        ),
+    )
+    run_parser.add_argument(
+        '--tz',
+        default='UTC',
+        help='the timezone of timestamps without one (default: %(default)s)',
+    )
+    run_parser.add_argument(
+        '-o', '--output',
+        default='-',
+        help='the file to write the JSON lines to (default: stdout)',
+    )
+    run_parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='do not report the progress of each file',
+    )
+
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='run a HTTP server applying the quality control',
+        description=(
+            'Run a HTTP server applying the quality control to csv, parquet '
+            'or arrow data posted to /qc using a pool of warm worker '
+            'processes. The column mapping is passed as JSON in the '
+            f'{COLUMN_MAPPING_HEADER} header, without it the groups are '
+            'detected from the column names. GET /metrics returns the '
+            'latency and throughput.'
+        ),
+    )
+    serve_parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='the host to listen on (default: %(default)s)',
+    )
+    serve_parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='the port to listen on (default: %(default)s)',
+    )
+    serve_parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=8,
+        help=(
+            'the maximum number of waiting requests sent to a worker at once '
+            '(default: %(default)s)'
+        ),
+    )
+    serve_parser.add_argument(
+        '--max-pending',
+        type=int,
+        default=64,
+        help=(
+            'the maximum number of requests waiting for a worker before new '
+            'requests are rejected (default: %(default)s)'
+        ),
+    )
+    for subparser in (run_parser, serve_parser):
+        subparser.add_argument(
+            '-a', '--plugin-arg',
+            dest='plugin_args',
+            action='append',
+            default=[],
+            type=_parse_plugin_arg,
+            metavar='GROUP.CHECK.ARG=VALUE',
+            help=(
+                'override a plugin argument e.g. '
+                'temperature.range_check.upper_bound=45. The value is parsed '
+                'as JSON or as a time delta e.g. 3h if the argument is one. '
+                'Can be passed multiple times.'
+            ),
+        )
+        subparser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='the number of worker processes (default: %(default)s)',
+        )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = _make_parser()
+    args = parser.parse_args(argv)
+
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    if args.command == 'run':
+        try:
+            if args.output == '-':
+                return _run(args, sys.stdout)
+            else:
+                with open(args.output, 'w') as f:
+                    return _run(args, f)
+        except (OSError, ValueError) as e:
+            print(f'error: {e}', file=sys.stderr)
+            return 1
+    elif args.command == 'serve':
+        serve(
+            host=args.host,
+            port=args.port,
+            jobs=args.jobs,
+            batch_size=args.batch_size,
+            max_pending=args.max_pending,
+            plugin_args=args.plugin_args,
+        )
+        return 0
+    else:
+        raise AssertionError('unreachable')
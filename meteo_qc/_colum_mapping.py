@@ -59,6 +59,9 @@ class ColumnMapping:
             self._dct[k] = GroupList()
             return self._dct[k]
 
+    def __iter__(self) -> Iterator[str]:
+        yield from self._dct
+
     @classmethod
     def autodetect_from_df(cls, df: pd.DataFrame) -> ColumnMapping:
         """Autodetect the groups from the column names.
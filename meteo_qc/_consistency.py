@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import CONSISTENCY_RULES
+from meteo_qc._data import Result
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._plugins.values import _flagged_rows
+
+
+def _columns_by_group(
+        df: pd.DataFrame,
+        column_mapping: ColumnMapping,
+) -> dict[str, list[str]]:
+    columns_by_group: dict[str, list[str]] = defaultdict(list)
+    for column in column_mapping:
+        if column in df.columns:
+            for group in column_mapping[column]:
+                columns_by_group[group].append(column)
+    return columns_by_group
+
+
+def _station_by_column(stations: Iterable[Iterable[str]]) -> dict[str, int]:
+    station_by_column: dict[str, int] = {}
+    for i, station in enumerate(stations):
+        for column in station:
+            if column in station_by_column:
+                raise ValueError(
+                    f'the column {column!r} is part of multiple stations',
+                )
+            station_by_column[column] = i
+    return station_by_column
+
+
+def _related_columns(
+        columns: list[str],
+        group: str,
+        related_group: str,
+        related_columns: list[str],
+        station_by_column: dict[str, int] | None,
+) -> list[str]:
+    if station_by_column is None:
+        # a single related column is broadcast to all columns
+        if len(related_columns) in (1, len(columns)):
+            return related_columns
+        else:
+            raise ValueError(
+                f'the group {related_group!r} must have 1 or '
+                f'{len(columns)} columns like the group {group!r}, not '
+                f'{len(related_columns)}. Pass the stations to pair the '
+                f'columns explicitly',
+            )
+
+    related_by_station: dict[int | None, list[str]] = defaultdict(list)
+    for column in related_columns:
+        related_by_station[station_by_column.get(column)].append(column)
+    paired = []
+    for column in columns:
+        station = station_by_column.get(column)
+        candidates = related_by_station.get(station, [])
+        if station is None or not candidates:
+            # a single column of the related group is used by every station
+            candidates = related_columns if len(related_columns) == 1 else []
+        if len(candidates) != 1:
+            raise ValueError(
+                f'the column {column!r} must have 1 related column of the '
+                f'group {related_group!r} in its station, not '
+                f'{len(candidates)}',
+            )
+        paired.append(candidates[0])
+    return paired
+
+
+def consistency_check(
+        df: DataFrameLike,
+        column_mapping: ColumnMapping,
+        stations: Iterable[Iterable[str]] | None = None,
+        duplicates: DuplicatePolicy = 'first',
+) -> dict[str, dict[str, Result]]:
+    """
+    Check the consistency of the columns of physically related groups, e.g.
+    the dew point must not exceed the temperature. The related columns are
+    found using the groups of the column mapping and every rule registered
+    using :func:`meteo_qc.register_consistency` is applied to all columns of
+    its groups at once.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        column_mapping = meteo_qc.ColumnMapping()
+        column_mapping['temp_1'].add_group('temperature')
+        column_mapping['temp_2'].add_group('temperature')
+        column_mapping['dew_point_1'].add_group('dew_point')
+        column_mapping['dew_point_2'].add_group('dew_point')
+
+        results = meteo_qc.consistency_check(df, column_mapping)
+        print(results['dew_point_1']['dew_point_consistency'])
+
+    The values of each group are converted to one 2d array once, all rules
+    compare these arrays. Without ``stations`` the n-th columns of the groups
+    (in the order of the column mapping) are compared with each other, e.g.
+    ``dew_point_1`` with ``temp_1``, so the groups must have the same number
+    of columns. To pair the columns explicitly, pass the columns of each
+    station:
+
+    .. code-block:: python
+
+        results = meteo_qc.consistency_check(
+            df,
+            column_mapping,
+            stations=[('temp_1', 'dew_point_1'), ('temp_2', 'dew_point_2')],
+        )
+
+    A related group can also have a single column, that is compared with all
+    columns without a related column in their station.
+
+    :param df: The DataFrame the checks should be applied to. This can also be
+        an arrow table, see :func:`meteo_qc.apply_qc`.
+    :param column_mapping: the :func:`meteo_qc.ColumnMapping` assigning the
+        groups to the columns
+    :param stations: the columns of each station, a column is only compared
+        with the columns of its station
+    :param duplicates: how rows with the same timestamp are resolved before
+        the rules are applied. See :func:`meteo_qc.apply_qc`.
+
+    :returns: a dictionary mapping the columns that were checked to a
+        dictionary mapping the name of each rule to its
+        :func:`meteo_qc.Result`, like the ``results`` of a column in a
+        :func:`meteo_qc.FinalResult`.
+    """
+    df = _as_dataframe(df)
+    _validate_index(df)
+    _, df_sorted = _sort_and_resolve(df, duplicates)
+    columns_by_group = _columns_by_group(df_sorted, column_mapping)
+    station_by_column = (
+        None if stations is None else _station_by_column(stations)
+    )
+    group_values: dict[str, npt.NDArray[np.float64]] = {}
+    results: dict[str, dict[str, Result]] = defaultdict(dict)
+    for rule in CONSISTENCY_RULES:
+        group, *related = rule['groups']
+        columns = columns_by_group.get(group, [])
+        if not columns or not all(columns_by_group.get(g) for g in related):
+            continue
+
+        rule_values = []
+        for g in rule['groups']:
+            if g not in group_values:
+                group_values[g] = df_sorted[columns_by_group[g]].to_numpy(
+                    dtype=np.float64,
+                    na_value=np.nan,
+                )
+            if g == group:
+                rule_values.append(group_values[g])
+                continue
+
+            paired = _related_columns(
+                columns,
+                group,
+                g,
+                columns_by_group[g],
+                station_by_column,
+            )
+            if paired == columns_by_group[g]:
+                rule_values.append(group_values[g])
+            else:
+                positions = [columns_by_group[g].index(c) for c in paired]
+                rule_values.append(group_values[g][:, positions])
+        flags = np.asarray(rule['func'](*rule_values), dtype=bool)
+        name = rule['func'].__name__
+        for i, column in enumerate(columns):
+            column_flags = pd.Series(flags[:, i], index=df_sorted.index)
+            if column_flags.any():
+                results[column][name] = Result(
+                    function=name,
+                    passed=False,
+                    msg=rule['msg'],
+                    data=_flagged_rows(df_sorted[column], column_flags),
+                )
+            else:
+                results[column][name] = Result(function=name, passed=True)
+    return dict(results)
@@ -0,0 +1,872 @@
+from __future__ import annotations
+
+from collections.abc import Collection
+from datetime import timedelta
+from typing import Any
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _check_data_format
+from meteo_qc._data import _import_optional
+from meteo_qc._data import _use_data_format
+from meteo_qc._data import DataFormat
+from meteo_qc._data import FLAG_FUNCS
+from meteo_qc._main import _check_duplicates
+from meteo_qc._main import _flagged_positions
+from meteo_qc._main import _new_final_result
+from meteo_qc._main import _report_duplicates
+from meteo_qc._main import _set_passed
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import _with_precision
+from meteo_qc._main import apply_qc
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._main import FinalResult
+from meteo_qc._main import Precision
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.generic import _duplicated
+from meteo_qc._plugins.generic import missing_timestamps
+from meteo_qc._plugins.values import _freq_cache
+from meteo_qc._plugins.values import _freq_from_diffs
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+from meteo_qc._sharded import _is_shardable
+from meteo_qc._sharded import _lookback
+from meteo_qc._sharded import _ShardTask
+from meteo_qc._sharded import _to_i8
+from meteo_qc._sharded import _trim
+
+if TYPE_CHECKING:
+    import dask.dataframe as dd
+    from dask.delayed import Delayed
+
+
+class _IndexStats(NamedTuple):
+    # the number of distinct timestamps and of the rows repeating one
+    n: int
+    n_duplicated: int
+    first: pd.Timestamp
+    last: pd.Timestamp
+    # the distinct differences between the timestamps and their counts
+    diffs: npt.NDArray[np.int64]
+    counts: npt.NDArray[np.int64]
+
+
+class _DaskPartition(NamedTuple):
+    # the position of the partition and of the previous partitions providing
+    # the values the checks need to look back
+    pos: int
+    halo: tuple[int, ...]
+    # the partitions after it, if it is within the lookback of the start of
+    # all data
+    lead: tuple[int, ...]
+    # the partition is responsible for the flags from core_start on, which is
+    # right after the last timestamp of the previous partition, until right
+    # after its last timestamp
+    core_start: pd.Timestamp | None
+    core_end: pd.Timestamp | None
+    halo_start: pd.Timestamp | None
+
+
+def _index_stats(
+        idx: pd.DatetimeIndex,
+        method: FreqMethod,
+) -> _IndexStats | None:
+    if len(idx) == 0:
+        return None
+
+    idx_diff = np.diff(idx.asi8)
+    # the duplicates are resolved before the checks are applied
+    duplicated = idx_diff == 0
+    n_duplicated = int(np.count_nonzero(duplicated))
+    idx_diff = idx_diff[~duplicated]
+    if method == 'min' and len(idx_diff) > 0:
+        diffs = idx_diff.min(keepdims=True)
+        counts = np.ones(1, dtype=np.int64)
+    else:
+        diffs, counts = np.unique(idx_diff, return_counts=True)
+    return _IndexStats(
+        len(idx) - n_duplicated,
+        n_duplicated,
+        idx[0],
+        idx[-1],
+        diffs,
+        counts,
+    )
+
+
+def _combine_freq(
+        stats: list[_IndexStats | None],
+        method: FreqMethod,
+        tolerance: float,
+        unit: str,
+) -> str | None:
+    non_empty = [s for s in stats if s is not None]
+    if sum(s.n for s in non_empty) < 3:
+        return None
+
+    # the differences between the partitions
+    boundaries = np.array(
+        [
+            _to_i8(b.first, unit) - _to_i8(a.last, unit)
+            for a, b in zip(non_empty[:-1], non_empty[1:])
+        ],
+        dtype=np.int64,
+    )
+    all_diffs = np.concatenate([s.diffs for s in non_empty] + [boundaries])
+    all_counts = np.concatenate(
+        [s.counts for s in non_empty] +
+        [np.ones(len(boundaries), dtype=np.int64)],
+    )
+    diffs, inverse = np.unique(all_diffs, return_inverse=True)
+    counts = np.bincount(inverse, weights=all_counts).astype(np.int64)
+    return _freq_from_diffs(
+        diffs,
+        counts,
+        method=method,
+        tolerance=tolerance,
+        unit=unit,
+    )
+
+
+def _first_aligned(
+        idx: pd.DatetimeIndex,
+        origin: pd.Timestamp,
+        step: pd.Timedelta,
+) -> pd.Timestamp | None:
+    # the first timestamp aligned with the full index of all data
+    unit = idx.unit
+    step_i8 = step // pd.Timedelta(1, unit=unit)
+    aligned = np.flatnonzero((idx.asi8 - _to_i8(origin, unit)) % step_i8 == 0)
+    return idx[aligned[0]] if len(aligned) else None
+
+
+def _aligned_starts(
+        ddf: dd.DataFrame,
+        stats: list[_IndexStats | None],
+        origin: pd.Timestamp,
+        freq: pd.Timedelta,
+        unit: str,
+        scheduler: str | None,
+) -> list[pd.Timestamp | None]:
+    dask = _import_optional('dask', 'dask')
+
+    # the first timestamp of a partition of regular data is aligned, only the
+    # index of the others is read again
+    step = freq // pd.Timedelta(np.int64(1).astype(f'm8[{unit}]'))
+    origin_i8 = _to_i8(origin, unit)
+    aligned: list[pd.Timestamp | None] = []
+    unaligned = []
+    for pos, partition_stats in enumerate(stats):
+        if partition_stats is None:
+            aligned.append(None)
+        elif (_to_i8(partition_stats.first, unit) - origin_i8) % step == 0:
+            aligned.append(partition_stats.first)
+        else:
+            aligned.append(None)
+            unaligned.append(pos)
+    if unaligned:
+        indexes = ddf.index.to_delayed()
+        first_aligned = dask.compute(
+            *(
+                dask.delayed(_first_aligned)(indexes[pos], origin, freq)
+                for pos in unaligned
+            ),
+            scheduler=scheduler,
+        )
+        for pos, ts in zip(unaligned, first_aligned):
+            aligned[pos] = ts
+    return aligned
+
+
+def _dask_partitions(
+        stats: list[_IndexStats | None],
+        aligned: list[pd.Timestamp | None],
+        lookback: timedelta,
+        freq: pd.Timedelta | None,
+        unit: str,
+) -> list[_DaskPartition]:
+    if freq is None:
+        # without a frequency the checks can only compare values at the same
+        # timestamp, no values before the partition are needed
+        return [
+            _DaskPartition(pos, (), (), None, None, None)
+            for pos, partition_stats in enumerate(stats)
+            if partition_stats is not None
+        ]
+
+    one_step = pd.Timedelta(np.int64(1).astype(f'm8[{unit}]'))
+    non_empty = [
+        (pos, partition_stats)
+        for pos, partition_stats in enumerate(stats)
+        if partition_stats is not None
+    ]
+    # the checks may treat the values within the lookback of the start of the
+    # series differently, e.g. persistence_check does not flag anything in a
+    # series shorter than its window. Partitions ending before are checked
+    # together with the partitions after them, up to the first one reaching
+    # beyond it.
+    first = non_empty[0][1].first
+    lead_end = first + lookback
+    partitions = []
+    for i, (pos, partition_stats) in enumerate(non_empty):
+        if i == 0:
+            halo: list[int] = []
+            core_start = halo_start = None
+        else:
+            core_start = non_empty[i - 1][1].last + one_step
+            halo_start = core_start - lookback
+            # like the shards of apply_qc_sharded, the halo must start at a
+            # timestamp aligned with the full index of all data, at or before
+            # halo_start. Go back to the latest partition having one, the
+            # first partition starts with the first timestamp of all data.
+            halo = []
+            for previous_pos, _ in reversed(non_empty[:i]):
+                halo.insert(0, previous_pos)
+                first_aligned = aligned[previous_pos]
+                if first_aligned is not None and first_aligned <= halo_start:
+                    break
+
+        lead: list[int] = []
+        core_end = None
+        # without values before the first timestamp in the halo
+        if (
+                (halo_start is None or halo_start <= first) and
+                partition_stats.last < lead_end
+        ):
+            core_end = partition_stats.last + one_step
+            for next_pos, next_stats in non_empty[i + 1:]:
+                lead.append(next_pos)
+                if next_stats.last >= lead_end:
+                    break
+        partitions.append(
+            _DaskPartition(
+                pos,
+                tuple(halo),
+                tuple(lead),
+                core_start,
+                core_end,
+                halo_start,
+            ),
+        )
+    return partitions
+
+
+def _frame_parts(
+        parts: list[Delayed],
+        partition: _DaskPartition,
+) -> list[Delayed]:
+    positions = (*partition.halo, partition.pos, *partition.lead)
+    return [parts[i] for i in positions]
+
+
+def _halo_frame(
+        parts: list[pd.DataFrame],
+        partition: _DaskPartition,
+        origin: pd.Timestamp,
+        data_freq: str | None,
+        duplicates: DuplicatePolicy,
+) -> pd.DataFrame:
+    df = pd.concat(parts) if len(parts) > 1 else parts[0]
+    # with known divisions, all rows of a timestamp are in one partition
+    _, df = _sort_and_resolve(df, duplicates)
+    assert isinstance(df.index, pd.DatetimeIndex)
+    if (
+            partition.halo_start is None or
+            partition.core_start is None or
+            data_freq is None
+    ):
+        return df
+
+    # like the shards of apply_qc_sharded, the halo must start at a timestamp
+    # aligned with the full index of all data
+    unit = df.index.unit
+    idx_i8 = df.index.asi8
+    step = pd.Timedelta(data_freq) // pd.Timedelta(1, unit=unit)
+    aligned = np.flatnonzero((idx_i8 - _to_i8(origin, unit)) % step == 0)
+    # the halo has an aligned timestamp at or before halo_start, unless it
+    # starts with the first timestamp of all data
+    halo_start_i8 = _to_i8(partition.halo_start, unit)
+    pos = int(np.searchsorted(idx_i8[aligned], halo_start_i8, 'right'))
+    start = int(aligned[max(pos - 1, 0)])
+    return df.iloc[start:]
+
+
+def _partition_flags(
+        df: pd.DataFrame,
+        partition: _DaskPartition,
+        tasks: list[_ShardTask],
+        data_freq: str | None,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+        precision: Precision,
+) -> list[pd.Series[bool] | None]:
+    assert isinstance(df.index, pd.DatetimeIndex)
+    # the checks must use the frequency of all data, not of this partition
+    _freq_cache(df.index)[(freq_method, freq_tolerance)] = data_freq
+    flags = []
+    with _use_freq_options(freq_method, freq_tolerance):
+        for task in tasks:
+            task_flags = FLAG_FUNCS[task.func]['flags'](
+                _with_precision(df[task.column], precision),
+                **task.kwargs,
+            )
+            flags.append(
+                _trim(task_flags, partition.core_start, partition.core_end),
+            )
+    return flags
+
+
+class _Flagged(NamedTuple):
+    flagged: pd.DatetimeIndex
+    # whether unflagged values of the index the check was applied to are
+    # before each flagged value in the partition, i.e. it starts a run
+    starts_run: npt.NDArray[np.bool_]
+    # whether the index the check was applied to ends with unflagged values
+    ends_unflagged: bool
+
+
+def _report_flags(
+        pieces: list[_Flagged],
+        data_format: DataFormat,
+) -> pd.Series[bool]:
+    index = pieces[0].flagged.append([piece.flagged for piece in pieces[1:]])
+    if data_format == 'rows':
+        return pd.Series(True, index=index, dtype=bool)
+
+    # a run continues in the next partition if there are no unflagged values
+    # in between
+    starts_run = []
+    after_unflagged = False
+    for piece in pieces:
+        piece_starts_run = piece.starts_run.copy()
+        if len(piece_starts_run):
+            piece_starts_run[0] |= after_unflagged
+            after_unflagged = piece.ends_unflagged
+        else:
+            after_unflagged |= piece.ends_unflagged
+        starts_run.append(piece_starts_run)
+    # put an unflagged value between the runs, repeating the last timestamp
+    # of the run, so the report finds the same runs as apply_qc
+    breaks = np.flatnonzero(np.concatenate(starts_run)[1:]) + 1
+    positions = np.insert(np.arange(len(index)), breaks, breaks - 1)
+    values = np.insert(np.ones(len(index), dtype=bool), breaks, False)
+    return pd.Series(values, index=index[positions], dtype=bool)
+
+
+def _positions(
+        idx: pd.DatetimeIndex,
+        flags: pd.Series[bool],
+) -> npt.NDArray[np.intp]:
+    positions = _flagged_positions(idx, flags)
+    if positions.dtype == bool:
+        return np.flatnonzero(positions)
+    return positions
+
+
+def _qc_partition(
+        parts: list[pd.DataFrame],
+        partition: _DaskPartition,
+        origin: pd.Timestamp,
+        tasks: list[_ShardTask],
+        data_freq: str,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+        precision: Precision,
+        duplicates: DuplicatePolicy,
+) -> tuple[list[_Flagged | None], dict[str, pd.Series[Any]]]:
+    df = _halo_frame(parts, partition, origin, data_freq, duplicates)
+    assert isinstance(df.index, pd.DatetimeIndex)
+    flags = _partition_flags(
+        df,
+        partition,
+        tasks,
+        data_freq,
+        freq_method,
+        freq_tolerance,
+        precision,
+    )
+    # only the flagged timestamps and values are sent back
+    flagged: list[_Flagged | None] = []
+    positions: dict[str, list[npt.NDArray[Any]]] = {}
+    for task, task_flags in zip(tasks, flags):
+        if task_flags is None:
+            flagged.append(None)
+            continue
+        flag_values = task_flags.to_numpy(dtype=bool)
+        task_flagged = task_flags.index[flag_values]
+        assert isinstance(task_flagged, pd.DatetimeIndex)
+        flagged_positions = np.flatnonzero(flag_values)
+        flagged.append(
+            _Flagged(
+                task_flagged,
+                starts_run=np.diff(flagged_positions, prepend=-1) > 1,
+                ends_unflagged=bool(len(flag_values) and not flag_values[-1]),
+            ),
+        )
+        column_positions = positions.setdefault(task.column, [])
+        column_positions.append(_positions(df.index, task_flags))
+
+    values = {
+        column: _with_precision(
+            df[column].iloc[np.unique(np.concatenate(column_positions))],
+            precision,
+        )
+        for column, column_positions in positions.items()
+    }
+    return flagged, values
+
+
+def _mask_partition(
+        parts: list[pd.DataFrame],
+        partition: _DaskPartition,
+        origin: pd.Timestamp,
+        tasks: list[_ShardTask],
+        data_freq: str | None,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+        precision: Precision,
+        duplicates: DuplicatePolicy,
+) -> pd.DataFrame:
+    df = _halo_frame(parts, partition, origin, data_freq, duplicates)
+    assert isinstance(df.index, pd.DatetimeIndex)
+    flags = _partition_flags(
+        df,
+        partition,
+        tasks,
+        data_freq,
+        freq_method,
+        freq_tolerance,
+        precision,
+    )
+    # the rows of the core, with the duplicates resolved. The flags are
+    # trimmed to the core already
+    idx_i8 = df.index.asi8
+    unit = df.index.unit
+    start = 0
+    stop = len(df)
+    if partition.core_start is not None:
+        core_start_i8 = _to_i8(partition.core_start, unit)
+        start = int(np.searchsorted(idx_i8, core_start_i8))
+    if partition.core_end is not None:
+        stop = int(np.searchsorted(idx_i8, _to_i8(partition.core_end, unit)))
+    masks = {
+        column: np.zeros(stop - start, dtype=bool) for column in df.columns
+    }
+    for task, task_flags in zip(tasks, flags):
+        if task_flags is not None:
+            positions = _positions(df.index, task_flags)
+            masks[task.column][positions - start] = True
+    return pd.DataFrame(masks, index=df.index[start:stop], copy=False)
+
+
+def _duplicated_rows(part: pd.DataFrame) -> pd.DataFrame:
+    part = part.sort_index(kind='stable')
+    assert isinstance(part.index, pd.DatetimeIndex)
+    return part[_duplicated(part.index)]
+
+
+def _empty_mask(part: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(
+        {column: np.zeros(len(part), dtype=bool) for column in part},
+        index=part.index,
+    )
+
+
+class _Prepared(NamedTuple):
+    stats: list[_IndexStats | None]
+    data_freq: str | None
+    unit: str
+
+
+def _prepare(
+        ddf: dd.DataFrame,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+        scheduler: str | None,
+) -> _Prepared:
+    dask = _import_optional('dask', 'dask')
+
+    if not ddf.known_divisions:
+        raise ValueError(
+            'the divisions of the dask.dataframe must be known, set a '
+            'sorted DatetimeIndex using set_index',
+        )
+    dtype = ddf.index.dtype
+    _validate_index(
+        pd.DataFrame(index=pd.DatetimeIndex([], dtype=dtype)),
+    )
+    stats = list(
+        dask.compute(
+            *(
+                dask.delayed(_index_stats)(idx, freq_method)
+                for idx in ddf.index.to_delayed()
+            ),
+            scheduler=scheduler,
+        ),
+    )
+    unit = dtype.unit
+    data_freq = _combine_freq(
+        stats,
+        method=freq_method,
+        tolerance=freq_tolerance,
+        unit=unit,
+    )
+    return _Prepared(stats, data_freq, unit)
+
+
+def _origin(stats: list[_IndexStats | None]) -> pd.Timestamp:
+    return next(s.first for s in stats if s is not None)
+
+
+def apply_qc_dask(
+        ddf: dd.DataFrame,
+        column_mapping: ColumnMapping | QCPlan,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        scheduler: str | None = None,
+        precision: Precision = 'float64',
+        data_format: DataFormat = 'rows',
+        duplicates: DuplicatePolicy = 'first',
+) -> FinalResult:
+    """
+    Apply the quality control to a ``dask.dataframe.DataFrame`` partitioned
+    by time, e.g. an archive larger than the memory read from parquet files.
+    The partitions are checked in parallel using the dask ``scheduler``,
+    without a cluster. The result is identical to :func:`meteo_qc.apply_qc`
+    with the same arguments. The ``'mask'`` output is available lazily using
+    :func:`meteo_qc.mask_qc_dask`.
+
+    .. code-block:: python
+
+        import dask.dataframe as dd
+        import meteo_qc
+
+        ddf = dd.read_parquet('station_1/*.parquet', index='date')
+        result = meteo_qc.apply_qc_dask(ddf, column_mapping)
+
+    Like :func:`meteo_qc.apply_qc_sharded`, each partition is checked with
+    the values of the previous partitions the checks need to look back
+    (see ``lookback`` of :func:`meteo_qc.register_flags`), similar to
+    ``dask.dataframe.DataFrame.map_overlap``. Partitions within the lookback
+    of the first timestamp are also checked with the partitions after them,
+    since the checks may treat the start of the data differently. The
+    frequency of the data is inferred once from the differences of the
+    timestamps of all partitions.
+    Only the flagged timestamps and values are collected, the results are
+    then reported from them. Checks without a registered ``report`` and
+    ``lookback`` and :func:`meteo_qc.missing_timestamps` with ``per_row``
+    are applied to the entire column, which is computed in memory.
+
+    :param ddf: the ``dask.dataframe.DataFrame`` with a sorted timezone aware
+        ``DatetimeIndex`` and known divisions
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns or a :func:`meteo_qc.QCPlan`.
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param scheduler: the dask scheduler e.g. ``'threads'``,
+        ``'processes'`` or ``'synchronous'``. Defaults to the scheduler of
+        the dask collection.
+    :param precision: ``'float32'`` applies the checks to a ``float32`` copy
+        of the numeric columns of each partition. See
+        :func:`meteo_qc.apply_qc`.
+    :param data_format: the format of the ``data`` of the results. See
+        :func:`meteo_qc.apply_qc`.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied. See :func:`meteo_qc.apply_qc`. Only the
+        duplicated rows are collected to report them.
+
+    :returns: a :func:`meteo_qc.FinalResult`, see :func:`meteo_qc.apply_qc`.
+    """
+    dask = _import_optional('dask', 'dask')
+
+    _check_data_format(data_format)
+    _check_duplicates(duplicates)
+    stats, data_freq, unit = _prepare(
+        ddf,
+        freq_method,
+        freq_tolerance,
+        scheduler,
+    )
+    plan = _to_plan(column_mapping)
+    if data_freq is None or pd.Timedelta(data_freq) <= pd.Timedelta(0):
+        return apply_qc(
+            ddf.compute(scheduler=scheduler),
+            plan,
+            freq_method=freq_method,
+            freq_tolerance=freq_tolerance,
+            precision=precision,
+            data_format=data_format,
+            duplicates=duplicates,
+        )
+
+    column_plans = {column: plan.for_column(column) for column in ddf.columns}
+    tasks = []
+    serial_checks = []
+    for column, column_plan in column_plans.items():
+        for check in column_plan.checks:
+            if (
+                    _is_shardable(check.func) and
+                    # the number of missing rows is computed from the index
+                    not (
+                        check.func is missing_timestamps and
+                        check.kwargs.get('per_row')
+                    )
+            ):
+                tasks.append(
+                    _ShardTask(
+                        column,
+                        check.name,
+                        check.func,
+                        dict(check.kwargs),
+                    ),
+                )
+            else:
+                serial_checks.append((column, check))
+
+    freq = pd.Timedelta(data_freq)
+    lookback = max(
+        (_lookback(t.func, freq, t.kwargs) for t in tasks),
+        default=timedelta(0),
+    )
+    parts = ddf.to_delayed()
+    origin = _origin(stats)
+    aligned = _aligned_starts(ddf, stats, origin, freq, unit, scheduler)
+    partitions = _dask_partitions(stats, aligned, lookback, freq, unit)
+    partition_results = dask.compute(
+        *(
+            dask.delayed(_qc_partition)(
+                _frame_parts(parts, partition),
+                partition,
+                origin,
+                tasks,
+                data_freq,
+                freq_method,
+                freq_tolerance,
+                precision,
+                duplicates,
+            )
+            for partition in partitions
+        ),
+        scheduler=scheduler,
+    )
+    duplicated_rows = None
+    if any(s is not None and s.n_duplicated for s in stats):
+        duplicated_rows = pd.concat(
+            dask.compute(
+                *(dask.delayed(_duplicated_rows)(part) for part in parts),
+                scheduler=scheduler,
+            ),
+        )
+
+    last = next(s.last for s in reversed(stats) if s is not None)
+    bounds = pd.DatetimeIndex([origin, last])
+    final_res = _new_final_result(
+        pd.DataFrame(index=bounds),
+        data_freq=data_freq,
+    )
+    results = {}
+    with (
+            _use_freq_options(freq_method, freq_tolerance),
+            _use_data_format(data_format),
+    ):
+        if serial_checks:
+            serial_columns = list(dict.fromkeys(c for c, _ in serial_checks))
+            _, df = _sort_and_resolve(
+                ddf[serial_columns].compute(scheduler=scheduler),
+                duplicates,
+            )
+            assert isinstance(df.index, pd.DatetimeIndex)
+            _freq_cache(df.index)[(freq_method, freq_tolerance)] = data_freq
+            for column, check in serial_checks:
+                results[(column, check.name)] = check.func(
+                    _with_precision(df[column], precision),
+                    **check.kwargs,
+                )
+
+        values = {}
+        for column in ddf.columns:
+            pieces = [
+                column_values[column]
+                for _, column_values in partition_results
+                if column in column_values
+            ]
+            if pieces:
+                values[column] = pd.concat(pieces)
+            else:
+                values[column] = _with_precision(ddf[column]._meta, precision)
+            index = values[column].index
+            assert isinstance(index, pd.DatetimeIndex)
+            _freq_cache(index)[(freq_method, freq_tolerance)] = data_freq
+
+        for i, task in enumerate(tasks):
+            task_flagged = [flagged[i] for flagged, _ in partition_results]
+            pieces = [f for f in task_flagged if f is not None]
+            flags = None
+            if len(pieces) == len(task_flagged):
+                flags = _report_flags(pieces, data_format)
+            report = FLAG_FUNCS[task.func]['report']
+            assert report is not None
+            results[(task.column, task.name)] = report(
+                values[task.column],
+                flags=flags,
+                **task.kwargs,
+            )
+
+    for column, column_plan in column_plans.items():
+        final_res['columns'][column]['results'] = {
+            name: results[(column, name)] for name in column_plan.result_order
+        }
+        if duplicated_rows is not None:
+            with _use_data_format(data_format):
+                _report_duplicates(
+                    duplicated_rows[column],
+                    column_plan,
+                    precision=precision,
+                    results=final_res['columns'][column]['results'],
+                )
+    _set_passed(final_res)
+    return final_res
+
+
+def mask_qc_dask(
+        ddf: dd.DataFrame,
+        column_mapping: ColumnMapping | QCPlan,
+        mask_checks: Collection[str] | None = None,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        scheduler: str | None = None,
+        precision: Precision = 'float64',
+        duplicates: DuplicatePolicy = 'first',
+) -> dd.DataFrame:
+    """
+    Get a lazy ``dask.dataframe.DataFrame`` of the same shape as ``ddf``
+    telling which values fail the checks (``True``), like the ``'mask'``
+    output of :func:`meteo_qc.apply_qc`. It is partitioned like ``ddf``, so
+    it can be used to clean or write out the data without collecting it.
+
+    .. code-block:: python
+
+        import dask.dataframe as dd
+        import meteo_qc
+
+        ddf = dd.read_parquet('station_1/*.parquet', index='date')
+        mask = meteo_qc.mask_qc_dask(ddf, column_mapping)
+        ddf.mask(mask).to_parquet('station_1_cleaned')
+
+    Each partition is checked with the values of the previous partitions
+    the checks need to look back, see :func:`meteo_qc.apply_qc_dask`. Only
+    the timestamps are read when this is called, to infer the frequency of
+    the data and where each partition starts.
+
+    :param ddf: the ``dask.dataframe.DataFrame`` with a sorted timezone aware
+        ``DatetimeIndex`` and known divisions
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns or a :func:`meteo_qc.QCPlan`.
+    :param mask_checks: the names of the checks whose failing values are
+        masked. Defaults to all checks. The checks must have a registered
+        ``report`` and ``lookback`` (see :func:`meteo_qc.register_flags`).
+        :func:`meteo_qc.missing_timestamps` is never part of the mask.
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param scheduler: the dask scheduler used to read the timestamps. The
+        mask is computed with the scheduler it is computed with.
+    :param precision: ``'float32'`` applies the checks to a ``float32`` copy
+        of the numeric columns of each partition. See
+        :func:`meteo_qc.apply_qc`.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied. See :func:`meteo_qc.apply_qc`. The mask has
+        one row per timestamp.
+
+    :returns: a lazy ``dask.dataframe.DataFrame`` of booleans
+    """
+    dask = _import_optional('dask', 'dask')
+    dd = _import_optional('dask.dataframe', 'dask')
+
+    _check_duplicates(duplicates)
+    stats, data_freq, unit = _prepare(
+        ddf,
+        freq_method,
+        freq_tolerance,
+        scheduler,
+    )
+    plan = _to_plan(column_mapping)
+    tasks = []
+    for column in ddf.columns:
+        for check in plan.for_column(column).checks:
+            if (
+                    # missing timestamps are never values of the data
+                    check.func is missing_timestamps or
+                    (mask_checks is not None and check.name not in mask_checks)
+            ):
+                continue
+            elif not _is_shardable(check.func):
+                raise ValueError(
+                    f'the check {check.name!r} can\'t be applied per '
+                    f'partition, it has no registered report and lookback',
+                )
+            tasks.append(
+                _ShardTask(column, check.name, check.func, dict(check.kwargs)),
+            )
+
+    freq = None
+    lookback = timedelta(0)
+    aligned: list[pd.Timestamp | None] = []
+    if data_freq is not None and pd.Timedelta(data_freq) > pd.Timedelta(0):
+        freq = pd.Timedelta(data_freq)
+        lookback = max(
+            (_lookback(t.func, freq, t.kwargs) for t in tasks),
+            default=timedelta(0),
+        )
+        aligned = _aligned_starts(
+            ddf,
+            stats,
+            _origin(stats),
+            freq,
+            unit,
+            scheduler,
+        )
+    parts = ddf.to_delayed()
+    partitions = {
+        partition.pos: partition
+        for partition in _dask_partitions(stats, aligned, lookback, freq, unit)
+    }
+    origin = _origin(stats) if partitions else None
+    masks = []
+    for pos, part in enumerate(parts):
+        partition = partitions.get(pos)
+        if partition is None:
+            masks.append(dask.delayed(_empty_mask)(part))
+        else:
+            masks.append(
+                dask.delayed(_mask_partition)(
+                    _frame_parts(parts, partition),
+                    partition,
+                    origin,
+                    tasks,
+                    data_freq,
+                    freq_method,
+                    freq_tolerance,
+                    precision,
+                    duplicates,
+                ),
+            )
+    meta = pd.DataFrame(
+        {column: pd.Series(dtype=bool) for column in ddf.columns},
+        index=pd.DatetimeIndex(
+            [],
+            dtype=ddf.index.dtype,
+            name=ddf.index.name,
+        ),
+    )
+    return dd.from_delayed(masks, meta=meta, divisions=ddf.divisions)
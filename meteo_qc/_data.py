@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import importlib
 import pkgutil
 from collections import defaultdict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
 from typing import Any
 from typing import Callable
+from typing import Generator
+from typing import Literal
 from typing import NamedTuple
 from typing import TypedDict
 
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
 from meteo_qc import _plugins
 
 
@@ -25,6 +36,31 @@ class Result(NamedTuple):
     data: list[list[float]] | None = None
 
 
+DataFormat = Literal['rows', 'intervals']
+
+# the format of the data of the results, set by apply_qc for the duration
+# of a run
+_data_format: ContextVar[DataFormat] = ContextVar(
+    '_data_format',
+    default='rows',
+)
+
+
+def _check_data_format(data_format: DataFormat) -> None:
+    if data_format not in ('rows', 'intervals'):
+        raise ValueError(f'unknown data format: {data_format!r}')
+
+
+@contextmanager
+def _use_data_format(data_format: DataFormat) -> Generator[None, None, None]:
+    _check_data_format(data_format)
+    token = _data_format.set(data_format)
+    try:
+        yield
+    finally:
+        _data_format.reset(token)
+
+
 # TODO: this needs the series and variable number of kwargs
 FUNC_T = Callable[..., Result]
 
@@ -36,6 +72,36 @@ class FunctionInfo(TypedDict):
 
 FUNCS: dict[str, list[FunctionInfo]] = defaultdict(list)
 
+# takes the same arguments as the check it is registered for
+FLAG_FUNC_T = Callable[..., 'pd.Series[bool] | None']
+# takes the series, its flags and the arguments of the check
+REPORT_FUNC_T = Callable[..., Result]
+# takes the frequency of the data and the arguments of the check
+LOOKBACK_FUNC_T = Callable[..., timedelta]
+
+
+class FlagFunctionInfo(TypedDict):
+    flags: FLAG_FUNC_T
+    report: REPORT_FUNC_T | None
+    lookback: LOOKBACK_FUNC_T | None
+    cost: float
+
+
+FLAG_FUNCS: dict[FUNC_T, FlagFunctionInfo] = {}
+
+# takes one 2d array (timestamps x columns) of values per group and returns
+# the flags of the columns of the first group
+RULE_FUNC_T = Callable[..., 'npt.NDArray[np.bool_]']
+
+
+class ConsistencyRule(TypedDict):
+    func: RULE_FUNC_T
+    groups: tuple[str, ...]
+    msg: str
+
+
+CONSISTENCY_RULES: list[ConsistencyRule] = []
+
 
 def get_plugin_args() -> dict[str, dict[str, dict[str, Any]]]:
     """
@@ -59,7 +125,11 @@ def get_plugin_args() -> dict[str, dict[str, dict[str, Any]]]:
 
         {
             ...
-            'generic': {'missing_timestamps': {}, 'null_values': {}},
+            'generic': {
+                'missing_timestamps': {},
+                'duplicate_timestamps': {},
+                'null_values': {},
+            },
             'custom_group': {'custom_check': {'arg': 123}},
             ...
         }
@@ -131,6 +201,152 @@ def register(group: str, **kwargs: Any) -> Callable[[FUNC_T], FUNC_T]:
     return register_decorator
 
 
+def register_flags(
+        flag_func: FLAG_FUNC_T,
+        report: REPORT_FUNC_T | None = None,
+        lookback: LOOKBACK_FUNC_T | None = None,
+        cost: float = 1,
+) -> Callable[[FUNC_T], FUNC_T]:
+    """
+    A decorator for registering a function that computes the boolean flags of
+    a check function. The flags are used where the individual values are
+    needed instead of the :func:`meteo_qc.Result`, e.g. by
+    :func:`meteo_qc.summarize_qc`.
+
+    .. code-block:: python
+
+        import meteo_qc
+        import pandas as pd
+
+
+        def over_1000_flags(s: pd.Series) -> pd.Series:
+            return s.gt(1000)
+
+
+        @meteo_qc.register('generic')
+        @meteo_qc.register_flags(over_1000_flags)
+        def over_1000(s: pd.Series) -> meteo_qc.Result:
+            ...
+
+    :param flag_func: A function taking the same arguments as the check
+        function. It must return a boolean ``pandas.Series`` indexed by the
+        timestamps that were checked, being ``True`` where the check failed,
+        or ``None`` if the check could not be applied.
+    :param report: A function creating the :func:`meteo_qc.Result` of the
+        check from the series, the flags (``flags=``) and the arguments of the
+        check. Required to split the check into parts, e.g. by
+        :func:`meteo_qc.apply_qc_sharded`.
+    :param lookback: A function returning how far the check looks back in
+        time to flag a value, given the frequency of the data (``freq=``)
+        and the arguments of the check. E.g. ``timedelta(0)`` if every value
+        is checked on its own. Required to split the check into parts.
+    :param cost: The cost of the check relative to a check comparing every
+        value with a constant. Checks are applied in the order of their cost
+        (see :func:`meteo_qc.compile_plan`).
+    """
+    def register_flags_decorator(func: FUNC_T) -> FUNC_T:
+        FLAG_FUNCS[func] = FlagFunctionInfo(
+            flags=flag_func,
+            report=report,
+            lookback=lookback,
+            cost=cost,
+        )
+        return func
+    return register_flags_decorator
+
+
+def register_consistency(
+        *groups: str,
+        msg: str,
+) -> Callable[[RULE_FUNC_T], RULE_FUNC_T]:
+    """
+    A decorator for registering a rule comparing the columns of related
+    groups, applied by :func:`meteo_qc.consistency_check`. The rule is called
+    with one 2d ``numpy`` array per group, in the order of ``groups``, with
+    one row per timestamp and one column per column of the group. It returns
+    a boolean array of the shape of the first array, being ``True`` where the
+    values of the first group are not consistent with the others.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+
+        @meteo_qc.register_consistency(
+            'temperature_min',
+            'temperature',
+            msg='the minimum temperature exceeds the temperature',
+        )
+        def temperature_min_consistency(temperature_min, temperature):
+            return temperature_min > temperature
+
+    :param groups: the group whose columns are flagged, followed by the groups
+        compared with it
+    :param msg: the message of the :func:`meteo_qc.Result` of a column that
+        did not pass
+    """
+    def register_consistency_decorator(func: RULE_FUNC_T) -> RULE_FUNC_T:
+        CONSISTENCY_RULES.append(
+            ConsistencyRule(func=func, groups=groups, msg=msg),
+        )
+        return func
+    return register_consistency_decorator
+
+
+def _compute_flags(
+        func: FUNC_T,
+        s: pd.Series[float],
+        kwargs: Mapping[str, Any],
+) -> pd.Series[bool] | None:
+    flag_info = FLAG_FUNCS.get(func)
+    if flag_info is not None:
+        return flag_info['flags'](s, **kwargs)
+
+    # no flags registered, fall back to the timestamps (milliseconds) of the
+    # data that did not pass the check
+    assert isinstance(s.index, pd.DatetimeIndex)
+    return _result_flags(func(s, **kwargs), s.index)
+
+
+def _result_flags(
+        result: Result,
+        idx: pd.DatetimeIndex,
+) -> pd.Series[bool]:
+    if _data_format.get() == 'intervals':
+        # the rows of the index from the start to the end of each interval
+        # [start, end, n, value]. Timestamps that are not in the index, e.g.
+        # missing ones, can't be recovered from the intervals
+        bounds_ms = np.array(
+            [row[:2] for row in result.data or []],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        bounds = pd.to_datetime(bounds_ms.ravel(), unit='ms', utc=True)
+        bounds_i8 = bounds.as_unit(idx.unit).asi8.reshape(-1, 2)
+        start = np.searchsorted(idx.asi8, bounds_i8[:, 0], side='left')
+        n = np.searchsorted(idx.asi8, bounds_i8[:, 1], side='right') - start
+        offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        return pd.Series(
+            True,
+            index=idx[np.repeat(start, n) + offsets],
+            dtype=bool,
+        )
+
+    flagged = [row[0] for row in result.data or [] if row[-1] is not False]
+    flagged_idx = pd.to_datetime(flagged, unit='ms', utc=True)
+    return pd.Series(True, index=flagged_idx, dtype=bool)
+
+
+def _import_optional(name: str, extra: str) -> Any:
+    # the optional dependencies are installed using the extras of meteo-qc
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError(
+            f'{name.partition(".")[0]} is required, install it using: '
+            f'pip install meteo-qc[{extra}]',
+        ) from e
+
+
 def _import_plugins() -> None:
     # https://github.com/asottile/pyupgrade/blob/5c27928ee21db3e6ffa62bae714c6c74a9ad208d/pyupgrade/_data.py#L119
     plugins_path = _plugins.__path__
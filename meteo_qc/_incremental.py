@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import datetime
+from datetime import timedelta
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _check_data_format
+from meteo_qc._data import _result_flags
+from meteo_qc._data import _use_data_format
+from meteo_qc._data import DataFormat
+from meteo_qc._data import FLAG_FUNCS
+from meteo_qc._data import Result
+from meteo_qc._main import _new_final_result
+from meteo_qc._main import _report_duplicates
+from meteo_qc._main import _set_passed
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import apply_qc
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._main import FinalResult
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import PlannedCheck
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.values import _freq_cache
+from meteo_qc._plugins.values import _infer_index_freq
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+from meteo_qc._sharded import _is_shardable
+from meteo_qc._sharded import _lookback
+from meteo_qc._sharded import _to_i8
+
+TIME_T = Union[str, datetime, pd.Timestamp]
+
+
+def _merge_ranges(
+        ranges: list[tuple[pd.Timestamp, pd.Timestamp]],
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    merged: list[tuple[pd.Timestamp, pd.Timestamp]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _previous_flags(
+        result: Result,
+        index: pd.DatetimeIndex,
+        data_format: DataFormat,
+) -> pd.Series[bool] | None:
+    # the flags of the values that did not pass the check. None if the data
+    # is in another format than [timestamp, ..., True] rows or
+    # [start, end, n, value] intervals
+    if data_format == 'intervals':
+        return _previous_intervals(result, index)
+
+    rows = result.data or []
+    if not all(len(row) == 3 and row[-1] is True for row in rows):
+        return None
+    timestamps = pd.to_datetime(
+        np.array([row[0] for row in rows], dtype=np.int64),
+        unit='ms',
+        utc=True,
+    )
+    flagged = timestamps.tz_convert(index.tz).as_unit(index.unit)
+    return pd.Series(True, index=flagged, dtype=bool)
+
+
+def _previous_intervals(
+        result: Result,
+        index: pd.DatetimeIndex,
+) -> pd.Series[bool] | None:
+    rows = result.data or []
+    if not all(len(row) == 4 for row in rows):
+        return None
+    with _use_data_format('intervals'):
+        flagged = _result_flags(result, index).index
+    assert isinstance(flagged, pd.DatetimeIndex)
+    n = np.array([row[2] for row in rows], dtype=np.int64)
+    run_start = np.cumsum(n) - n
+    start_ms = np.array([row[0] for row in rows], dtype=np.int64)
+    start = pd.to_datetime(start_ms, unit='ms', utc=True).as_unit(index.unit)
+    if (
+            len(flagged) != n.sum() or
+            # every interval must be found with all its values. Values of
+            # the index the check was applied to that are not in the index of
+            # the data, e.g. missing ones, can't be recovered
+            np.any(np.searchsorted(flagged.asi8, start.asi8) != run_start)
+    ):
+        return None
+
+    # the flags of all values of the index, so the unflagged values between
+    # the runs separate them from the flags of the changed values
+    flagged_pos = np.searchsorted(index.asi8, flagged.asi8)
+    values = np.zeros(len(index), dtype=bool)
+    values[flagged_pos] = True
+    # the runs may have been separated by values that are not in the index,
+    # e.g. missing ones. Put an unflagged value before the value after every
+    # run, repeating its timestamp. If that value is changed, it is removed
+    # with it and the run can continue with the flags of the changed values
+    after_run = flagged_pos[run_start + n - 1] + 1
+    after_run = after_run[after_run < len(index)]
+    positions = np.insert(np.arange(len(index)), after_run, after_run)
+    return pd.Series(
+        np.insert(values, after_run, False),
+        index=index[positions],
+        dtype=bool,
+    )
+
+
+def _update_check(
+        s: pd.Series[float],
+        check: PlannedCheck,
+        previous: Result,
+        changed: list[tuple[pd.Timestamp, pd.Timestamp]],
+        freq: pd.Timedelta,
+        data_freq: str,
+        freq_key: tuple[FreqMethod, float],
+        data_format: DataFormat,
+) -> Result:
+    assert isinstance(s.index, pd.DatetimeIndex)
+    previous_flags = _previous_flags(previous, s.index, data_format)
+    if previous_flags is None or not _is_shardable(check.func):
+        return check.func(s, **check.kwargs)
+
+    flag_info = FLAG_FUNCS[check.func]
+    report = flag_info['report']
+    assert report is not None
+    unit = s.index.unit
+    idx_i8 = s.index.asi8
+    step = freq // pd.Timedelta(1, unit=unit)
+    lookback = pd.Timedelta(_lookback(check.func, freq, dict(check.kwargs)))
+    # the flags of a value only depend on the values up to lookback before it,
+    # a change affects the flags until lookback after it
+    affected = _merge_ranges([
+        (start, end + lookback) for start, end in changed
+    ])
+
+    # like the shards of apply_qc_sharded, the parts must start and end at
+    # timestamps aligned with the full index of all data
+    aligned = np.flatnonzero((idx_i8 - idx_i8[0]) % step == 0)
+    aligned_i8 = idx_i8[aligned]
+    keep_previous = np.ones(len(previous_flags), dtype=bool)
+    assert isinstance(previous_flags.index, pd.DatetimeIndex)
+    previous_i8 = previous_flags.index.asi8
+    pieces = []
+    for start, end in affected:
+        start_i8 = _to_i8(start, unit)
+        end_i8 = _to_i8(end, unit)
+        pos = int(np.searchsorted(aligned_i8, _to_i8(start - lookback, unit)))
+        part_start = int(aligned[max(pos - 1, 0)])
+        pos = int(np.searchsorted(aligned_i8, end_i8, side='left'))
+        part_stop = int(aligned[pos]) + 1 if pos < len(aligned) else len(s)
+
+        part = s.iloc[part_start:part_stop]
+        assert isinstance(part.index, pd.DatetimeIndex)
+        # the checks must use the frequency of all data, not of this part
+        _freq_cache(part.index)[freq_key] = data_freq
+        flags = flag_info['flags'](part, **check.kwargs)
+        if flags is None:
+            return check.func(s, **check.kwargs)
+        assert isinstance(flags.index, pd.DatetimeIndex)
+        flags_i8 = flags.index.asi8
+        flags_unit = flags.index.unit
+        pieces.append(
+            flags.iloc[
+                np.searchsorted(flags_i8, _to_i8(start, flags_unit)):
+                np.searchsorted(flags_i8, _to_i8(end, flags_unit), 'right')
+            ],
+        )
+        keep_previous &= (previous_i8 < start_i8) | (previous_i8 > end_i8)
+
+    pieces.append(previous_flags[keep_previous])
+    all_flags = pd.concat(pieces).sort_index(kind='stable')
+    return report(s, flags=all_flags, **check.kwargs)
+
+
+def update_qc(
+        previous: FinalResult,
+        df: DataFrameLike,
+        column_mapping: ColumnMapping | QCPlan,
+        changed: Sequence[tuple[TIME_T, TIME_T]],
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        data_format: DataFormat = 'rows',
+        duplicates: DuplicatePolicy = 'first',
+) -> FinalResult:
+    """
+    Update the result of :func:`meteo_qc.apply_qc` after parts of the data
+    were changed, e.g. corrected or backfilled. Only the flags of the values
+    that can be affected by the changes are computed again. These are the
+    values in the changed time ranges and after them, as far as the checks
+    look back in time (see ``lookback`` of :func:`meteo_qc.register_flags`),
+    e.g. the ``window`` of :func:`meteo_qc.persistence_check`. The flags of
+    all other values are taken from ``previous``.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        result = meteo_qc.apply_qc(df, column_mapping)
+        # correct some values on one day
+        df.loc['2022-03-01 10:00':'2022-03-01 12:00', 'temp'] = corrected
+        result = meteo_qc.update_qc(
+            result,
+            df,
+            column_mapping,
+            changed=[('2022-03-01 10:00', '2022-03-01 12:00')],
+        )
+
+    The result is the same as applying :func:`meteo_qc.apply_qc` to the
+    changed data. Checks without a registered ``report`` and ``lookback``,
+    checks whose ``data`` is not a list of ``[timestamp, ..., True]`` rows
+    or ``[start, end, n, value]`` intervals (e.g.
+    :func:`meteo_qc.missing_timestamps` reporting gaps) and checks missing
+    in ``previous`` are applied to all data. So are checks with intervals
+    including values that are not in the data, e.g. missing timestamps
+    flagged by :func:`meteo_qc.persistence_check`, since they can't be
+    recovered from the intervals. If the frequency of the data changed, the
+    quality control is applied to all data.
+
+    :param previous: the result of the quality control of the data before it
+        was changed, using the same column mapping and plugin arguments.
+    :param df: the entire changed DataFrame. This can also be an
+        arrow table, see :func:`meteo_qc.apply_qc`.
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns or a :func:`meteo_qc.QCPlan`.
+    :param changed: the time ranges ``(start, end)`` (both included) that
+        contain all changed, added or removed values. Timestamps without a
+        timezone are in the timezone of the index.
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param data_format: the format of the ``data`` of the results. See
+        :func:`meteo_qc.apply_qc`. Use the same format as for ``previous``.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied. See :func:`meteo_qc.apply_qc`. Use the same
+        policy as for ``previous``.
+
+    :returns: a :func:`meteo_qc.FinalResult`, see :func:`meteo_qc.apply_qc`.
+    """
+    _check_data_format(data_format)
+    df = _as_dataframe(df)
+    _validate_index(df)
+    df_original, df_sorted = _sort_and_resolve(df, duplicates)
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    plan = _to_plan(column_mapping)
+    data_freq = _infer_index_freq(
+        df_sorted.index,
+        method=freq_method,
+        tolerance=freq_tolerance,
+    )
+    freq = pd.Timedelta(0 if data_freq is None else data_freq)
+    if (
+            data_freq is None or
+            freq <= timedelta(0) or
+            data_freq != previous['data_freq']
+    ):
+        return apply_qc(
+            df,
+            plan,
+            freq_method=freq_method,
+            freq_tolerance=freq_tolerance,
+            data_format=data_format,
+            duplicates=duplicates,
+        )
+
+    changed_ts = []
+    for start, end in changed:
+        start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+        if start_ts.tzinfo is None:
+            start_ts = start_ts.tz_localize(df_sorted.index.tz)
+        if end_ts.tzinfo is None:
+            end_ts = end_ts.tz_localize(df_sorted.index.tz)
+        if end_ts < start_ts:
+            raise ValueError(
+                f'the changed time range ends before it starts: '
+                f'{start_ts} - {end_ts}',
+            )
+        changed_ts.append((start_ts, end_ts))
+
+    final_res = _new_final_result(df_sorted, data_freq=data_freq)
+    freq_key = (freq_method, freq_tolerance)
+    with (
+            _use_freq_options(freq_method, freq_tolerance),
+            _use_data_format(data_format),
+    ):
+        for column in df_sorted.columns:
+            column_plan = plan.for_column(column)
+            previous_col = previous['columns'].get(column)
+            previous_results = (
+                {} if previous_col is None else previous_col['results']
+            )
+            results = {}
+            for check in column_plan.checks:
+                previous_result = previous_results.get(check.name)
+                if previous_result is None:
+                    result = check.func(df_sorted[column], **check.kwargs)
+                elif not changed_ts:
+                    result = previous_result
+                else:
+                    result = _update_check(
+                        df_sorted[column],
+                        check,
+                        previous_result,
+                        changed_ts,
+                        freq=freq,
+                        data_freq=data_freq,
+                        freq_key=freq_key,
+                        data_format=data_format,
+                    )
+                results[check.name] = result
+            if df_sorted is not df_original:
+                _report_duplicates(
+                    df_original[column],
+                    column_plan,
+                    precision='float64',
+                    results=results,
+                )
+            final_res['columns'][column]['results'] = {
+                name: results[name] for name in column_plan.result_order
+            }
+
+    _set_passed(final_res)
+    return final_res
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import io
+from collections.abc import Sequence
+from typing import Any
+from typing import Literal
+
+import pandas as pd
+
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _import_optional
+from meteo_qc._data import FUNCS
+from meteo_qc._data import get_plugin_args
+from meteo_qc._main import FinalResult
+
+FileFormat = Literal['csv', 'parquet', 'arrow']
+# group, check, argument name and value
+PLUGIN_ARG_T = tuple[str, str, str, Any]
+# magic bytes of the arrow IPC file format, without them it's the stream format
+ARROW_MAGIC = b'ARROW1'
+
+
+def _with_datetime_index(
+        df: pd.DataFrame,
+        index_col: str | None,
+        tz: str,
+) -> pd.DataFrame:
+    if index_col is not None:
+        df = df.set_index(index_col)
+    elif not isinstance(df.index, pd.DatetimeIndex):
+        df = df.set_index(df.columns[0])
+
+    index = pd.DatetimeIndex(pd.to_datetime(df.index), name=df.index.name)
+    if index.tz is None:
+        index = index.tz_localize(tz)
+    df.index = index
+    return df
+
+
+def _read_arrow(data: bytes) -> pd.DataFrame:
+    pyarrow = _import_optional('pyarrow', 'arrow')
+    _import_optional('pyarrow.ipc', 'arrow')
+
+    buf = pyarrow.py_buffer(data)
+    if data.startswith(ARROW_MAGIC):
+        table = pyarrow.ipc.open_file(buf).read_all()
+    else:
+        table = pyarrow.ipc.open_stream(buf).read_all()
+    return table.to_pandas()
+
+
+def _read_payload(
+        data: bytes,
+        fmt: FileFormat,
+        index_col: str | None = None,
+        tz: str = 'UTC',
+) -> pd.DataFrame:
+    if fmt == 'csv':
+        df = pd.read_csv(io.BytesIO(data))
+    elif fmt == 'parquet':
+        df = pd.read_parquet(io.BytesIO(data))
+    elif fmt == 'arrow':
+        df = _read_arrow(data)
+    else:
+        raise ValueError(f'unknown format: {fmt!r}')
+    return _with_datetime_index(df, index_col=index_col, tz=tz)
+
+
+def _read_file(
+        path: str,
+        index_col: str | None = None,
+        tz: str = 'UTC',
+) -> pd.DataFrame:
+    if path.lower().endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    return _with_datetime_index(df, index_col=index_col, tz=tz)
+
+
+def _validate_column_mapping(
+        mapping: Any,
+        source: str,
+) -> dict[str, list[str]]:
+    if not isinstance(mapping, dict) or not all(
+        isinstance(groups, list) for groups in mapping.values()
+    ):
+        raise ValueError(
+            f'{source}: the column mapping must map column names to a list '
+            f'of groups',
+        )
+    for groups in mapping.values():
+        for group in groups:
+            if group not in FUNCS:
+                raise ValueError(f'{source}: unregistered group: {group!r}')
+    return mapping
+
+
+def _to_column_mapping(
+        df: pd.DataFrame,
+        mapping: dict[str, list[str]] | None,
+) -> ColumnMapping:
+    if mapping is None:
+        return ColumnMapping.autodetect_from_df(df)
+
+    column_mapping = ColumnMapping()
+    for column, groups in mapping.items():
+        for group in groups:
+            # the generic group is always applied
+            if group not in column_mapping[column]:
+                column_mapping[column].add_group(group)
+    return column_mapping
+
+
+def _set_plugin_args(overrides: Sequence[PLUGIN_ARG_T]) -> None:
+    plugin_args = get_plugin_args()
+    for group, check, arg, value in overrides:
+        plugin_args[group][check][arg] = value
+
+
+def _result_to_json(final_res: FinalResult) -> dict[str, Any]:
+    return {
+        **final_res,
+        'columns': {
+            column: {
+                'results': {
+                    name: result._asdict()
+                    for name, result in column_res['results'].items()
+                },
+                'passed': column_res['passed'],
+            }
+            for column, column_res in final_res['columns'].items()
+        },
+    }
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import contextlib
+from collections.abc import Generator
+from collections.abc import Iterator
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _check_data_format
+from meteo_qc._data import _use_data_format
+from meteo_qc._data import DataFormat
+from meteo_qc._main import _apply_column_plan
+from meteo_qc._main import _report_duplicates
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import ColumnResult
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._main import Precision
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import ColumnPlan
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.values import _freq_cache
+from meteo_qc._plugins.values import _infer_index_freq
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+from meteo_qc._shm import attach_frame
+from meteo_qc._shm import SharedFrame
+from meteo_qc._shm import SharedFrameSpec
+
+
+def _column_result(
+        s: pd.Series[float],
+        column_plan: ColumnPlan,
+        precision: Precision,
+) -> ColumnResult:
+    results = _apply_column_plan(s, column_plan, precision=precision)
+    return {
+        'results': results,
+        'passed': all(result.passed for result in results.values()),
+    }
+
+
+def _qc_shared_column(
+        spec: SharedFrameSpec,
+        column: str,
+        column_plan: ColumnPlan,
+        data_freq: str | None,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+        precision: Precision,
+        data_format: DataFormat,
+) -> ColumnResult:
+    with attach_frame(spec) as df:
+        assert isinstance(df.index, pd.DatetimeIndex)
+        # don't infer the frequency again in every worker
+        _freq_cache(df.index)[(freq_method, freq_tolerance)] = data_freq
+        with (
+                _use_freq_options(freq_method, freq_tolerance),
+                _use_data_format(data_format),
+        ):
+            column_res = _column_result(df[column], column_plan, precision)
+        del df
+        return column_res
+
+
+def _picklable(column_plan: ColumnPlan) -> ColumnPlan:
+    # the kwargs of a plan can't be pickled
+    return column_plan._replace(
+        checks=tuple(
+            check._replace(kwargs=dict(check.kwargs))
+            for check in column_plan.checks
+        ),
+    )
+
+
+class QCIterator(Iterator[tuple[str, ColumnResult]]):
+    """An iterator over the results of the quality control of each column,
+    returned by :func:`meteo_qc.iter_qc`. Besides the results, it has the
+    same keys as a :func:`meteo_qc.FinalResult` as attributes.
+
+    :param passed: did all columns yielded so far pass?
+    :param data_start_date: timestamp in milliseconds of the **start** date of
+        the provided input data
+    :param data_end_date: timestamp in milliseconds of the **end** date of the
+        provided input data.
+    :param data_freq: the frequency of the input data used by all checks
+    """
+
+    def __init__(
+            self,
+            results: Generator[tuple[str, ColumnResult], None, None],
+            data_start_date: int,
+            data_end_date: int,
+            data_freq: str | None,
+    ) -> None:
+        self._results = results
+        self.passed = True
+        self.data_start_date = data_start_date
+        self.data_end_date = data_end_date
+        self.data_freq = data_freq
+
+    def __next__(self) -> tuple[str, ColumnResult]:
+        column, column_res = next(self._results)
+        self.passed = self.passed and column_res['passed']
+        return column, column_res
+
+    def close(self) -> None:
+        """Stop the quality control of the remaining columns."""
+        self._results.close()
+
+
+def iter_qc(
+        df: DataFrameLike,
+        column_mapping: ColumnMapping | QCPlan,
+        max_workers: int = 1,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        precision: Precision = 'float64',
+        data_format: DataFormat = 'rows',
+        duplicates: DuplicatePolicy = 'first',
+) -> QCIterator:
+    """
+    Apply the quality control to a ``pandas.DataFrame`` column by column,
+    yielding the result of each column as soon as it is done instead of
+    collecting all of them in a :func:`meteo_qc.FinalResult`. The results
+    can hence be written out and freed one at a time.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        results = meteo_qc.iter_qc(df, column_mapping, max_workers=4)
+        for column, column_res in results:
+            write_result(column, column_res)
+
+        print(results.passed)
+
+    :param df: The DataFrame the quality control should be applied to. This
+        can also be an arrow table, see :func:`meteo_qc.apply_qc`.
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns or a :func:`meteo_qc.QCPlan`.
+    :param max_workers: the number of worker processes checking the columns
+        in parallel. The data is shared with the workers using shared memory
+        (see ``transport`` of :func:`meteo_qc.apply_qc_sharded`). With ``1``
+        the columns are checked in the calling process in their order,
+        otherwise the results are yielded in the order they are completed.
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param precision: the precision of the values the checks are applied to.
+        See :func:`meteo_qc.apply_qc`.
+    :param data_format: the format of the ``data`` of the results. See
+        :func:`meteo_qc.apply_qc`.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied. See :func:`meteo_qc.apply_qc`.
+
+    :returns: a :func:`meteo_qc.QCIterator` yielding tuples of the column
+        name and its results in the format of
+        ``FinalResult['columns'][column]``.
+    """
+    _check_data_format(data_format)
+    df = _as_dataframe(df)
+    _validate_index(df)
+    df_original, df_sorted = _sort_and_resolve(df, duplicates)
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    data_freq = _infer_index_freq(
+        df_sorted.index,
+        method=freq_method,
+        tolerance=freq_tolerance,
+    )
+    plan = _to_plan(column_mapping)
+
+    def _report(column: str, column_res: ColumnResult) -> ColumnResult:
+        if df_sorted is df_original:
+            return column_res
+        results = column_res['results']
+        with _use_data_format(data_format):
+            _report_duplicates(
+                df_original[column],
+                plan.for_column(column),
+                precision=precision,
+                results=results,
+            )
+        return {
+            'results': results,
+            'passed': all(result.passed for result in results.values()),
+        }
+
+    def _serial() -> Generator[tuple[str, ColumnResult], None, None]:
+        for column in df_sorted.columns:
+            with (
+                    _use_freq_options(freq_method, freq_tolerance),
+                    _use_data_format(data_format),
+            ):
+                column_res = _column_result(
+                    df_sorted[column],
+                    plan.for_column(column),
+                    precision=precision,
+                )
+            yield column, _report(column, column_res)
+
+    def _parallel() -> Generator[tuple[str, ColumnResult], None, None]:
+        with contextlib.ExitStack() as stack:
+            executor = stack.enter_context(
+                ProcessPoolExecutor(max_workers=max_workers),
+            )
+            shared = stack.enter_context(SharedFrame(df_sorted))
+            futures = {
+                executor.submit(
+                    _qc_shared_column,
+                    shared.spec,
+                    column,
+                    _picklable(plan.for_column(column)),
+                    data_freq,
+                    freq_method,
+                    freq_tolerance,
+                    precision,
+                    data_format,
+                ): column
+                for column in df_sorted.columns
+            }
+            try:
+                for future in as_completed(futures):
+                    column = futures[future]
+                    yield column, _report(column, future.result())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    return QCIterator(
+        _serial() if max_workers < 2 else _parallel(),
+        data_start_date=int(df_sorted.index[0].timestamp() * 1000),
+        data_end_date=int(df_sorted.index[-1].timestamp() * 1000),
+        data_freq=data_freq,
+    )
@@ -1,14 +1,38 @@
 from __future__ import annotations
 
 from collections import defaultdict
+from collections.abc import Collection
 from datetime import tzinfo
+from typing import Any
+from typing import Literal
 from typing import TypedDict
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
 from meteo_qc._colum_mapping import ColumnMapping
-from meteo_qc._data import FUNCS
+from meteo_qc._data import _result_flags
+from meteo_qc._data import _use_data_format
+from meteo_qc._data import DataFormat
+from meteo_qc._data import FLAG_FUNCS
 from meteo_qc._data import Result
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import ColumnPlan
+from meteo_qc._plan import PlannedCheck
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.generic import _duplicated
+from meteo_qc._plugins.generic import duplicate_timestamps
+from meteo_qc._plugins.generic import missing_timestamps
+from meteo_qc._plugins.values import _infer_index_freq
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+
+Precision = Literal['float64', 'float32']
+DataOutput = Literal['cleaned', 'mask']
+DuplicatePolicy = Literal['first', 'last', 'mean', 'flag']
 
 
 class ColumnResult(TypedDict):
@@ -16,7 +40,12 @@ class ColumnResult(TypedDict):
     passed: bool
 
 
-class FinalResult(TypedDict):
+class _DataOutputs(TypedDict, total=False):
+    cleaned: pd.DataFrame
+    mask: pd.DataFrame
+
+
+class FinalResult(_DataOutputs):
     """
     Final Result dictionary of the quality control.
 
@@ -28,24 +57,337 @@ class FinalResult(TypedDict):
         the provided input data
     :param data_end_date: timestamp in milliseconds of the **end** date of the
         provided input data.
+    :param data_freq: the frequency of the input data that was inferred using
+        :func:`meteo_qc.infer_freq` and used by all checks. ``None`` if it
+        could not be determined.
+    :param cleaned: only if requested using ``outputs`` of
+        :func:`meteo_qc.apply_qc`. The sorted data with the values that failed
+        the checks set to ``NaN``.
+    :param mask: only if requested using ``outputs`` of
+        :func:`meteo_qc.apply_qc`. A boolean ``pandas.DataFrame`` like the
+        sorted data, ``True`` where a value failed the checks. Unlike the
+        other keys, ``cleaned`` and ``mask`` are not json serializable.
     """
     columns: dict[str, ColumnResult]
     passed: bool
     data_start_date: int
     data_end_date: int
+    data_freq: str | None
+
+
+def _validate_index(df: pd.DataFrame) -> None:
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise TypeError(
+            f'the pandas.DataFrame index must be of type pandas.DatetimeIndex,'
+            f' not {type(df.index)}',
+        )
+    elif not isinstance(df.index.tzinfo, tzinfo):
+        raise TypeError('the pandas.DataFrame index must be timezone aware')
+
+
+def _resolve_duplicates(
+        df_sorted: pd.DataFrame,
+        policy: DuplicatePolicy,
+) -> pd.DataFrame:
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    duplicated = _duplicated(df_sorted.index)
+    if not duplicated.any():
+        return df_sorted
+
+    idx_i8 = df_sorted.index.asi8
+    new_ts = np.ones(len(idx_i8), dtype=bool)
+    new_ts[1:] = idx_i8[1:] != idx_i8[:-1]
+    if policy == 'last':
+        last_ts = np.append(new_ts[1:], True)
+        return df_sorted[last_ts]
+
+    starts = np.flatnonzero(new_ts)
+    resolved = df_sorted.iloc[starts]
+    if policy == 'mean':
+        for column in resolved.columns:
+            s = df_sorted[column]
+            if (
+                    not pd.api.types.is_numeric_dtype(s) or
+                    pd.api.types.is_bool_dtype(s)
+            ):
+                continue
+            values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            isnan = np.isnan(values)
+            # the mean of the values of each timestamp, ignoring NaNs
+            sums = np.add.reduceat(np.where(isnan, 0, values), starts)
+            counts = np.add.reduceat(~isnan, starts)
+            with np.errstate(invalid='ignore'):
+                resolved[column] = sums / counts
+    elif policy == 'flag':
+        # the values of duplicated timestamps are unknown
+        resolved = resolved.mask(
+            np.broadcast_to(duplicated[starts, None], resolved.shape),
+        )
+    return resolved
+
+
+def _check_duplicates(duplicates: DuplicatePolicy) -> None:
+    if duplicates not in ('first', 'last', 'mean', 'flag'):
+        raise ValueError(f'unknown duplicates policy: {duplicates!r}')
+
+
+def _sort_and_resolve(
+        df: pd.DataFrame,
+        duplicates: DuplicatePolicy,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    _check_duplicates(duplicates)
+    # sort the data by the DateTimeIndex, keeping the order of duplicates.
+    # The checks are applied to the resolved data, the duplicates are
+    # reported from the sorted data, see _report_duplicates
+    df_original = df.sort_index(kind='stable')
+    return df_original, _resolve_duplicates(df_original, duplicates)
+
+
+def _report_duplicates(
+        s: pd.Series[float],
+        column_plan: ColumnPlan,
+        precision: Precision,
+        results: dict[str, Result],
+) -> None:
+    # the duplicates were resolved before the checks were applied, they are
+    # reported from the original data
+    for check in column_plan.checks:
+        if check.func is duplicate_timestamps:
+            results[check.name] = check.func(
+                _with_precision(s, precision),
+                **check.kwargs,
+            )
+
+
+def _new_final_result(
+        df_sorted: pd.DataFrame,
+        data_freq: str | None,
+) -> FinalResult:
+    return {
+        'columns': defaultdict(
+            lambda: {'results': {}, 'passed': False},
+        ),
+        'passed': False,
+        'data_start_date': int(df_sorted.index[0].timestamp() * 1000),
+        'data_end_date': int(df_sorted.index[-1].timestamp() * 1000),
+        'data_freq': data_freq,
+    }
+
+
+def _set_passed(final_res: FinalResult) -> None:
+    for final_res_col in final_res['columns'].values():
+        # check if entire column passed
+        final_res_col['passed'] = all(
+            (i.passed for i in final_res_col['results'].values()),
+        )
+    # check if the entire QC failed
+    final_res['passed'] = all(
+        (i['passed'] for i in final_res['columns'].values()),
+    )
+
+
+def _with_precision(
+        s: pd.Series[float],
+        precision: Precision,
+) -> pd.Series[float]:
+    if (
+            precision == 'float32' and
+            s.dtype != np.float32 and
+            pd.api.types.is_numeric_dtype(s)
+    ):
+        return s.astype(np.float32)
+    return s
+
 
+def _apply_column_plan(
+        s: pd.Series[float],
+        column_plan: ColumnPlan,
+        precision: Precision,
+) -> dict[str, Result]:
+    s = _with_precision(s, precision)
+    results = {
+        check.name: check.func(s, **check.kwargs)
+        for check in column_plan.checks
+    }
+    return {name: results[name] for name in column_plan.result_order}
+
+
+def _check_with_flags(
+        s: pd.Series[float],
+        check: PlannedCheck,
+) -> tuple[Result, pd.Series[bool] | None]:
+    flag_info = FLAG_FUNCS.get(check.func)
+    if flag_info is None or flag_info['report'] is None:
+        result = check.func(s, **check.kwargs)
+        assert isinstance(s.index, pd.DatetimeIndex)
+        return result, _result_flags(result, s.index)
+
+    # the result is reported from the same flags, the check is applied once
+    flags = flag_info['flags'](s, **check.kwargs)
+    if flags is None:
+        return check.func(s, **check.kwargs), None
+    return flag_info['report'](s, flags=flags, **check.kwargs), flags
+
+
+def _flagged_positions(
+        idx: pd.DatetimeIndex,
+        flags: pd.Series[bool],
+) -> npt.NDArray[Any]:
+    flag_values = flags.to_numpy(dtype=bool)
+    if flags.index.is_(idx):
+        return flag_values
+
+    # e.g. the flags of the full index with missing timestamps added or the
+    # timestamps of Result.data
+    flagged = flags.index[flag_values]
+    assert isinstance(flagged, pd.DatetimeIndex)
+    flagged_i8 = flagged.asi8.view(f'M8[{flagged.unit}]').astype(
+        f'M8[{idx.unit}]',
+    ).view(np.int64)
+    start = np.searchsorted(idx.asi8, flagged_i8, side='left')
+    n = np.searchsorted(idx.asi8, flagged_i8, side='right') - start
+    # all rows of duplicated timestamps, none of timestamps not in the index
+    offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    return np.repeat(start, n) + offsets
+
+
+def _new_data_output(
+        s: pd.Series[float],
+        output: DataOutput,
+) -> npt.NDArray[Any]:
+    if output == 'mask':
+        return np.zeros(len(s), dtype=bool)
+    elif pd.api.types.is_numeric_dtype(s):
+        dtype = np.float32 if s.dtype == np.float32 else np.float64
+        return s.to_numpy(dtype=dtype, na_value=np.nan, copy=True)
+    else:
+        return s.to_numpy(dtype=object, copy=True)
+
+
+def _apply_column_plan_outputs(
+        s: pd.Series[float],
+        column_plan: ColumnPlan,
+        precision: Precision,
+        outputs: Collection[DataOutput],
+        mask_checks: Collection[str] | None,
+) -> tuple[dict[str, Result], dict[DataOutput, npt.NDArray[Any]]]:
+    assert isinstance(s.index, pd.DatetimeIndex)
+    # one array per output, the flags of the checks are written into them
+    data_outputs = {
+        output: _new_data_output(s, output) for output in outputs
+    }
+    fill_values = {'cleaned': np.nan, 'mask': True}
+    s_checked = _with_precision(s, precision)
+    results = {}
+    for check in column_plan.checks:
+        if (
+                # missing timestamps are never values of the data
+                check.func is missing_timestamps or
+                (mask_checks is not None and check.name not in mask_checks)
+        ):
+            results[check.name] = check.func(s_checked, **check.kwargs)
+            continue
+
+        results[check.name], flags = _check_with_flags(s_checked, check)
+        if flags is not None:
+            positions = _flagged_positions(s.index, flags)
+            for output, values in data_outputs.items():
+                values[positions] = fill_values[output]
+
+    results = {name: results[name] for name in column_plan.result_order}
+    return results, data_outputs
 
-def apply_qc(df: pd.DataFrame, column_mapping: ColumnMapping) -> FinalResult:
+
+def apply_qc(
+        df: DataFrameLike,
+        column_mapping: ColumnMapping | QCPlan,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        precision: Precision = 'float64',
+        outputs: Collection[DataOutput] = (),
+        mask_checks: Collection[str] | None = None,
+        data_format: DataFormat = 'rows',
+        duplicates: DuplicatePolicy = 'first',
+) -> FinalResult:
     """
-    Apply the quality control to a a ``pandas.DataFrame``.
+    Apply the quality control to a a ``pandas.DataFrame`` or an arrow table.
 
-    :param df: The DataFrame the quality control should be applied to
+    :param df: The DataFrame the quality control should be applied to. This
+        can also be a table implementing the arrow PyCapsule interface,
+        e.g. a ``pyarrow.Table`` or a ``polars.DataFrame``. Its first
+        column of timezone aware timestamps is used as the index.
+        Numeric columns without nulls are not copied.
     :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
         that assigns groups to columns. See :func:`meteo_qc.ColumnMapping` for
-        more information on how to create and customize one.
+        more information on how to create and customize one. This can also be
+        a :func:`meteo_qc.QCPlan` created by :func:`meteo_qc.compile_plan`.
+    :param freq_method: the method used to infer the frequency of the data.
+        ``'min'`` (the minimum difference between timestamps) or ``'mode'``
+        (the most common difference, robust against duplicated or jittered
+        timestamps). See :func:`meteo_qc.infer_freq`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param precision: ``'float32'`` applies the checks to the numeric columns
+        as ``float32`` one column at a time, halving the size of the arrays
+        the built-in checks compute from the values (e.g. the sorted values
+        or the changes). ``df`` is not converted, each ``float64`` column is
+        copied to ``float32`` while it is checked, so the data itself only
+        needs less memory if its columns already are ``float32``. ``float32``
+        values have a relative precision of ``2**-24`` (about ``6e-8``), e.g.
+        ``6e-5`` for a pressure of ``1013.3``. Hence values with a resolution of ``0.1`` stay distinct
+        below ``~800000``, so :func:`meteo_qc.persistence_check` compares them
+        exactly. A change between two values ``v`` compared with the
+        ``delta`` of :func:`meteo_qc.spike_dip_check` is only classified
+        differently than with ``'float64'`` if it is within ``|v| * 2**-23``
+        (``1.2e-4`` for a pressure of ``1013.3``) of the allowed change, e.g.
+        a change of exactly ``0.3`` with a ``delta`` of ``0.3 / min``. The
+        same applies to values within ``|v| * 2**-24`` of the bounds of
+        :func:`meteo_qc.range_check`. The values in the results are the
+        shortest decimal representation of the ``float32`` values.
+    :param outputs: also return the data without the values that failed the
+        checks (``'cleaned'``) and/or where values failed the checks
+        (``'mask'``) as ``pandas.DataFrame`` in the ``FinalResult`` (see
+        :func:`meteo_qc.FinalResult`). They are built from the flags of the
+        checks (see :func:`meteo_qc.register_flags`) allocating one array
+        per column, instead of parsing the ``data`` of the results.
+        Numeric columns of the cleaned data are ``float64`` (``float32``
+        columns stay ``float32``).
+    :param mask_checks: the names of the checks whose failing values are
+        masked, by default all checks.
+
+        .. code-block:: python
+
+            result = meteo_qc.apply_qc(
+                df,
+                column_mapping,
+                outputs=['cleaned'],
+                mask_checks=['range_check', 'spike_dip_check'],
+            )
+            cleaned = result['cleaned']
+
+    :param data_format: the format of the ``data`` of the results of the
+        built-in checks. ``'rows'`` lists every value that failed a check as
+        ``[timestamp, value, True]``. ``'intervals'`` lists runs of
+        consecutive values that failed a check (in the index the check was
+        applied to) as ``[start, end, n, value]`` with ``start`` and ``end``
+        being the first and last timestamp in milliseconds, ``n`` the number
+        of values and ``value`` the first value of the run. This is much
+        shorter for e.g. values stuck for hours. The intervals are computed
+        from the flags of the checks without creating the rows.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied, so every check gets a unique index.
+        ``'first'`` and ``'last'`` keep the first or last of the rows in the
+        order of ``df``, ``'mean'`` uses the mean of the values of numeric
+        columns (other columns keep the first value) and ``'flag'`` keeps one
+        row with the values set to ``NaN``, so they also fail
+        :func:`meteo_qc.null_values`. The duplicated rows are reported by
+        :func:`meteo_qc.duplicate_timestamps`. The ``outputs`` have one row
+        per timestamp.
 
     :returns: A result as json serializable dictionary to be rendered in a
-        an HTML template.
+        an HTML template. The ``cleaned`` and ``mask`` data requested using
+        ``outputs`` are ``pandas.DataFrame`` and not json serializable, they
+        must be removed before serializing the result.
 
         .. code-block:: python
 
@@ -61,6 +403,9 @@ def apply_qc(df: pd.DataFrame, column_mapping: ColumnMapping) -> FinalResult:
                                     msg="missing 1 timestamps (assumed frequency: 10min)",
                                     data=None,
                                 ),
+                                "duplicate_timestamps": Result(
+                                    function="duplicate_timestamps", passed=True, msg=None, data=None
+                                ),
                                 "null_values": Result(
                                     function="null_values",
                                     passed=False,
@@ -90,45 +435,67 @@ def apply_qc(df: pd.DataFrame, column_mapping: ColumnMapping) -> FinalResult:
                     ...
                 },
                 "data_end_date": 1641056400000,
+                "data_freq": "10min",
                 "data_start_date": 1641031200000,
                 "passed": False,
             }
     """  # noqa: E501
-    if not isinstance(df.index, pd.DatetimeIndex):
-        raise TypeError(
-            f'the pandas.DataFrame index must be of type pandas.DatetimeIndex,'
-            f' not {type(df.index)}',
-        )
-    elif not isinstance(df.index.tzinfo, tzinfo):
-        raise TypeError('the pandas.DataFrame index must be timezone aware')
-
-    final_res: FinalResult = {
-        'columns': defaultdict(
-            lambda: {'results': {}, 'passed': False},
-        ),
-        'passed': False,
-        'data_start_date': int(df.index.min().timestamp() * 1000),
-        'data_end_date': int(df.index.max().timestamp() * 1000),
-    }
-    # sort the data by the DateTimeIndex
-    df_sorted = df.sort_index()
-    for column in df_sorted.columns:
-        # all groups associated with this column
-        qc_types = column_mapping[column]
-        final_res_col = final_res['columns'][column]
-        for qc_type in qc_types:
-            # all functions registered for this group
-            registerd_funcs = FUNCS[qc_type]
-            for func in registerd_funcs:
-                call_result = func['func'](df_sorted[column], **func['kwargs'])
-                final_res_col['results'][func['func'].__name__] = call_result
-        # check if entire column passed
-        final_res_col['passed'] = all(
-            (i.passed for i in final_res_col['results'].values()),
-        )
-    # check if the entire QC failed
-    final_res['passed'] = all(
-        (i['passed'] for i in final_res['columns'].values()),
+    for output in outputs:
+        if output not in ('cleaned', 'mask'):
+            raise ValueError(f'unknown output: {output!r}')
+    df = _as_dataframe(df)
+    _validate_index(df)
+    df_original, df_sorted = _sort_and_resolve(df, duplicates)
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    # infer the frequency once, all checks get the memoized value
+    data_freq = _infer_index_freq(
+        df_sorted.index,
+        method=freq_method,
+        tolerance=freq_tolerance,
     )
+    plan = _to_plan(column_mapping)
+    final_res = _new_final_result(df_sorted, data_freq=data_freq)
+    columns_outputs: dict[DataOutput, dict[str, npt.NDArray[Any]]] = {
+        output: {} for output in outputs
+    }
+    with (
+            _use_freq_options(freq_method, freq_tolerance),
+            _use_data_format(data_format),
+    ):
+        for column in df_sorted.columns:
+            column_plan = plan.for_column(column)
+            if not outputs:
+                results = _apply_column_plan(
+                    df_sorted[column],
+                    column_plan,
+                    precision=precision,
+                )
+            else:
+                results, data_outputs = _apply_column_plan_outputs(
+                    df_sorted[column],
+                    column_plan,
+                    precision=precision,
+                    outputs=outputs,
+                    mask_checks=mask_checks,
+                )
+                for output, values in data_outputs.items():
+                    columns_outputs[output][column] = values
 
+            if df_sorted is not df_original:
+                _report_duplicates(
+                    df_original[column],
+                    column_plan,
+                    precision=precision,
+                    results=results,
+                )
+            final_res['columns'][column]['results'] = results
+
+    for output, columns in columns_outputs.items():
+        final_res[output] = pd.DataFrame(
+            columns,
+            index=df_sorted.index,
+            columns=df_sorted.columns,
+            copy=False,
+        )
+    _set_passed(final_res)
     return final_res
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any
+from typing import NamedTuple
+
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._colum_mapping import GroupList
+from meteo_qc._data import FLAG_FUNCS
+from meteo_qc._data import FUNC_T
+from meteo_qc._data import FUNCS
+
+# checks without registered flags are arbitrary functions, apply them last
+UNKNOWN_COST = 10.0
+
+PLUGIN_ARGS_T = Mapping[str, Mapping[str, Mapping[str, Any]]]
+
+
+class PlannedCheck(NamedTuple):
+    """
+    A check function of a :func:`meteo_qc.QCPlan` with its arguments.
+
+    :param name: the name of the check function and its result
+    :param func: the check function
+    :param kwargs: the (read-only) arguments the check function is called with
+    :param cost: the relative cost of the check (see
+        :func:`meteo_qc.register_flags`)
+    """
+    name: str
+    func: FUNC_T
+    kwargs: Mapping[str, Any]
+    cost: float
+
+
+class ColumnPlan(NamedTuple):
+    """
+    The checks applied to one column.
+
+    :param checks: the checks in the order they are applied, the cheapest
+        first
+    :param result_order: the names of the checks in the order of the results
+        of :func:`meteo_qc.apply_qc`
+    """
+    checks: tuple[PlannedCheck, ...]
+    result_order: tuple[str, ...]
+
+
+class QCPlan(NamedTuple):
+    """
+    An immutable plan of the checks applied to each column, created by
+    :func:`meteo_qc.compile_plan`.
+
+    :param columns: the :func:`meteo_qc.ColumnPlan` of each column of the
+        column mapping
+    :param default: the :func:`meteo_qc.ColumnPlan` of columns that are not
+        part of the column mapping
+    """
+    columns: Mapping[str, ColumnPlan]
+    default: ColumnPlan
+
+    def for_column(self, column: str) -> ColumnPlan:
+        """Get the :func:`meteo_qc.ColumnPlan` of a column."""
+        return self.columns.get(column, self.default)
+
+
+def _validate_plugin_args(plugin_args: PLUGIN_ARGS_T) -> None:
+    for group, checks in plugin_args.items():
+        if group not in FUNCS:
+            raise KeyError(f'unregistered group: {group!r}')
+        names = {i['func'].__name__ for i in FUNCS[group]}
+        for name in checks:
+            if name not in names:
+                raise KeyError(
+                    f'unregistered check for group {group!r}: {name!r}',
+                )
+
+
+def _cost(func: FUNC_T) -> float:
+    flag_info = FLAG_FUNCS.get(func)
+    return UNKNOWN_COST if flag_info is None else flag_info['cost']
+
+
+def _plan_column(
+        groups: Iterable[str],
+        plugin_args: PLUGIN_ARGS_T,
+) -> ColumnPlan:
+    # a check registered for multiple groups of a column is only applied once
+    # with the arguments of the last group, but keeps the position of the
+    # first one in the results
+    checks: dict[str, PlannedCheck] = {}
+    for group in groups:
+        for func in FUNCS[group]:
+            name = func['func'].__name__
+            kwargs = {
+                **func['kwargs'],
+                **plugin_args.get(group, {}).get(name, {}),
+            }
+            checks[name] = PlannedCheck(
+                name=name,
+                func=func['func'],
+                kwargs=MappingProxyType(kwargs),
+                cost=_cost(func['func']),
+            )
+    return ColumnPlan(
+        checks=tuple(sorted(checks.values(), key=lambda c: c.cost)),
+        result_order=tuple(checks),
+    )
+
+
+def compile_plan(
+        column_mapping: ColumnMapping,
+        plugin_args: PLUGIN_ARGS_T | None = None,
+) -> QCPlan:
+    """
+    Compile a :func:`meteo_qc.ColumnMapping` into a :func:`meteo_qc.QCPlan`,
+    which can be passed to :func:`meteo_qc.apply_qc` instead of the column
+    mapping. The plan can be reused for many DataFrames, the groups of each
+    column and the arguments of the checks are only resolved once.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        column_mapping = meteo_qc.ColumnMapping()
+        column_mapping['temp'].add_group('temperature')
+        column_mapping['temp'].add_group('dew_point')
+
+        plan = meteo_qc.compile_plan(
+            column_mapping,
+            plugin_args={'temperature': {'range_check': {'upper_bound': 45}}},
+        )
+        for df in dfs:
+            result = meteo_qc.apply_qc(df, plan)
+
+    A check registered for multiple groups of a column is applied only once
+    using the arguments of the last group, producing the same result as
+    applying it for every group. The checks are applied in the order of their
+    cost (see :func:`meteo_qc.register_flags`), the order of the results is
+    not changed.
+
+    The arguments of the checks are copied when compiling the plan. Later
+    changes via :func:`meteo_qc.get_plugin_args` do not change the plan.
+
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns.
+    :param plugin_args: arguments overriding the registered ones, in the same
+        format as returned by :func:`meteo_qc.get_plugin_args`. Only the
+        arguments that should be changed need to be specified.
+
+    :returns: an immutable :func:`meteo_qc.QCPlan`
+    """
+    if plugin_args is None:
+        plugin_args = {}
+    _validate_plugin_args(plugin_args)
+    columns = {
+        column: _plan_column(column_mapping[column], plugin_args)
+        for column in column_mapping
+    }
+    return QCPlan(
+        columns=MappingProxyType(columns),
+        default=_plan_column(GroupList(), plugin_args),
+    )
+
+
+def _to_plan(column_mapping: ColumnMapping | QCPlan) -> QCPlan:
+    if isinstance(column_mapping, QCPlan):
+        return column_mapping
+    else:
+        return compile_plan(column_mapping)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+
+from meteo_qc._data import register_consistency
+
+
+@register_consistency(
+    'dew_point',
+    'temperature',
+    msg='the dew point exceeds the temperature',
+)
+def dew_point_consistency(
+        dew_point: npt.NDArray[np.float64],
+        temperature: npt.NDArray[np.float64],
+) -> npt.NDArray[np.bool_]:
+    # comparisons with NaN are False
+    return dew_point > temperature
+
+
+@register_consistency(
+    'winddirection',
+    'windspeed',
+    msg='the wind direction changes while the wind speed is 0',
+)
+def calm_wind_consistency(
+        winddirection: npt.NDArray[np.float64],
+        windspeed: npt.NDArray[np.float64],
+) -> npt.NDArray[np.bool_]:
+    # during calm the direction must be undefined (NaN) or static. The
+    # direction may change when the wind dies down, so the previous value
+    # must be calm as well
+    previous = np.full_like(winddirection, np.nan)
+    previous[1:] = winddirection[:-1]
+    previous_calm = np.zeros(windspeed.shape, dtype=bool)
+    previous_calm[1:] = windspeed[:-1] == 0
+    return (
+        (windspeed == 0) &
+        previous_calm &
+        ~np.isnan(winddirection) &
+        ~np.isnan(previous) &
+        (winddirection != previous)
+    )
@@ -1,80 +1,297 @@
 from __future__ import annotations
 
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
 from meteo_qc._data import register
+from meteo_qc._data import register_flags
 from meteo_qc._data import Result
+from meteo_qc._plugins.values import _flagged_rows
+from meteo_qc._plugins.values import _no_lookback
+from meteo_qc._plugins.values import _to_ms
 from meteo_qc._plugins.values import infer_freq
 
 
-@register('generic')
-def missing_timestamps(s: pd.Series[float]) -> Result:
+def _merge_gaps(
+        gap_start: npt.NDArray[np.int64],
+        n_missing: npt.NDArray[np.int64],
+        step: int,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    # gaps directly following each other, e.g. only separated by timestamps
+    # that are not part of the full index, are one gap
+    new_gap = np.ones(len(gap_start), dtype=bool)
+    new_gap[1:] = gap_start[1:] != gap_start[:-1] + n_missing[:-1] * step
+    if not new_gap.all():
+        n_missing = np.add.reduceat(n_missing, np.flatnonzero(new_gap))
+        gap_start = gap_start[new_gap]
+    return gap_start, n_missing
+
+
+def _gaps(
+        idx: pd.DatetimeIndex,
+        freq: str,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], int]:
+    # work on the integer representation of the index in its own unit. A
+    # timestamp is expected at every ``start + k * step``. Returns the first
+    # missing timestamp of each gap, the number missing and the step.
+    step = pd.Timedelta(freq) // pd.Timedelta(1, unit=idx.unit)
+    idx_i8 = idx.asi8
+    start = idx_i8[0]
+    gap_pos = np.flatnonzero(np.diff(idx_i8) > step)
+    # the first and last expected timestamp strictly between the two
+    # observations enclosing the gap
+    first = (idx_i8[gap_pos] - start) // step + 1
+    last = (idx_i8[gap_pos + 1] - start - 1) // step
+    n_missing = last - first + 1
+    has_missing = n_missing > 0
+    gap_start, n_missing = _merge_gaps(
+        start + first[has_missing] * step,
+        n_missing[has_missing],
+        step=step,
+    )
+    return gap_start, n_missing, step
+
+
+def _gap_rows(
+        gap_start: npt.NDArray[np.int64],
+        n_missing: npt.NDArray[np.int64],
+        step: int,
+        unit: str,
+) -> tuple[int, list[list[Any]]]:
+    gap_end = gap_start + (n_missing - 1) * step
+    data = np.column_stack((
+        _to_ms(gap_start, unit=unit),
+        _to_ms(gap_end, unit=unit),
+        n_missing,
+    )).tolist()
+    return int(n_missing.sum()), data
+
+
+def _missing_gaps(
+        idx: pd.DatetimeIndex,
+        freq: str,
+) -> tuple[int, list[list[Any]]]:
+    gap_start, n_missing, step = _gaps(idx, freq=freq)
+    return _gap_rows(gap_start, n_missing, step=step, unit=idx.unit)
+
+
+def _missing_index(idx: pd.DatetimeIndex, freq: str) -> pd.DatetimeIndex:
+    gap_start, n_missing, step = _gaps(idx, freq=freq)
+    # expand the gaps to every missing timestamp
+    offsets = np.arange(n_missing.sum()) - np.repeat(
+        np.cumsum(n_missing) - n_missing,
+        n_missing,
+    )
+    missing = np.repeat(gap_start, n_missing) + offsets * step
+    return pd.DatetimeIndex(
+        missing.astype(f'M8[{idx.unit}]'),
+        tz='UTC',
+    ).tz_convert(idx.tz)
+
+
+def _missing_flags(
+        s: pd.Series[float],
+        per_row: bool = False,
+) -> pd.Series[bool] | None:
+    # flag functions are called with the arguments of the check. per_row only
+    # changes how the missing timestamps are reported, not which are flagged
     assert isinstance(s.index, pd.DatetimeIndex)
     freq = infer_freq(s)
+    if freq is None:
+        return None
+
+    missing_idx = _missing_index(s.index, freq=freq)
+    return pd.Series(True, index=missing_idx, name='flag', dtype=bool)
+
+
+def _missing_rows(missing: pd.DatetimeIndex) -> tuple[int, list[list[Any]]]:
+    # a missing timestamp has no value
+    data = [[i, None] for i in _to_ms(missing.asi8, missing.unit).tolist()]
+    return len(missing), data
+
+
+def _missing_result(
+        nr_missing: int,
+        freq: str | None,
+        data: list[list[Any]],
+) -> Result:
     if freq is None:
         return Result(
             function=missing_timestamps.__name__,
             passed=False,
             msg='cannot determine temporal resolution frequency',
         )
-
-    df = s.to_frame()
-    if df.index.name is None:
-        date_name = 'index'
-    else:
-        date_name = df.index.name
-
-    full_idx = pd.date_range(
-        df.index.min(),
-        df.index.max(),
-        freq=freq,
-        name=date_name,
-    )
-
-    nr_missing = len(full_idx) - len(s.index)
-    # get the rows that were missing
-    timestamps_missing = full_idx.difference(s.index)
-
-    df = df.reindex(full_idx).loc[timestamps_missing].reset_index()
-    # timestamp to milliseconds
-    df[date_name] = df[date_name].dt.as_unit('ms').astype(int)
-    # replace NaNs with NULLs, since json tokenizing can't handle them
-    df = df.replace([float('nan')], [None])
-    if nr_missing > 0:
+    elif nr_missing > 0:
         return Result(
             function=missing_timestamps.__name__,
             passed=False,
             msg=(
                 f'missing {nr_missing} timestamps (assumed frequency: {freq})'
             ),
-            data=df.values.tolist(),
+            data=data,
         )
     else:
         return Result(function=missing_timestamps.__name__, passed=True)
 
 
+def _missing_report(
+        s: pd.Series[float],
+        flags: pd.Series[bool] | None,
+        per_row: bool = False,
+) -> Result:
+    # the flags may be put together from parts of the data, the report is
+    # built from the flagged timestamps only
+    assert isinstance(s.index, pd.DatetimeIndex)
+    freq = infer_freq(s)
+    if flags is None or freq is None:
+        return _missing_result(0, freq=None, data=[])
+
+    missing = flags.index[flags.to_numpy()]
+    assert isinstance(missing, pd.DatetimeIndex)
+    if per_row:
+        nr_missing, data = _missing_rows(missing)
+    else:
+        # every missing timestamp is a gap of its own, until merged
+        step = pd.Timedelta(freq) // pd.Timedelta(1, unit=missing.unit)
+        gap_start, n_missing = _merge_gaps(
+            missing.asi8,
+            np.ones(len(missing), dtype=np.int64),
+            step=step,
+        )
+        nr_missing, data = _gap_rows(
+            gap_start,
+            n_missing,
+            step=step,
+            unit=missing.unit,
+        )
+    return _missing_result(nr_missing, freq=freq, data=data)
+
+
 @register('generic')
-def null_values(s: pd.Series[float]) -> Result:
-    df = s.to_frame()
-    df['flag'] = s.isnull()
-    null_vals = sum(df['flag'])
+@register_flags(
+    _missing_flags,
+    report=_missing_report,
+    lookback=_no_lookback,
+    cost=2,
+)
+def missing_timestamps(s: pd.Series[float], per_row: bool = False) -> Result:
+    """
+    A check function checking if timestamps are missing in the
+    :func:`pd.DateTimeIndex` of ``s``, based on the frequency inferred via
+    :func:`meteo_qc.infer_freq`.
+
+    By default the missing timestamps are reported as gaps, one row per gap
+    as ``[gap_start, gap_end, n_missing]`` with ``gap_start`` and ``gap_end``
+    being the first and last missing timestamp in milliseconds. The gaps are
+    found from the differences of the (sorted) index, without constructing the
+    full index.
+
+    :param s: the :func:`pd.Series` to be checked
+    :param per_row: report every missing timestamp as its own row
+        ``[timestamp, None]`` instead of one row per gap. This creates a row
+        for every missing timestamp and should be avoided for long outages.
+
+    :returns: a :func:`meteo_qc.Result` object containing the outcome of the
+        applied check.
+    """
+    assert isinstance(s.index, pd.DatetimeIndex)
+    freq = infer_freq(s)
+    if freq is None:
+        return _missing_result(0, freq=None, data=[])
+
+    if per_row:
+        nr_missing, data = _missing_rows(_missing_index(s.index, freq=freq))
+    else:
+        nr_missing, data = _missing_gaps(s.index, freq=freq)
 
-    if df.index.name is None:
-        date_name = 'index'
+    return _missing_result(nr_missing, freq=freq, data=data)
+
+
+def _duplicated(idx: pd.DatetimeIndex) -> npt.NDArray[np.bool_]:
+    # all rows of timestamps occurring more than once in the sorted index,
+    # found in one pass over its integer representation
+    idx_i8 = idx.asi8
+    same = idx_i8[1:] == idx_i8[:-1]
+    duplicated = np.zeros(len(idx_i8), dtype=bool)
+    duplicated[1:] = same
+    duplicated[:-1] |= same
+    return duplicated
+
+
+def _duplicate_flags(s: pd.Series[float]) -> pd.Series[bool]:
+    assert isinstance(s.index, pd.DatetimeIndex)
+    return pd.Series(_duplicated(s.index), index=s.index, name='flag')
+
+
+def _duplicate_report(s: pd.Series[float], flags: pd.Series[bool]) -> Result:
+    flag_values = flags.to_numpy(dtype=bool)
+    if flag_values.any():
+        assert isinstance(flags.index, pd.DatetimeIndex)
+        duplicated_i8 = flags.index.asi8[flag_values]
+        nr_duplicated = 1 + int(np.count_nonzero(np.diff(duplicated_i8)))
+        return Result(
+            function=duplicate_timestamps.__name__,
+            passed=False,
+            msg=f'found {nr_duplicated} duplicated timestamps',
+            data=_flagged_rows(s, flags),
+        )
     else:
-        date_name = df.index.name
+        return Result(function=duplicate_timestamps.__name__, passed=True)
+
+
+@register('generic')
+@register_flags(
+    _duplicate_flags,
+    report=_duplicate_report,
+    lookback=_no_lookback,
+)
+def duplicate_timestamps(s: pd.Series[float]) -> Result:
+    """
+    A check function checking if timestamps occur more than once in the
+    (sorted) :func:`pd.DateTimeIndex` of ``s``, e.g. after a restart of the
+    logger. Every row of a duplicated timestamp is reported.
+
+    :func:`meteo_qc.apply_qc` resolves the duplicates before applying the
+    other checks (see ``duplicates``) and reports them using this check.
+
+    :param s: the :func:`pd.Series` to be checked
+
+    :returns: a :func:`meteo_qc.Result` object containing the outcome of the
+        applied check.
+    """
+    return _duplicate_report(s, flags=_duplicate_flags(s))
+
 
-    df = df.reset_index()
-    # timestamp to milliseconds
-    df[date_name] = df[date_name].dt.as_unit('ms').astype(int)
-    # replace NaNs with NULLs, since json tokenizing can't handle them
-    df = df.replace([float('nan')], [None])
+def _null_flags(s: pd.Series[float]) -> pd.Series[bool]:
+    return pd.Series(s.isnull().to_numpy(), index=s.index, name='flag')
+
+
+def _null_report(s: pd.Series[float], flags: pd.Series[bool]) -> Result:
+    null_vals = int(flags.sum())
     if null_vals > 0:
         return Result(
             function=null_values.__name__,
             passed=False,
             msg=f'found {null_vals} values that are null',
-            data=df[df['flag'] == True].values.tolist(),  # noqa: E712
+            data=_flagged_rows(s, flags),
         )
     else:
         return Result(function=null_values.__name__, passed=True)
+
+
+@register('generic')
+@register_flags(_null_flags, report=_null_report, lookback=_no_lookback)
+def null_values(s: pd.Series[float]) -> Result:
+    """
+    A check function checking if values in the :func:`pd.Series` ``s`` are
+    null (``NaN`` or ``None``).
+
+    :param s: the :func:`pd.Series` to be checked
+
+    :returns: a :func:`meteo_qc.Result` object containing the outcome of the
+        applied check.
+    """
+    return _null_report(s, flags=_null_flags(s))
@@ -1,33 +1,192 @@
 from __future__ import annotations
 
-import math
+import weakref
+from collections.abc import Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import timedelta
+from typing import Any
+from typing import Generator
+from typing import Literal
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
+from meteo_qc._data import _data_format
 from meteo_qc._data import register
+from meteo_qc._data import register_flags
 from meteo_qc._data import Result
 
 pd.options.mode.chained_assignment = None
 
 
-def infer_freq(s: pd.Series[float]) -> str | None:
-    """Infer the frequency of a :func:`pd.DateTimeIndex` by copying the dates
-        and shifting them by one timestamp then subtracting the dates from each
-        other taking the minimum.
+FreqMethod = Literal['min', 'mode']
+# scales the median absolute deviation to the standard deviation of a normal
+# distribution
+MAD_SCALE = 1.4826
+# the number of values of the windows of robust_outlier_check processed at once
+_CHUNK_SIZE = 4_000_000
+# the periods of the bounds tables of seasonal_range_check and their lengths
+SeasonalPeriod = Literal['month', 'dayofyear', 'hour']
+_PERIOD_LENGTHS: dict[SeasonalPeriod, int] = {
+    'month': 12,
+    'dayofyear': 366,
+    'hour': 24,
+}
+
+# the method (and tolerance) used when infer_freq is called without specifying
+# one. This is set by apply_qc for the duration of a run, so all checks use
+# the same frequency.
+_freq_options: ContextVar[tuple[FreqMethod, float]] = ContextVar(
+    '_freq_options',
+    default=('min', 0.05),
+)
+# memoized frequencies per index. Indexes are not hashable, hence we keep a
+# short list of weak references and compare using Index.is_ which is also
+# True for views of the same index e.g. the index of df[column].
+_FREQ_CACHE_SIZE = 16
+_FREQ_CACHE: list[
+    tuple[
+        weakref.ReferenceType[pd.DatetimeIndex],
+        dict[tuple[FreqMethod, float], str | None],
+    ]
+] = []
+
+
+@contextmanager
+def _use_freq_options(
+        method: FreqMethod,
+        tolerance: float,
+) -> Generator[None, None, None]:
+    token = _freq_options.set((method, tolerance))
+    try:
+        yield
+    finally:
+        _freq_options.reset(token)
+
+
+def _freq_cache(
+        idx: pd.DatetimeIndex,
+) -> dict[tuple[FreqMethod, float], str | None]:
+    for ref, idx_cache in _FREQ_CACHE:
+        cached_idx = ref()
+        if cached_idx is not None and cached_idx.is_(idx):
+            return idx_cache
+
+    _FREQ_CACHE[:] = [i for i in _FREQ_CACHE if i[0]() is not None]
+    del _FREQ_CACHE[:-_FREQ_CACHE_SIZE + 1]
+    cache: dict[tuple[FreqMethod, float], str | None] = {}
+    _FREQ_CACHE.append((weakref.ref(idx), cache))
+    return cache
+
+
+def infer_freq(
+        s: pd.Series[float],
+        method: FreqMethod | None = None,
+        tolerance: float | None = None,
+) -> str | None:
+    """Infer the frequency of a :func:`pd.DateTimeIndex` from the differences
+        between consecutive timestamps.
+
+        The result is memoized per index, so calling this for every check and
+        every column of the same ``pandas.DataFrame`` only computes it once.
 
         :param s: a :func:`pd.Series` with a :func:`pd.DateTimeIndex`.
+        :param method: how to derive the frequency from the differences.
+            ``'min'`` takes the minimum difference. ``'mode'`` takes the most
+            common difference, counting differences within ``tolerance`` of it
+            as the same. This is robust against single duplicated or jittered
+            timestamps. Duplicated timestamps are ignored. If not specified,
+            the method :func:`meteo_qc.apply_qc` was called with is used,
+            outside of it ``'min'``.
+        :param tolerance: relative tolerance used by the ``'mode'`` method
+            e.g. ``0.05`` counts differences of ``9min 31s`` to ``10min 29s``
+            towards ``10min``.
 
         :returns: if the series is too short (< 3) ``None`` since the frequency
             cannot be inferred. Else a ``freqstr`` e.g. ``10min``.
     """
+    assert isinstance(s.index, pd.DatetimeIndex)
+    default_method, default_tolerance = _freq_options.get()
+    if method is None:
+        method = default_method
+    if tolerance is None:
+        tolerance = default_tolerance
+    return _infer_index_freq(s.index, method=method, tolerance=tolerance)
+
+
+def _infer_index_freq(
+        idx: pd.DatetimeIndex,
+        method: FreqMethod,
+        tolerance: float,
+) -> str | None:
+    cache = _freq_cache(idx)
+    key = (method, tolerance)
+    if key not in cache:
+        cache[key] = _compute_freq(idx, method=method, tolerance=tolerance)
+    return cache[key]
+
+
+def _compute_freq(
+        idx: pd.DatetimeIndex,
+        method: FreqMethod,
+        tolerance: float,
+) -> str | None:
     # pd.infer_freq is not working with values missing. Instead compute the
-    # minimum frequency
-    # shift the (sorted) index by one
-    if len(s) < 3:
+    # differences on the integer representation of the (sorted) index
+    if len(idx) < 3:
         return None
-    idx_diff = s.index[1:] - s.index[:-1]
-    offset = pd.tseries.frequencies.to_offset(idx_diff.min())
+    idx_diff = np.diff(idx.asi8)
+    if method == 'min':
+        diffs = idx_diff.min(keepdims=True)
+        counts = np.ones(1, dtype=np.int64)
+    elif method == 'mode':
+        diffs, counts = np.unique(idx_diff, return_counts=True)
+    else:
+        raise ValueError(f'unknown frequency inference method: {method!r}')
+    return _freq_from_diffs(
+        diffs,
+        counts,
+        method=method,
+        tolerance=tolerance,
+        unit=idx.unit,
+    )
+
+
+def _freq_from_diffs(
+        diffs: npt.NDArray[np.int64],
+        counts: npt.NDArray[np.int64],
+        method: FreqMethod,
+        tolerance: float,
+        unit: str,
+) -> str | None:
+    # the sorted distinct differences between the timestamps and how often
+    # each of them occurs
+    if method == 'min':
+        diff = diffs[0]
+    elif method == 'mode':
+        positive = diffs > 0
+        diffs = diffs[positive]
+        counts = counts[positive]
+        if len(diffs) == 0:
+            return None
+        # number of differences within the tolerance of each distinct one
+        cum_counts = np.concatenate(([0], np.cumsum(counts)))
+        lower = np.searchsorted(diffs, diffs * (1 - tolerance), side='left')
+        upper = np.searchsorted(diffs, diffs * (1 + tolerance), side='right')
+        support = cum_counts[upper] - cum_counts[lower]
+        # most support wins, then the most frequent, then the smallest. The
+        # median of all differences supporting it is the frequency
+        best = np.lexsort((-diffs, counts, support))[-1]
+        median_pos = cum_counts[lower[best]] + (support[best] - 1) // 2
+        diff = diffs[np.searchsorted(cum_counts, median_pos, side='right') - 1]
+    else:
+        raise ValueError(f'unknown frequency inference method: {method!r}')
+
+    offset = pd.tseries.frequencies.to_offset(
+        pd.Timedelta(np.int64(diff).astype(f'm8[{unit}]')),
+    )
     freq = None
     if offset is not None:  # pragma no branch
         freq = offset.freqstr
@@ -38,61 +197,307 @@ def infer_freq(s: pd.Series[float]) -> str | None:
     return freq
 
 
-def _has_spikes_or_dip(
+def _to_ms(
+        values: npt.NDArray[np.int64],
+        unit: str,
+) -> npt.NDArray[np.int64]:
+    return values.astype(f'M8[{unit}]').astype('M8[ms]').astype(np.int64)
+
+
+def _json_values(values: pd.Series[Any]) -> list[Any]:
+    if values.dtype == np.float32:
+        # the shortest representation of the float32 values, e.g. 1013.3
+        # instead of 1013.2999877929688
+        values = values.astype(str).astype(np.float64)
+    # replace NaNs with NULLs, since json tokenizing can't handle them
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _flagged_intervals(
         s: pd.Series[float],
-        delta: float,
-) -> tuple[bool, pd.DataFrame]:
+        flags: pd.Series[bool],
+) -> list[list[Any]]:
+    assert isinstance(flags.index, pd.DatetimeIndex)
+    # the runs of consecutive flagged rows, without expanding them to rows
+    padded = np.zeros(len(flags) + 2, dtype=bool)
+    padded[1:-1] = flags.to_numpy(dtype=bool)
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts = edges[::2]
+    stops = edges[1::2]
+    flags_i8 = flags.index.asi8
+    start_ms = _to_ms(flags_i8[starts], unit=flags.index.unit)
+    end_ms = _to_ms(flags_i8[stops - 1], unit=flags.index.unit)
+    # the value of the first row represents the interval
+    if flags.index.is_(s.index):
+        values = s.iloc[starts]
+    else:
+        # the check was applied to a different index e.g. the full index
+        # with missing timestamps added
+        values = s.reindex(flags.index[starts])
+    return [
+        list(row)
+        for row in zip(
+            start_ms.tolist(),
+            end_ms.tolist(),
+            (stops - starts).tolist(),
+            _json_values(values),
+        )
+    ]
+
+
+def _flagged_rows(
+        s: pd.Series[float],
+        flags: pd.Series[bool],
+) -> list[list[Any]]:
+    if _data_format.get() == 'intervals':
+        return _flagged_intervals(s, flags)
+
+    if not flags.index.is_(s.index):
+        # the check was applied to a different index e.g. the full index
+        # with missing timestamps added
+        s = s.reindex(flags.index)
     df = s.to_frame()
+    df['flag'] = flags.to_numpy()
+    df = df[df['flag']]
+    if s.dtype == np.float32:
+        # the shortest representation of the float32 values, e.g. 1013.3
+        # instead of 1013.2999877929688
+        value_col = df.columns[0]
+        df[value_col] = df[value_col].astype(str).astype(np.float64)
+    if df.index.name is None:
+        date_name = 'index'
+    else:
+        date_name = df.index.name
+
+    df = df.reset_index()
+    # we need something json serializable
+    # timestamp to milliseconds
+    df[date_name] = df[date_name].dt.as_unit('ms').astype(int)
+    # replace NaNs with NULLs, since json tokenizing can't handle them
+    df = df.replace([float('nan')], [None])
+    return df.values.tolist()
 
-    def _compare(s: pd.Series[float]) -> bool:
-        if len(s) == 1:
-            return False
 
-        diff = abs(s.iloc[0] - s.iloc[1])
-        if math.isnan(diff):
-            return False
+def _to_full_index(
+        s: pd.Series[float],
+) -> tuple[pd.Series[float], pd.Timedelta] | None:
+    assert isinstance(s.index, pd.DatetimeIndex)
+    freqstr = s.index.freqstr
+    if freqstr is None:
+        freqstr = infer_freq(s)
+        if freqstr is None:
+            return None
+
+    # reindex if values are missing
+    full_idx = pd.date_range(s.index.min(), s.index.max(), freq=freqstr)
+    # pd.to_timedelta does not work with min, but needs 1min instead
+    if not freqstr[0].isdigit():
+        freqstr = f'1{freqstr}'
+    return s.reindex(full_idx), pd.to_timedelta(freqstr)
 
-        return bool(diff > delta)
 
-    df['flag'] = df.rolling(
-        window=2,
-        min_periods=1,
-        closed='right',
-    ).apply(_compare)
-    # if there are not enough valid observations, rolling returns NaN.
-    # Converting this to a bool results in True sind float('nan') is truthy
-    # set all NaN to False, since we don't want to flag them here
-    df['flag'] = df['flag'].replace([float('nan')], [0.0]).astype(bool)
-    # TODO: also return where, and make sure the spike or dip is labelled
-    # correctly with surroundings, maybe an additional rolling?
-    data = df[df['flag'] == True]  # noqa: E712
-    return bool(df['flag'].any()), data
+def _as_float_array(s: pd.Series[float]) -> npt.NDArray[np.floating[Any]]:
+    # float32 values (see precision of apply_qc) are not converted to float64
+    dtype = np.float32 if s.dtype == np.float32 else np.float64
+    return s.to_numpy(dtype=dtype, na_value=np.nan)
 
 
-def _is_persistent(
+def _range_flags(
+        s: pd.Series[float],
+        lower_bound: float,
+        upper_bound: float,
+) -> pd.Series[bool]:
+    values = _as_float_array(s)
+    flags = (values < lower_bound) | (values > upper_bound)
+    return pd.Series(flags, index=s.index, name='flag')
+
+
+def _period_positions(
+        idx: pd.DatetimeIndex,
+        period: SeasonalPeriod,
+) -> npt.NDArray[np.intp]:
+    # the positions in the bounds table, in the local time of the index
+    if period == 'month':
+        positions = idx.month
+    elif period == 'dayofyear':
+        positions = idx.dayofyear
+    elif period == 'hour':
+        return np.asarray(idx.hour, dtype=np.intp)
+    else:
+        raise ValueError(f'unknown period: {period!r}')
+    return np.asarray(positions, dtype=np.intp) - 1
+
+
+def _bounds_table(
+        bounds: Sequence[float],
+        period: SeasonalPeriod,
+) -> npt.NDArray[np.float64]:
+    table = np.asarray(bounds, dtype=np.float64)
+    length = _PERIOD_LENGTHS[period]
+    if table.shape != (length,):
+        raise ValueError(
+            f'a bounds table by {period} must have {length} values, not '
+            f'{len(table)}',
+        )
+    return table
+
+
+def _seasonal_range_flags(
+        s: pd.Series[float],
+        lower_bounds: Sequence[float],
+        upper_bounds: Sequence[float],
+        period: SeasonalPeriod = 'month',
+) -> pd.Series[bool]:
+    assert isinstance(s.index, pd.DatetimeIndex)
+    positions = _period_positions(s.index, period)
+    # look up the bounds of every value at once instead of grouping the values
+    lower = _bounds_table(lower_bounds, period)[positions]
+    upper = _bounds_table(upper_bounds, period)[positions]
+    values = _as_float_array(s)
+    flags = (values < lower) | (values > upper)
+    return pd.Series(flags, index=s.index, name='flag')
+
+
+def _spike_dip_rates(
+        s: pd.Series[float],
+        max_gap: timedelta,
+) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+    assert isinstance(s.index, pd.DatetimeIndex)
+    values = _as_float_array(s)
+    valid = np.flatnonzero(~np.isnan(values))
+    # the time between consecutive valid values, only the observed rows are
+    # compared, so gaps don't need any memory
+    gaps = np.diff(s.index.asi8[valid]).view(f'm8[{s.index.unit}]')
+    compared = (
+        (gaps > np.timedelta64(0)) &
+        (gaps <= pd.Timedelta(max_gap).to_timedelta64())
+    )
+    minutes = gaps[compared] / np.timedelta64(1, 'm')
+    changes = np.abs(np.diff(values[valid]))[compared]
+    # the positions of the later values of the compared pairs
+    return valid[1:][compared], changes / minutes
+
+
+def _spike_dip_flags(
         s: pd.Series[float],
+        delta: float,
+        max_gap: timedelta | None = None,
+) -> pd.Series[bool] | None:
+    if max_gap is not None:
+        positions, rates = _spike_dip_rates(s, max_gap=max_gap)
+        gap_flags = np.zeros(len(s), dtype=bool)
+        gap_flags[positions] = rates > delta
+        return pd.Series(gap_flags, index=s.index, name='flag')
+
+    full = _to_full_index(s)
+    if full is None:
+        return None
+
+    s, freq_delta = full
+    _delta = (freq_delta.total_seconds() / 60) * delta
+    values = _as_float_array(s)
+    flags = np.zeros(len(values), dtype=bool)
+    # differences involving a NaN are never flagged
+    flags[1:] = np.abs(np.diff(values)) > _delta
+    return pd.Series(flags, index=s.index, name='flag')
+
+
+def _persistence_flags(
+        s: pd.Series[float],
+        window: timedelta,
+        excludes: list[float] = [],
+) -> pd.Series[bool] | None:
+    full = _to_full_index(s)
+    if full is None:
+        return None
+
+    s, freq_delta = full
+    timestamps_per_interval = window // freq_delta
+    if timestamps_per_interval < 1:
+        raise ValueError(
+            f'the window ({window}) must not be shorter than the temporal '
+            f'resolution ({freq_delta})',
+        )
+    flags = _is_persistent(
+        _as_float_array(s),
+        window=timestamps_per_interval,
+        excludes=excludes,
+    )
+    return pd.Series(flags, index=s.index, name='flag')
+
+
+def _run_lengths(new_run: npt.NDArray[np.bool_]) -> npt.NDArray[np.int64]:
+    # the length of the run up to and including each position, where a new
+    # run starts wherever new_run is True
+    positions = np.arange(len(new_run))
+    run_start = np.maximum.accumulate(np.where(new_run, positions, 0))
+    return positions - run_start + 1
+
+
+def _is_persistent(
+        values: npt.NDArray[np.floating[Any]],
         window: int,
         excludes: list[float],
-) -> tuple[bool, pd.DataFrame]:
-    df = s.to_frame()
-    df['flag'] = False
-    if len(df) <= window:
-        return False, df[df['flag'] == True]  # noqa: E712
-
-    def _equals(x: pd.Series[float]) -> bool:
-        if len(x) >= window:
-            first_val = x.iloc[0]
-            return bool(((x == first_val) & (~x.isin(excludes))).all())
-        else:
-            return False
-
-    df['flag'] = df[s.name].rolling(
-        window=window,
-        min_periods=1,
-        closed='right',
-    ).apply(_equals).astype(bool)
-    data = df[df['flag'] == True]  # noqa: E712
-    return bool(df['flag'].any()), data
+) -> npt.NDArray[np.bool_]:
+    flags = np.zeros(len(values), dtype=bool)
+    if len(values) <= window:
+        return flags
+
+    isnan = np.isnan(values)
+    new_run = np.ones(len(values), dtype=bool)
+    # NaN never equals the previous value, hence always starts a new run
+    new_run[1:] = values[1:] != values[:-1]
+    flags = (
+        (_run_lengths(new_run) >= window) &
+        ~isnan &
+        # compare with the excludes in the same precision as the values
+        ~np.isin(values, np.asarray(excludes, dtype=values.dtype))
+    )
+    # a window without any valid value is also flagged, this includes the
+    # shorter windows at the beginning of the series
+    new_nan_run = np.ones(len(values), dtype=bool)
+    new_nan_run[1:] = ~(isnan[1:] & isnan[:-1])
+    nan_window = np.minimum(window, np.arange(1, len(values) + 1))
+    flags |= isnan & (_run_lengths(new_nan_run) >= nan_window)
+    return flags
+
+
+def _no_lookback(freq: pd.Timedelta, **kwargs: Any) -> timedelta:
+    return timedelta(0)
+
+
+def _spike_dip_lookback(
+        freq: pd.Timedelta,
+        max_gap: timedelta | None = None,
+        **kwargs: Any,
+) -> timedelta:
+    # the previous valid value may be up to max_gap before
+    return freq if max_gap is None else max_gap
+
+
+def _persistence_lookback(
+        freq: pd.Timedelta,
+        window: timedelta,
+        **kwargs: Any,
+) -> timedelta:
+    return window
+
+
+def _range_report(
+        s: pd.Series[float],
+        flags: pd.Series[bool],
+        lower_bound: float,
+        upper_bound: float,
+) -> Result:
+    if flags.any():
+        return Result(
+            function=range_check.__name__,
+            passed=False,
+            msg=f'out of allowed range of [{lower_bound} - {upper_bound}]',
+            data=_flagged_rows(s, flags),
+        )
+    else:
+        return Result(function=range_check.__name__, passed=True)
 
 
 @register('temperature', lower_bound=-40, upper_bound=50)
@@ -101,6 +506,7 @@ def _is_persistent(
 @register('windspeed', lower_bound=0, upper_bound=30)
 @register('winddirection', lower_bound=0, upper_bound=360)
 @register('pressure', lower_bound=860, upper_bound=1055)
+@register_flags(_range_flags, report=_range_report, lookback=_no_lookback)
 def range_check(
         s: pd.Series[float],
         lower_bound: float,
@@ -119,94 +525,189 @@ def range_check(
     :returns: a :func:`meteo_qc.Result` object containing the outcome of the
         applied check.
     """
-    df = s.to_frame()
-    df['flag'] = False
-    df['flag'] = (
-        df.iloc[:, 0].lt(lower_bound) |
-        df.iloc[:, 0].gt(upper_bound)
+    flags = _range_flags(s, lower_bound=lower_bound, upper_bound=upper_bound)
+    return _range_report(
+        s,
+        flags=flags,
+        lower_bound=lower_bound,
+        upper_bound=upper_bound,
     )
 
-    if df.index.name is None:
-        date_name = 'index'
+
+def _seasonal_range_report(
+        s: pd.Series[float],
+        flags: pd.Series[bool],
+        lower_bounds: Sequence[float],
+        upper_bounds: Sequence[float],
+        period: SeasonalPeriod = 'month',
+) -> Result:
+    if flags.any():
+        return Result(
+            function=seasonal_range_check.__name__,
+            passed=False,
+            msg=f'out of allowed range by {period}',
+            data=_flagged_rows(s, flags),
+        )
     else:
-        date_name = df.index.name
+        return Result(function=seasonal_range_check.__name__, passed=True)
 
-    df = df.reset_index()
-    # we need something json serializable
-    # timestamp to milliseconds
-    df[date_name] = df[date_name].dt.as_unit('ms').astype(int)
-    # replace NaNs with NULLs, since json tokenizing can't handle them
-    df = df.replace([float('nan')], [None])
-    result = bool(df['flag'].any())
-    if result is True:
+
+@register_flags(
+    _seasonal_range_flags,
+    report=_seasonal_range_report,
+    lookback=_no_lookback,
+)
+def seasonal_range_check(
+        s: pd.Series[float],
+        lower_bounds: Sequence[float],
+        upper_bounds: Sequence[float],
+        period: SeasonalPeriod = 'month',
+) -> Result:
+    """
+    A check function checking if values in the :func:`pd.Series` ``s`` are
+    within a range that depends on the time of the year or the day, e.g. to
+    apply tighter bounds to the temperature in winter than in summer. The
+    bounds of every value are looked up in the tables at once using the
+    month, the day of the year or the hour of its timestamp in the timezone
+    of the index.
+
+    The check is not registered with any group by default, the bounds depend
+    on the climate of the station. It can be registered with the tables that
+    fit the station:
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        # one bound per hour of the day, midnight first
+        meteo_qc.register(
+            'relhum',
+            lower_bounds=[30] * 8 + [10] * 12 + [30] * 4,
+            upper_bounds=[100] * 24,
+            period='hour',
+        )(meteo_qc.seasonal_range_check)
+
+    This function can be used to write your own custom range checks.
+
+    :param s: the :func:`pd.Series` to be checked
+    :param lower_bounds: the lower bounds of the allowed values (inclusive)
+        per period, starting with January, the first day of the year or
+        midnight
+    :param upper_bounds: the upper bounds of the allowed values (inclusive)
+        per period
+    :param period: the period of the tables, ``'month'`` (12 bounds),
+        ``'dayofyear'`` (366 bounds, the last one is only used in leap years)
+        or ``'hour'`` (24 bounds)
+
+    :returns: a :func:`meteo_qc.Result` object containing the outcome of the
+        applied check.
+    """
+    return _seasonal_range_report(
+        s,
+        flags=_seasonal_range_flags(
+            s,
+            lower_bounds=lower_bounds,
+            upper_bounds=upper_bounds,
+            period=period,
+        ),
+        lower_bounds=lower_bounds,
+        upper_bounds=upper_bounds,
+        period=period,
+    )
+
+
+def _spike_dip_report(
+        s: pd.Series[float],
+        flags: pd.Series[bool] | None,
+        delta: float,
+        max_gap: timedelta | None = None,
+) -> Result:
+    if flags is None:
         return Result(
-            function=range_check.__name__,
+            function=spike_dip_check.__name__,
             passed=False,
-            msg=f'out of allowed range of [{lower_bound} - {upper_bound}]',
-            data=df[df['flag'] == True].values.tolist(),  # noqa: E712
+            msg='cannot determine temporal resolution frequency',
+        )
+
+    if flags.any():
+        return Result(
+            function=spike_dip_check.__name__,
+            passed=False,
+            msg=(
+                f'spikes or dips detected. Exceeded allowed delta of '
+                f'{delta} / min'
+            ),
+            data=_flagged_rows(s, flags),
         )
     else:
-        return Result(function=range_check.__name__, passed=True)
+        return Result(function=spike_dip_check.__name__, passed=True)
 
 
 @register('temperature', delta=0.3)
 @register('dew_point', delta=0.3)
 @register('relhum', delta=4)
 @register('pressure', delta=0.3)
-def spike_dip_check(s: pd.Series[float], delta: float) -> Result:
+@register_flags(
+    _spike_dip_flags,
+    report=_spike_dip_report,
+    lookback=_spike_dip_lookback,
+    cost=3,
+)
+def spike_dip_check(
+        s: pd.Series[float],
+        delta: float,
+        max_gap: timedelta | None = None,
+) -> Result:
     """
     A check function checking if values in the :func:`pd.Series` `s` have
     sudden spikes or dips.
 
+    By default the values are compared with the value one step of the
+    inferred frequency before, so values after missing values are not
+    compared. With ``max_gap`` each value is compared with the previous
+    valid value if it is at most ``max_gap`` before, using the actual time
+    between them. Only the observed rows are compared, so the frequency does
+    not need to be inferred and large gaps don't need any memory.
+
     This function can be used to write your own custom spike dip checks.
 
     :param s: the :func:`pd.Series` to be checked
     :param delta: maximum allowed change per minute
+    :param max_gap: the maximum time between two compared values
 
     :returns: a :func:`meteo_qc.Result` object containing the outcome of the
         applied check.
     """
-    assert isinstance(s.index, pd.DatetimeIndex)
-    freqstr = s.index.freqstr
-    if freqstr is None:
-        freqstr = infer_freq(s)
-        if freqstr is None:
-            return Result(
-                function=spike_dip_check.__name__,
-                passed=False,
-                msg='cannot determine temporal resolution frequency',
-            )
+    return _spike_dip_report(
+        s,
+        flags=_spike_dip_flags(s, delta=delta, max_gap=max_gap),
+        delta=delta,
+        max_gap=max_gap,
+    )
 
-    freq_delta = pd.to_timedelta(freqstr)
-    _delta = (freq_delta.total_seconds() / 60) * delta
-    # reindex if values are missing
-    full_idx = pd.date_range(s.index.min(), s.index.max(), freq=freqstr)
-    s = s.reindex(full_idx)
-    result, df = _has_spikes_or_dip(s, delta=_delta)
 
-    if df.index.name is None:
-        date_name = 'index'
-    else:  # pragma: no cover
-        date_name = df.index.name
+def _persistence_report(
+        s: pd.Series[float],
+        flags: pd.Series[bool] | None,
+        window: timedelta,
+        excludes: list[float] = [],
+) -> Result:
+    if flags is None:
+        return Result(
+            function=persistence_check.__name__,
+            passed=False,
+            msg='cannot determine temporal resolution frequency',
+        )
 
-    df = df.reset_index()
-    # we need something json serializable
-    # timestamp to milliseconds
-    df[date_name] = df[date_name].dt.as_unit('ms').astype(int)
-    # replace NaNs with NULLs, since json tokenizing can't handle them
-    df = df.replace([float('nan')], [None])
-    if result is True:
+    if flags.any():
         return Result(
-            function=spike_dip_check.__name__,
+            function=persistence_check.__name__,
             passed=False,
-            msg=(
-                f'spikes or dips detected. Exceeded allowed delta of '
-                f'{delta} / min'
-            ),
-            data=df.values.tolist(),
+            msg=f'some values are the same for longer than {window}',
+            data=_flagged_rows(s, flags),
         )
     else:
-        return Result(function=spike_dip_check.__name__, passed=True)
+        return Result(function=persistence_check.__name__, passed=True)
 
 
 @register('temperature', window=timedelta(hours=2))
@@ -214,6 +715,12 @@ def spike_dip_check(s: pd.Series[float], delta: float) -> Result:
 @register('windspeed', window=timedelta(hours=5))
 @register('relhum', window=timedelta(hours=5))
 @register('pressure', window=timedelta(hours=6))
+@register_flags(
+    _persistence_flags,
+    report=_persistence_report,
+    lookback=_persistence_lookback,
+    cost=4,
+)
 def persistence_check(
         s: pd.Series[float],
         window: timedelta,
@@ -234,45 +741,171 @@ def persistence_check(
     :returns: a :func:`meteo_qc.Result` object containing the outcome of the
         applied check.
     """
+    return _persistence_report(
+        s,
+        flags=_persistence_flags(s, window=window, excludes=excludes),
+        window=window,
+        excludes=excludes,
+    )
+
+
+def _window_medians(
+        window_values: npt.NDArray[np.floating[Any]],
+        n_valid: npt.NDArray[np.intp],
+) -> npt.NDArray[np.floating[Any]]:
+    # NaNs are sorted last, the median of the n_valid values of each row
+    ordered = np.sort(window_values, axis=1)
+    rows = np.arange(len(ordered))
+    lower = ordered[rows, np.maximum((n_valid - 1) // 2, 0)]
+    upper = ordered[rows, n_valid // 2]
+    return (lower + upper) / 2
+
+
+def _robust_outlier_flags(
+        s: pd.Series[float],
+        window: timedelta,
+        threshold: float,
+        min_spread: float,
+        min_values: int = 5,
+) -> pd.Series[bool]:
     assert isinstance(s.index, pd.DatetimeIndex)
-    freqstr = s.index.freqstr
-    if freqstr is None:
-        freqstr = infer_freq(s)
-        if freqstr is None:
-            return Result(
-                function=persistence_check.__name__,
-                passed=False,
-                msg='cannot determine temporal resolution frequency',
+    values = _as_float_array(s)
+    positions = np.arange(len(values))
+    # the window ending at each value, (t - window, t] like pandas' rolling
+    starts = s.index.searchsorted(s.index - window, side='right')
+    size = int((positions - starts).max(initial=0)) + 1
+    offsets = np.arange(1 - size, 1)
+
+    flags = np.zeros(len(values), dtype=bool)
+    chunk = max(1, _CHUNK_SIZE // size)
+    for start in range(0, len(values), chunk):
+        stop = start + chunk
+        # values x the values of their window, NaN outside of the window
+        window_pos = positions[start:stop, None] + offsets
+        outside = window_pos < starts[start:stop, None]
+        window_values = values[np.maximum(window_pos, 0)]
+        window_values[outside] = np.nan
+        n_valid = np.count_nonzero(~np.isnan(window_values), axis=1)
+        median = _window_medians(window_values, n_valid)
+        mad = _window_medians(
+            np.abs(window_values - median[:, None]),
+            n_valid,
+        )
+        spread = np.maximum(MAD_SCALE * mad, min_spread)
+        deviation = np.abs(values[start:stop] - median)
+        # e.g. an infinite threshold times a spread of 0 is NaN, comparisons
+        # with NaN are False
+        with np.errstate(invalid='ignore'):
+            flags[start:stop] = (
+                (n_valid >= min_values) &
+                (deviation > threshold * spread)
             )
+    return pd.Series(flags, index=s.index, name='flag')
 
-    freq_delta = pd.to_timedelta(freqstr)
-    timestamps_per_interval = window // freq_delta
 
-    # reindex if values are missing
-    full_idx = pd.date_range(s.index.min(), s.index.max(), freq=freqstr)
-    s = s.reindex(full_idx)
-    result, df = _is_persistent(
-        s,
-        window=timestamps_per_interval,
-        excludes=excludes,
-    )
-    if df.index.name is None:
-        date_name = 'index'
-    else:  # pragma: no cover
-        date_name = df.index.name
+def _robust_outlier_lookback(
+        freq: pd.Timedelta,
+        window: timedelta,
+        **kwargs: Any,
+) -> timedelta:
+    return window
 
-    df = df.reset_index()
-    # we need something json serializable
-    # timestamp to milliseconds
-    df[date_name] = df[date_name].dt.as_unit('ms').astype(int)
-    # replace NaNs with NULLs, since json tokenizing can't handle them
-    df = df.replace([float('nan')], [None])
-    if result is True:
+
+def _robust_outlier_report(
+        s: pd.Series[float],
+        flags: pd.Series[bool],
+        window: timedelta,
+        threshold: float,
+        min_spread: float,
+        min_values: int = 5,
+) -> Result:
+    if flags.any():
         return Result(
-            function=persistence_check.__name__,
+            function=robust_outlier_check.__name__,
             passed=False,
-            msg=f'some values are the same for longer than {window}',
-            data=df.values.tolist(),
+            msg=(
+                f'outliers detected. Deviated from the median of the '
+                f'previous {window} by more than {threshold} times the MAD'
+            ),
+            data=_flagged_rows(s, flags),
         )
     else:
-        return Result(function=persistence_check.__name__, passed=True)
+        return Result(function=robust_outlier_check.__name__, passed=True)
+
+
+@register(
+    'temperature',
+    window=timedelta(hours=1),
+    threshold=5,
+    min_spread=0.5,
+)
+@register(
+    'dew_point',
+    window=timedelta(hours=1),
+    threshold=5,
+    min_spread=0.5,
+)
+@register('relhum', window=timedelta(hours=1), threshold=5, min_spread=3)
+@register('pressure', window=timedelta(hours=3), threshold=5, min_spread=0.5)
+@register_flags(
+    _robust_outlier_flags,
+    report=_robust_outlier_report,
+    lookback=_robust_outlier_lookback,
+    cost=5,
+)
+def robust_outlier_check(
+        s: pd.Series[float],
+        window: timedelta,
+        threshold: float,
+        min_spread: float,
+        min_values: int = 5,
+) -> Result:
+    """
+    A check function checking if values in the :func:`pd.Series` ``s`` are
+    outliers compared to the values before them. A value does not pass if it
+    deviates from the rolling median of the ``window`` ending at it by more
+    than ``threshold`` times the rolling median absolute deviation (MAD,
+    scaled to the standard deviation of a normal distribution), but at least
+    ``min_spread``. Unlike :func:`meteo_qc.spike_dip_check` this also detects
+    outliers following missing values and does not flag the value after a
+    single spike.
+
+    The MAD of a value is the median of the absolute deviations of the
+    values of its window from their median. The values of the windows are
+    sorted in chunks, so the time needed grows with the number of values in
+    the ``window``. Only the values of the ``window`` before a value are
+    needed to check it, which is the ``lookback`` of the check.
+
+    It is registered for the ``temperature``, ``dew_point``, ``relhum`` and
+    ``pressure`` groups, so :func:`meteo_qc.apply_qc` also reports outliers
+    of data that passed before it was added. With a ``threshold`` of
+    ``float('inf')`` no values are flagged (see
+    :func:`meteo_qc.get_plugin_args`).
+
+    This function can be used to write your own custom outlier checks.
+
+    :param s: the :func:`pd.Series` to be checked
+    :param window: the time window of the rolling median, ending at the value
+    :param threshold: the allowed deviation in multiples of the MAD
+    :param min_spread: the minimum MAD in the unit of the values, e.g. to
+        allow small deviations from constant values
+    :param min_values: the minimum number of values in the window, otherwise
+        the values pass
+
+    :returns: a :func:`meteo_qc.Result` object containing the outcome of the
+        applied check.
+    """
+    return _robust_outlier_report(
+        s,
+        flags=_robust_outlier_flags(
+            s,
+            window=window,
+            threshold=threshold,
+            min_spread=min_spread,
+            min_values=min_values,
+        ),
+        window=window,
+        threshold=threshold,
+        min_spread=min_spread,
+        min_values=min_values,
+    )
@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._io import _read_payload
+from meteo_qc._io import _result_to_json
+from meteo_qc._io import _set_plugin_args
+from meteo_qc._io import _to_column_mapping
+from meteo_qc._io import _validate_column_mapping
+from meteo_qc._io import FileFormat
+from meteo_qc._io import PLUGIN_ARG_T
+from meteo_qc._main import apply_qc
+
+CONTENT_TYPES: dict[str, FileFormat] = {
+    'text/csv': 'csv',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/vnd.apache.arrow.file': 'arrow',
+    'application/vnd.apache.arrow.stream': 'arrow',
+}
+FORMATS: dict[str, FileFormat] = {
+    'csv': 'csv',
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+}
+COLUMN_MAPPING_HEADER = 'X-Column-Mapping'
+# the number of recent requests the latency percentiles are computed from
+LATENCY_WINDOW = 1000
+
+
+class _Job(NamedTuple):
+    data: bytes
+    fmt: FileFormat
+    mapping: dict[str, list[str]] | None
+    index_col: str | None
+    tz: str
+
+
+def _init_worker(plugin_args: Sequence[PLUGIN_ARG_T]) -> None:
+    _set_plugin_args(plugin_args)
+    # pay the cost of the first call (imports, caches) before the first
+    # request arrives
+    df = pd.DataFrame(
+        data={'temp': [1.0, 2.0, 3.0]},
+        index=pd.date_range('2022-01-01', periods=3, freq='10min', tz='UTC'),
+    )
+    apply_qc(df, ColumnMapping.autodetect_from_df(df))
+
+
+def _ready() -> None:
+    pass
+
+
+def _qc_job(job: _Job) -> tuple[HTTPStatus, dict[str, Any]]:
+    try:
+        df = _read_payload(
+            job.data,
+            fmt=job.fmt,
+            index_col=job.index_col,
+            tz=job.tz,
+        )
+        final_res = apply_qc(df, _to_column_mapping(df, job.mapping))
+    except Exception as e:
+        return HTTPStatus.BAD_REQUEST, {'error': f'{type(e).__name__}: {e}'}
+    return HTTPStatus.OK, {
+        'rows': len(df),
+        'passed': final_res['passed'],
+        'result': _result_to_json(final_res),
+    }
+
+
+def _qc_batch(jobs: list[_Job]) -> list[tuple[HTTPStatus, dict[str, Any]]]:
+    return [_qc_job(job) for job in jobs]
+
+
+class _Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.start = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.rows = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def batch(self, size: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += size
+
+    def reject(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def request(self, latency: float, rows: int, error: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.rows += rows
+            self.latencies.append(latency)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            uptime = time.monotonic() - self.start
+            latencies = np.array(self.latencies)
+            if len(latencies):
+                p50, p90, p99 = np.percentile(latencies, (50, 90, 99))
+                latency = {
+                    'p50': p50,
+                    'p90': p90,
+                    'p99': p99,
+                    'max': latencies.max(),
+                }
+            else:
+                latency = {'p50': None, 'p90': None, 'p99': None, 'max': None}
+            return {
+                'uptime_seconds': uptime,
+                'requests': self.requests,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'rows': self.rows,
+                'batches': self.batches,
+                'mean_batch_size': (
+                    self.batched_requests / self.batches
+                    if self.batches else None
+                ),
+                'requests_per_second': self.requests / uptime,
+                'rows_per_second': self.rows / uptime,
+                'latency_seconds': {
+                    k: None if v is None else float(v)
+                    for k, v in latency.items()
+                },
+            }
+
+
+class QCServer(ThreadingHTTPServer):
+    """
+    A HTTP server applying :func:`meteo_qc.apply_qc` to the data posted to
+    ``/qc`` using a pool of worker processes, which are started and warmed up
+    before the server accepts requests.
+
+    Requests that are waiting while all workers are busy are sent to the next
+    free worker together, as a batch of at most ``batch_size`` requests. If
+    more than ``max_pending`` requests are waiting, new requests are rejected
+    with ``503 Service Unavailable``.
+
+    :param address: the host and the port to listen on
+    :param jobs: the number of worker processes
+    :param batch_size: the maximum number of requests sent to a worker at once
+    :param max_pending: the maximum number of requests waiting for a worker
+    :param max_body_size: the maximum size of a request's body in bytes
+    :param plugin_args: changed plugin arguments as
+        ``(group, check, argument, value)``
+    """
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address: tuple[str, int],
+            jobs: int = 1,
+            batch_size: int = 8,
+            max_pending: int = 64,
+            max_body_size: int = 256 * 1024 * 1024,
+            plugin_args: Sequence[PLUGIN_ARG_T] = (),
+    ) -> None:
+        super().__init__(address, _Handler, bind_and_activate=False)
+        self.batch_size = batch_size
+        self.max_body_size = max_body_size
+        self._n_workers = jobs
+        self._plugin_args = tuple(plugin_args)
+        self.metrics = _Metrics()
+        self._jobs: queue.Queue[tuple[_Job, Future[Any]] | None] = (
+            queue.Queue(maxsize=max_pending)
+        )
+        # a batch is only taken from the queue once a worker is free
+        self._free_workers = threading.Semaphore(jobs)
+        # start all workers before any thread is started
+        self._executor_lock = threading.Lock()
+        self._executor = self._start_workers()
+        wait([self._executor.submit(_ready) for _ in range(jobs)])
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        try:
+            self.server_bind()
+            self.server_activate()
+        except BaseException:
+            self.server_close()
+            raise
+
+    def _start_workers(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._n_workers,
+            initializer=_init_worker,
+            initargs=(self._plugin_args,),
+        )
+
+    def _restart_workers(self, broken: ProcessPoolExecutor) -> None:
+        # a worker died e.g. killed by the OOM killer, the pool can't be used
+        # anymore. Only the first caller noticing it replaces the pool
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = self._start_workers()
+                broken.shutdown(wait=False)
+
+    def submit(self, job: _Job) -> Future[tuple[HTTPStatus, dict[str, Any]]]:
+        """
+        Queue a job. Raises :func:`queue.Full` if too many jobs are pending.
+        """
+        future: Future[tuple[HTTPStatus, dict[str, Any]]] = Future()
+        self._jobs.put_nowait((job, future))
+        return future
+
+    @property
+    def pending(self) -> int:
+        """The number of requests waiting for a worker."""
+        return self._jobs.qsize()
+
+    def _dispatch(self) -> None:
+        stop = False
+        while not stop:
+            self._free_workers.acquire()
+            item = self._jobs.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # finish this batch first
+                    stop = True
+                    break
+                batch.append(item)
+
+            self.metrics.batch(len(batch))
+            jobs = [job for job, _ in batch]
+            executor = self._executor
+            try:
+                try:
+                    batch_future = executor.submit(_qc_batch, jobs)
+                except BrokenProcessPool:
+                    self._restart_workers(executor)
+                    executor = self._executor
+                    batch_future = executor.submit(_qc_batch, jobs)
+            except RuntimeError as e:
+                self._free_workers.release()
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                batch_future.add_done_callback(
+                    partial(
+                        self._batch_done,
+                        executor,
+                        [f for _, f in batch],
+                    ),
+                )
+
+    def _batch_done(
+            self,
+            executor: ProcessPoolExecutor,
+            futures: list[Future[tuple[HTTPStatus, dict[str, Any]]]],
+            batch_future: Future[list[tuple[HTTPStatus, dict[str, Any]]]],
+    ) -> None:
+        exc = batch_future.exception()
+        if isinstance(exc, BrokenProcessPool):
+            self._restart_workers(executor)
+        self._free_workers.release()
+        if exc is not None:
+            for future in futures:
+                future.set_exception(exc)
+        else:
+            for future, res in zip(futures, batch_future.result()):
+                future.set_result(res)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._jobs.put(None)
+        # unblock the dispatcher if it waits for a free worker
+        self._free_workers.release()
+        self._dispatcher.join()
+        with self._executor_lock:
+            self._executor.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: QCServer
+
+    def _send_json(
+            self,
+            status: HTTPStatus,
+            body: dict[str, Any],
+            headers: dict[str, str] | None = None,
+    ) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _error(
+            self,
+            status: HTTPStatus,
+            msg: str,
+            headers: dict[str, str] | None = None,
+    ) -> None:
+        self._send_json(status, {'error': msg}, headers=headers)
+
+    def do_GET(self) -> None:
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/health':
+            self._send_json(HTTPStatus.OK, {'status': 'ok'})
+        elif path == '/metrics':
+            metrics = self.server.metrics.snapshot()
+            metrics['pending'] = self.server.pending
+            self._send_json(HTTPStatus.OK, metrics)
+        else:
+            self._error(HTTPStatus.NOT_FOUND, f'not found: {path}')
+
+    def _parse_job(self, data: bytes) -> _Job:
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        fmt_name = query.get('format')
+        if fmt_name is None:
+            content_type = self.headers.get_content_type()
+            fmt = CONTENT_TYPES.get(content_type, 'csv')
+        elif fmt_name in FORMATS:
+            fmt = FORMATS[fmt_name]
+        else:
+            raise ValueError(f'unknown format: {fmt_name!r}')
+
+        mapping = None
+        mapping_header = self.headers.get(COLUMN_MAPPING_HEADER)
+        if mapping_header is not None:
+            mapping = _validate_column_mapping(
+                json.loads(mapping_header),
+                source=COLUMN_MAPPING_HEADER,
+            )
+        return _Job(
+            data=data,
+            fmt=fmt,
+            mapping=mapping,
+            index_col=query.get('index_col'),
+            tz=query.get('tz', 'UTC'),
+        )
+
+    def do_POST(self) -> None:
+        start = time.monotonic()
+        path = urllib.parse.urlsplit(self.path).path
+        if path != '/qc':
+            self._error(HTTPStatus.NOT_FOUND, f'not found: {path}')
+            return
+
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self._error(HTTPStatus.LENGTH_REQUIRED, 'Content-Length required')
+            return
+        try:
+            content_length = int(length)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self._error(
+                HTTPStatus.BAD_REQUEST,
+                f'invalid Content-Length: {length!r}',
+            )
+            return
+        elif content_length > self.server.max_body_size:
+            self._error(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f'the body exceeds {self.server.max_body_size} bytes',
+            )
+            return
+
+        data = self.rfile.read(content_length)
+        try:
+            job = self._parse_job(data)
+        except ValueError as e:
+            self.server.metrics.request(
+                time.monotonic() - start,
+                rows=0,
+                error=True,
+            )
+            self._error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        try:
+            future = self.server.submit(job)
+        except queue.Full:
+            self.server.metrics.reject()
+            self._error(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                'too many pending requests',
+                headers={'Retry-After': '1'},
+            )
+            return
+
+        try:
+            status, body = future.result()
+        except Exception as e:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            body = {'error': f'{type(e).__name__}: {e}'}
+
+        latency = time.monotonic() - start
+        body['seconds'] = latency
+        self.server.metrics.request(
+            latency,
+            rows=body.get('rows', 0),
+            error=status != HTTPStatus.OK,
+        )
+        self._send_json(status, body)
+
+
+def serve(
+        host: str = '127.0.0.1',
+        port: int = 8080,
+        **kwargs: Any,
+) -> None:
+    """Run a :func:`QCServer` until it is interrupted."""
+    with QCServer((host, port), **kwargs) as server:
+        print(
+            f'serving on http://{host}:{server.server_address[1]}',
+            file=sys.stderr,
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
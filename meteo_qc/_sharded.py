@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import contextlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any
+from typing import Literal
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _use_data_format
+from meteo_qc._data import DataFormat
+from meteo_qc._data import FLAG_FUNCS
+from meteo_qc._data import FUNC_T
+from meteo_qc._main import _new_final_result
+from meteo_qc._main import _report_duplicates
+from meteo_qc._main import _set_passed
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import apply_qc
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._main import FinalResult
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import ColumnPlan
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.values import _freq_cache
+from meteo_qc._plugins.values import _infer_index_freq
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+from meteo_qc._shm import attach_frame
+from meteo_qc._shm import detach
+from meteo_qc._shm import SharedFrame
+from meteo_qc._shm import SharedFrameSpec
+
+Transport = Literal['pickle', 'shared_memory']
+
+
+class _ShardTask(NamedTuple):
+    column: str
+    name: str
+    func: FUNC_T
+    kwargs: dict[str, Any]
+
+
+class _Shard(NamedTuple):
+    # positions of the rows including the halo
+    start: int
+    stop: int
+    # the part of the time range this shard is responsible for
+    core_start: pd.Timestamp | None
+    core_end: pd.Timestamp | None
+
+
+def _is_shardable(func: FUNC_T) -> bool:
+    flag_info = FLAG_FUNCS.get(func)
+    return (
+        flag_info is not None and
+        flag_info['report'] is not None and
+        flag_info['lookback'] is not None
+    )
+
+
+def _lookback(
+        func: FUNC_T,
+        freq: pd.Timedelta,
+        kwargs: dict[str, Any],
+) -> timedelta:
+    lookback = FLAG_FUNCS[func]['lookback']
+    assert lookback is not None
+    return lookback(freq=freq, **kwargs)
+
+
+def _to_i8(ts: pd.Timestamp, unit: str) -> int:
+    return int(pd.Timestamp(ts).asm8.astype(f'M8[{unit}]').view(np.int64))
+
+
+def _shards(
+        idx: pd.DatetimeIndex,
+        n_shards: int,
+        freq: pd.Timedelta,
+        lookback: timedelta,
+) -> list[_Shard]:
+    # every shard must be longer than the lookback, otherwise the halo of the
+    # following shard would reach beyond it
+    min_span = lookback + freq
+    span = idx[-1] - idx[0]
+    n_shards = max(1, min(n_shards, span // min_span))
+    edges = [idx[0] + span * i / n_shards for i in range(1, n_shards)]
+
+    # the checks reindex the data to the full index, which starts at the first
+    # timestamp. Shards must hence start at a timestamp that is aligned with
+    # the full index of all data, so the full index of the shard is a part of
+    # it. They must also end at one to cover all timestamps of the core.
+    idx_i8 = idx.asi8
+    step = freq // pd.Timedelta(1, unit=idx.unit)
+    aligned = np.flatnonzero((idx_i8 - idx_i8[0]) % step == 0)
+    aligned_i8 = idx_i8[aligned]
+    core_bounds: list[pd.Timestamp | None] = [None, *edges, None]
+    shards = []
+    for core_start, core_end in zip(core_bounds[:-1], core_bounds[1:]):
+        if core_start is None:
+            start = 0
+        else:
+            halo_start = _to_i8(core_start - lookback, unit=idx.unit)
+            pos = int(np.searchsorted(aligned_i8, halo_start, side='right'))
+            start = int(aligned[max(pos - 1, 0)])
+
+        if core_end is None:
+            stop = len(idx)
+        else:
+            core_end_i8 = _to_i8(core_end, unit=idx.unit)
+            pos = int(np.searchsorted(aligned_i8, core_end_i8, side='left'))
+            stop = int(aligned[pos]) + 1 if pos < len(aligned) else len(idx)
+
+        shards.append(_Shard(start, stop, core_start, core_end))
+    return shards
+
+
+def _trim(
+        flags: pd.Series[bool] | None,
+        core_start: pd.Timestamp | None,
+        core_end: pd.Timestamp | None,
+) -> pd.Series[bool] | None:
+    if flags is None:
+        return None
+    assert isinstance(flags.index, pd.DatetimeIndex)
+    idx_i8 = flags.index.asi8
+    start = 0
+    stop = len(flags)
+    if core_start is not None:
+        start_i8 = _to_i8(core_start, unit=flags.index.unit)
+        start = int(np.searchsorted(idx_i8, start_i8))
+    if core_end is not None:
+        stop = int(np.searchsorted(idx_i8, _to_i8(core_end, flags.index.unit)))
+    return flags.iloc[start:stop]
+
+
+def _qc_shard(
+        df: pd.DataFrame,
+        shard: _Shard,
+        tasks: list[_ShardTask],
+        data_freq: str,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+) -> list[pd.Series[bool] | None]:
+    flags = []
+    with _use_freq_options(freq_method, freq_tolerance):
+        # the checks must use the frequency of all data, not of this shard
+        assert isinstance(df.index, pd.DatetimeIndex)
+        _freq_cache(df.index)[(freq_method, freq_tolerance)] = data_freq
+        for task in tasks:
+            shard_flags = FLAG_FUNCS[task.func]['flags'](
+                df[task.column],
+                **task.kwargs,
+            )
+            flags.append(_trim(shard_flags, shard.core_start, shard.core_end))
+    return flags
+
+
+def _qc_shared_shard(
+        spec: SharedFrameSpec,
+        shard: _Shard,
+        tasks: list[_ShardTask],
+        data_freq: str,
+        freq_method: FreqMethod,
+        freq_tolerance: float,
+) -> list[pd.Series[bool] | None]:
+    with attach_frame(spec) as df:
+        flags = _qc_shard(
+            df.iloc[shard.start:shard.stop],
+            shard,
+            tasks,
+            data_freq,
+            freq_method,
+            freq_tolerance,
+        )
+        del df
+        return [detach(f) for f in flags]
+
+
+def apply_qc_sharded(
+        df: DataFrameLike,
+        column_mapping: ColumnMapping | QCPlan,
+        shards: int | None = None,
+        max_workers: int | None = None,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        transport: Transport = 'shared_memory',
+        data_format: DataFormat = 'rows',
+        duplicates: DuplicatePolicy = 'first',
+) -> FinalResult:
+    """
+    Apply the quality control to a ``pandas.DataFrame`` by splitting its time
+    range into shards, which are checked in parallel using a process pool.
+    The result is identical to :func:`meteo_qc.apply_qc`, but long series
+    can use multiple cores.
+
+    Each shard overlaps with the previous one by the time the checks need to
+    look back (see ``lookback`` of :func:`meteo_qc.register_flags`) e.g. the
+    ``window`` of :func:`meteo_qc.persistence_check` or one timestamp for
+    :func:`meteo_qc.spike_dip_check`. The frequency of the data is inferred
+    once for all shards. Checks without a registered ``report`` and
+    ``lookback`` are applied to the entire series in the calling process.
+
+    :param df: The DataFrame the quality control should be applied to. This
+        can also be an arrow table, see :func:`meteo_qc.apply_qc`.
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns.
+    :param shards: the number of shards to split the time range into. Defaults
+        to ``max_workers`` or the number of CPUs. Fewer shards are used if
+        they would be shorter than the lookback of the checks.
+    :param max_workers: the maximum number of worker processes
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param transport: how the data is sent to the worker processes. With
+        ``'shared_memory'`` the index and the columns are copied once into
+        shared memory blocks (see :func:`multiprocessing.shared_memory`) which
+        all workers read without copying. With ``'pickle'`` every shard is
+        pickled and copied to the worker.
+    :param data_format: the format of the ``data`` of the results. See
+        :func:`meteo_qc.apply_qc`.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied. See :func:`meteo_qc.apply_qc`.
+
+    :returns: a :func:`meteo_qc.FinalResult`, see :func:`meteo_qc.apply_qc`.
+    """
+    df = _as_dataframe(df)
+    _validate_index(df)
+    df_original, df_sorted = _sort_and_resolve(df, duplicates)
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    data_freq = _infer_index_freq(
+        df_sorted.index,
+        method=freq_method,
+        tolerance=freq_tolerance,
+    )
+    if transport not in ('pickle', 'shared_memory'):
+        raise ValueError(f'unknown transport: {transport!r}')
+    if shards is None:
+        shards = max_workers or os.cpu_count() or 1
+
+    plan = _to_plan(column_mapping)
+    column_plans: dict[str, ColumnPlan] = {
+        column: plan.for_column(column) for column in df_sorted.columns
+    }
+    tasks = [
+        # the kwargs of a plan can't be pickled
+        _ShardTask(column, check.name, check.func, dict(check.kwargs))
+        for column, column_plan in column_plans.items()
+        for check in column_plan.checks
+        if _is_shardable(check.func)
+    ]
+    freq = pd.Timedelta(0 if data_freq is None else data_freq)
+    if data_freq is None or freq <= pd.Timedelta(0) or shards < 2 or not tasks:
+        return apply_qc(
+            df,
+            plan,
+            freq_method=freq_method,
+            freq_tolerance=freq_tolerance,
+            data_format=data_format,
+            duplicates=duplicates,
+        )
+
+    lookback = max(_lookback(t.func, freq, t.kwargs) for t in tasks)
+    shard_list = _shards(
+        df_sorted.index,
+        n_shards=shards,
+        freq=freq,
+        lookback=lookback,
+    )
+    if len(shard_list) < 2:
+        return apply_qc(
+            df,
+            plan,
+            freq_method=freq_method,
+            freq_tolerance=freq_tolerance,
+            data_format=data_format,
+            duplicates=duplicates,
+        )
+
+    with contextlib.ExitStack() as stack:
+        executor = stack.enter_context(
+            ProcessPoolExecutor(max_workers=max_workers),
+        )
+        args = (tasks, data_freq, freq_method, freq_tolerance)
+        if transport == 'shared_memory':
+            columns = list(dict.fromkeys(task.column for task in tasks))
+            shared = stack.enter_context(SharedFrame(df_sorted, columns))
+            futures = [
+                executor.submit(_qc_shared_shard, shared.spec, shard, *args)
+                for shard in shard_list
+            ]
+        else:
+            futures = [
+                executor.submit(
+                    _qc_shard,
+                    df_sorted.iloc[shard.start:shard.stop],
+                    shard,
+                    *args,
+                )
+                for shard in shard_list
+            ]
+        final_res = _new_final_result(df_sorted, data_freq=data_freq)
+        with (
+                _use_freq_options(freq_method, freq_tolerance),
+                _use_data_format(data_format),
+        ):
+            # apply the remaining checks while the shards are processed
+            serial_results = {
+                (column, check.name): check.func(
+                    df_sorted[column],
+                    **check.kwargs,
+                )
+                for column, column_plan in column_plans.items()
+                for check in column_plan.checks
+                if not _is_shardable(check.func)
+            }
+            shard_flags = [future.result() for future in futures]
+
+            for i, task in enumerate(tasks):
+                pieces = []
+                for flags_piece in (flags[i] for flags in shard_flags):
+                    if flags_piece is not None:
+                        pieces.append(flags_piece)
+                s = df_sorted[task.column]
+                report = FLAG_FUNCS[task.func]['report']
+                assert report is not None
+                if len(pieces) < len(shard_flags):
+                    flags = None
+                else:
+                    flags = pd.concat(pieces)
+                serial_results[(task.column, task.name)] = report(
+                    s,
+                    flags=flags,
+                    **task.kwargs,
+                )
+
+    for column, column_plan in column_plans.items():
+        final_res['columns'][column]['results'] = {
+            name: serial_results[(column, name)]
+            for name in column_plan.result_order
+        }
+        if df_sorted is not df_original:
+            with _use_data_format(data_format):
+                _report_duplicates(
+                    df_original[column],
+                    column_plan,
+                    precision='float64',
+                    results=final_res['columns'][column]['results'],
+                )
+
+    _set_passed(final_res)
+    return final_res
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from collections.abc import Generator
+from collections.abc import Hashable
+from collections.abc import Sequence
+from contextlib import contextmanager
+from datetime import tzinfo
+from multiprocessing import shared_memory
+from types import TracebackType
+from typing import Any
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from pandas.tseries.offsets import BaseOffset
+
+
+class _BlockSpec(NamedTuple):
+    # name of the shared memory block or None if the values are not shared
+    # and sent along with the spec instead
+    name: str | None
+    dtype: str
+    length: int
+    values: npt.NDArray[Any] | None = None
+
+
+class SharedFrameSpec(NamedTuple):
+    """
+    A small, picklable description of a :func:`SharedFrame`, which is sent to
+    the worker processes instead of the data.
+    """
+    index_block: _BlockSpec
+    unit: str
+    tz: tzinfo
+    index_name: Hashable | None
+    freq: BaseOffset | None
+    columns: tuple[tuple[Hashable, _BlockSpec], ...]
+
+
+def _is_shareable(dtype: Any) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM'
+
+
+class SharedFrame:
+    """
+    Copy the index and the column values of a ``pandas.DataFrame`` with a
+    timezone aware :func:`pd.DatetimeIndex` into shared memory blocks.
+
+    Worker processes rebuild the DataFrame from :attr:`spec` using
+    :func:`attach_frame` without copying the column values. The blocks are
+    freed when the :func:`SharedFrame` is closed, hence it should be used as
+    a context manager spanning the lifetime of the workers' tasks.
+
+    Columns that do not have a numeric, boolean or datetime numpy dtype (e.g.
+    strings) cannot be shared and are sent along with the :attr:`spec`.
+
+    :param df: the DataFrame to share
+    :param columns: the columns to share. Defaults to all columns.
+    """
+
+    def __init__(
+            self,
+            df: pd.DataFrame,
+            columns: Sequence[Hashable] | None = None,
+    ) -> None:
+        assert isinstance(df.index, pd.DatetimeIndex)
+        assert df.index.tz is not None
+        self._blocks: list[shared_memory.SharedMemory] = []
+        try:
+            index_block = self._share(df.index.asi8)
+            shared_columns = []
+            for column in df.columns if columns is None else columns:
+                values = df[column].to_numpy()
+                if _is_shareable(df[column].dtype):
+                    block = self._share(values)
+                else:
+                    block = _BlockSpec(
+                        name=None,
+                        dtype=str(values.dtype),
+                        length=len(values),
+                        values=values,
+                    )
+                shared_columns.append((column, block))
+        except BaseException:
+            self.close()
+            raise
+
+        self.spec = SharedFrameSpec(
+            index_block=index_block,
+            unit=df.index.unit,
+            tz=df.index.tz,
+            index_name=df.index.name,
+            freq=df.index.freq,
+            columns=tuple(shared_columns),
+        )
+
+    def _share(self, values: npt.NDArray[Any]) -> _BlockSpec:
+        # a block can't have a size of 0
+        block = shared_memory.SharedMemory(
+            create=True,
+            size=max(values.nbytes, 1),
+        )
+        self._blocks.append(block)
+        shared: npt.NDArray[Any] = np.ndarray(
+            values.shape,
+            dtype=values.dtype,
+            buffer=block.buf,
+        )
+        shared[:] = values
+        del shared
+        return _BlockSpec(
+            name=block.name,
+            dtype=values.dtype.str,
+            length=len(values),
+        )
+
+    def close(self) -> None:
+        """Free the shared memory blocks."""
+        while self._blocks:
+            block = self._blocks.pop()
+            block.close()
+            block.unlink()
+
+    def __enter__(self) -> SharedFrame:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def _attach_block(
+        spec: _BlockSpec,
+        blocks: list[shared_memory.SharedMemory],
+) -> npt.NDArray[Any]:
+    if spec.name is None:
+        assert spec.values is not None
+        return spec.values
+
+    block = shared_memory.SharedMemory(name=spec.name)
+    blocks.append(block)
+    values: npt.NDArray[Any] = np.ndarray(
+        (spec.length,),
+        dtype=np.dtype(spec.dtype),
+        buffer=block.buf,
+    )
+    # the data is shared with other processes
+    values.flags.writeable = False
+    return values
+
+
+def _close_blocks(blocks: list[shared_memory.SharedMemory]) -> None:
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # a view on the block is still referenced, the block is closed
+            # once it is garbage collected
+            pass
+
+
+@contextmanager
+def attach_frame(
+        spec: SharedFrameSpec,
+) -> Generator[pd.DataFrame, None, None]:
+    """
+    Rebuild the ``pandas.DataFrame`` of a :func:`SharedFrame` in a worker
+    process. The columns are views on the shared memory blocks, which are
+    read-only. Objects created from the DataFrame must not keep references to
+    its data after the context manager exits, copy them instead (e.g. using
+    :func:`detach`).
+
+    :param spec: the :attr:`SharedFrame.spec` of the shared DataFrame
+    """
+    blocks: list[shared_memory.SharedMemory] = []
+    try:
+        # localizing copies the (int64) index once, the values are not copied
+        index = pd.DatetimeIndex(
+            _attach_block(spec.index_block, blocks).view(f'M8[{spec.unit}]'),
+            name=spec.index_name,
+            copy=False,
+        ).tz_localize('UTC').tz_convert(spec.tz)
+        # the checks prefer the frequency of the index over inferring one
+        index = pd.DatetimeIndex(index, freq=spec.freq, copy=False)
+        # no reference to the DataFrame is kept here, so the blocks can be
+        # closed as soon as the caller is done with it
+        yield pd.DataFrame(
+            {
+                column: _attach_block(block_spec, blocks)
+                for column, block_spec in spec.columns
+            },
+            index=index,
+            copy=False,
+        )
+    finally:
+        _close_blocks(blocks)
+
+
+def detach(s: pd.Series[Any] | None) -> pd.Series[Any] | None:
+    """
+    Copy a ``pandas.Series`` including its index, so it does not reference
+    shared memory.
+    """
+    if s is None:
+        return None
+    return pd.Series(
+        s.to_numpy(copy=True),
+        index=s.index.copy(deep=True),
+        name=s.name,
+    )
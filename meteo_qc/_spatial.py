@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import warnings
+from collections.abc import Hashable
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from meteo_qc._data import _import_optional
+from meteo_qc._data import Result
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._plugins.values import _flagged_rows
+from meteo_qc._plugins.values import MAD_SCALE
+
+# the mean radius of the earth
+EARTH_RADIUS_KM = 6371.0088
+# the maximum number of neighbour values held in memory at once
+_CHUNK_SIZE = 4_000_000
+
+
+def _to_xyz(
+        lat: npt.NDArray[np.float64],
+        lon: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    # cartesian coordinates on a sphere. For distances of a few hundred km
+    # the straight distance is the same as the distance along the surface
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    return EARTH_RADIUS_KM * np.column_stack((
+        np.cos(lat_rad) * np.cos(lon_rad),
+        np.cos(lat_rad) * np.sin(lon_rad),
+        np.sin(lat_rad),
+    ))
+
+
+class StationIndex:
+    """An index of the neighbours of every station of a network, used by
+    :func:`meteo_qc.buddy_check`. The neighbours are found using a KD-tree
+    (``scipy.spatial.cKDTree``) once, so the index can be reused for all
+    variables and periods.
+
+    .. code-block:: python
+
+        import meteo_qc
+        import pandas as pd
+
+        coords = pd.DataFrame(
+            {'lat': [51.48, 51.45, 51.51], 'lon': [7.21, 7.01, 7.46]},
+            index=['bochum', 'essen', 'dortmund'],
+        )
+        stations = meteo_qc.StationIndex(coords, radius=50)
+
+    :param coords: a ``pandas.DataFrame`` indexed by the station identifiers
+        with the columns ``lat`` and ``lon`` in degrees and optionally
+        ``elevation`` in m.
+    :param radius: the maximum distance of a neighbour in km
+    :param max_neighbours: the maximum number of neighbours of a station, the
+        closest ones are used
+    """
+
+    def __init__(
+            self,
+            coords: pd.DataFrame,
+            radius: float = 50,
+            max_neighbours: int = 8,
+    ) -> None:
+        spatial = _import_optional('scipy.spatial', 'spatial')
+
+        if not coords.index.is_unique:
+            raise ValueError('the station identifiers must be unique')
+        self.stations = coords.index
+        if 'elevation' in coords.columns:
+            self.elevation = coords['elevation'].to_numpy(dtype=np.float64)
+        else:
+            self.elevation = np.zeros(len(coords))
+
+        n_stations = len(coords)
+        xyz = _to_xyz(
+            coords['lat'].to_numpy(dtype=np.float64),
+            coords['lon'].to_numpy(dtype=np.float64),
+        )
+        k = min(max_neighbours + 1, n_stations)
+        _, neighbours = spatial.cKDTree(xyz).query(
+            xyz,
+            k=list(range(1, k + 1)),
+            distance_upper_bound=radius,
+        )
+        # missing neighbours are n_stations. The station itself is usually
+        # the first, but not necessarily if stations share their coordinates
+        neighbours[neighbours == np.arange(n_stations)[:, None]] = n_stations
+        order = np.argsort(neighbours == n_stations, axis=1, kind='stable')
+        neighbours = np.take_along_axis(neighbours, order, axis=1)
+        self._neighbours: npt.NDArray[np.intp] = neighbours[:, :max_neighbours]
+
+    def neighbours(self, station: Hashable) -> pd.Index[Any]:
+        """Get the neighbours of a station, the closest first.
+
+        :param station: the identifier of the station
+        """
+        pos = self.stations.get_loc(station)
+        neighbours = self._neighbours[pos]
+        return self.stations[neighbours[neighbours < len(self.stations)]]
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(n_stations={len(self.stations)})'
+
+
+def _buddy_flags(
+        df: pd.DataFrame,
+        stations: StationIndex,
+        threshold: float,
+        min_spread: float,
+        min_neighbours: int,
+        lapse_rate: float,
+) -> pd.DataFrame:
+    pos = stations.stations.get_indexer(df.columns)
+    if (pos < 0).any():
+        unknown = df.columns[pos < 0].tolist()
+        raise KeyError(f'stations missing in the station index: {unknown}')
+
+    n_columns = len(df.columns)
+    # only neighbours that are columns of df, n_columns is missing
+    column_of = np.full(len(stations.stations) + 1, n_columns)
+    column_of[pos] = np.arange(n_columns)
+    neighbours = column_of[stations._neighbours[pos]]
+    # compare the values reduced to sea level
+    values = (
+        df.to_numpy(dtype=np.float64, na_value=np.nan) +
+        lapse_rate * stations.elevation[pos]
+    )
+    padded = np.column_stack((values, np.full(len(values), np.nan)))
+
+    flags = np.zeros(values.shape, dtype=bool)
+    chunk = max(1, _CHUNK_SIZE // max(1, neighbours.size))
+    for start in range(0, len(values), chunk):
+        stop = start + chunk
+        # timestamps x stations x neighbours
+        neighbour_values = padded[start:stop, neighbours]
+        n_valid = np.count_nonzero(~np.isnan(neighbour_values), axis=-1)
+        with warnings.catch_warnings():
+            # no valid neighbours, the median is NaN
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            median = np.nanmedian(neighbour_values, axis=-1)
+            mad = np.nanmedian(
+                np.abs(neighbour_values - median[..., None]),
+                axis=-1,
+            )
+        spread = np.maximum(MAD_SCALE * mad, min_spread)
+        deviation = np.abs(values[start:stop] - median)
+        flags[start:stop] = (
+            (n_valid >= min_neighbours) &
+            (deviation > threshold * spread)
+        )
+    return pd.DataFrame(flags, index=df.index, columns=df.columns)
+
+
+def buddy_check(
+        df: pd.DataFrame,
+        stations: StationIndex,
+        threshold: float = 3,
+        min_spread: float = 1,
+        min_neighbours: int = 3,
+        lapse_rate: float = 0,
+        duplicates: DuplicatePolicy = 'first',
+) -> dict[Hashable, Result]:
+    """
+    A check comparing the values of each station of a network with its
+    neighbours (see :func:`meteo_qc.StationIndex`) at the same time, telling
+    faulty sensors apart from the weather all stations experience. A value
+    does not pass if it differs from the median of its neighbours by more
+    than ``threshold`` times their spread (the scaled median absolute
+    deviation, but at least ``min_spread``).
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        stations = meteo_qc.StationIndex(coords, radius=50)
+        # one column per station, e.g. the temperature
+        results = meteo_qc.buddy_check(
+            temperature,
+            stations,
+            min_spread=1,
+            lapse_rate=0.0065,
+        )
+        print(results['bochum'])
+
+    All stations are compared at once for every timestamp without comparing
+    every pair of stations. Values of timestamps with fewer than
+    ``min_neighbours`` values of neighbours pass.
+
+    :param df: a ``pandas.DataFrame`` with a timezone aware
+        :func:`pd.DatetimeIndex` and one column per station of one variable,
+        e.g. the temperature or the pressure reduced to sea level.
+    :param stations: the :func:`meteo_qc.StationIndex` of the stations. It
+        can contain more stations than ``df``.
+    :param threshold: the allowed deviation from the median of the neighbours
+        in multiples of their spread
+    :param min_spread: the minimum spread of the values of the neighbours in
+        the unit of the variable, e.g. ``1`` (K) for the temperature
+    :param min_neighbours: the minimum number of neighbours with a value
+    :param lapse_rate: the decrease of the variable per m of elevation used to
+        compare stations at different elevations, e.g. ``0.0065`` (K/m) for
+        the temperature.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the stations are compared. See :func:`meteo_qc.apply_qc`.
+
+    :returns: a dictionary mapping each station (column) to a
+        :func:`meteo_qc.Result`
+    """
+    _validate_index(df)
+    _, df_sorted = _sort_and_resolve(df, duplicates)
+    flags = _buddy_flags(
+        df_sorted,
+        stations,
+        threshold=threshold,
+        min_spread=min_spread,
+        min_neighbours=min_neighbours,
+        lapse_rate=lapse_rate,
+    )
+    results: dict[Hashable, Result] = {}
+    for station in df_sorted.columns:
+        station_flags = flags[station]
+        if station_flags.any():
+            results[station] = Result(
+                function=buddy_check.__name__,
+                passed=False,
+                msg=(
+                    f'deviates from the neighbouring stations by more than '
+                    f'{threshold} times their spread'
+                ),
+                data=_flagged_rows(df_sorted[station], station_flags),
+            )
+        else:
+            results[station] = Result(
+                function=buddy_check.__name__,
+                passed=True,
+            )
+    return results
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterator
+from types import TracebackType
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from meteo_qc._data import Result
+from meteo_qc._incremental import TIME_T
+from meteo_qc._main import FinalResult
+
+SCHEMA = '''\
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    station TEXT NOT NULL,
+    data_start INTEGER NOT NULL,
+    data_end INTEGER NOT NULL,
+    data_freq TEXT,
+    passed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_station_time
+    ON runs (station, data_start, data_end);
+
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    station TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    msg TEXT,
+    has_flags INTEGER NOT NULL,
+    PRIMARY KEY (run_id, column_name, check_name)
+);
+CREATE INDEX IF NOT EXISTS results_check
+    ON results (check_name, column_name, passed);
+
+CREATE TABLE IF NOT EXISTS flags (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    station TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    n INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flags_check_time
+    ON flags (check_name, column_name, end_ms, start_ms);
+CREATE INDEX IF NOT EXISTS flags_station_time
+    ON flags (station, column_name, check_name, end_ms);
+CREATE INDEX IF NOT EXISTS flags_run ON flags (run_id);
+'''
+FLAG_COLUMNS = ['station', 'column', 'check', 'start', 'end', 'n']
+
+
+def _to_ms(ts: TIME_T) -> int:
+    timestamp = pd.Timestamp(ts)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.as_unit('ms').asm8.view(np.int64))
+
+
+def _is_int(value: Any) -> bool:
+    return (
+        not isinstance(value, bool) and
+        isinstance(value, (int, np.integer))
+    )
+
+
+def _flag_intervals(
+        result: Result,
+        step_ms: int,
+) -> list[tuple[int, int, int]] | None:
+    # the intervals (start, end, number of values) of the data of a result.
+    # Consecutive [timestamp, ..., True] rows are merged into one interval,
+    # [start, end, n] rows (e.g. gaps of missing timestamps) and
+    # [start, end, n, value] intervals are kept as they are. None if the data
+    # is in another format.
+    rows = result.data or []
+    if not rows:
+        return []
+    elif all(len(row) == 4 and _is_int(row[2]) for row in rows):
+        return [(int(row[0]), int(row[1]), int(row[2])) for row in rows]
+    elif all(len(row) == 3 and row[-1] is True for row in rows):
+        timestamps = np.array([row[0] for row in rows], dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(timestamps) != step_ms) + 1
+        starts = np.concatenate(([0], breaks))
+        stops = np.append(breaks, len(timestamps))
+        return list(
+            zip(
+                timestamps[starts].tolist(),
+                timestamps[stops - 1].tolist(),
+                (stops - starts).tolist(),
+            ),
+        )
+    elif all(len(row) == 3 and _is_int(row[-1]) for row in rows):
+        return [(int(s), int(e), int(n)) for s, e, n in rows]
+    else:
+        return None
+
+
+def _where(
+        filters: dict[str, Any],
+        start: TIME_T | None,
+        end: TIME_T | None,
+        start_col: str,
+        end_col: str,
+) -> tuple[str, list[Any]]:
+    clauses = [f'{k} = ?' for k, v in filters.items() if v is not None]
+    params = [v for v in filters.values() if v is not None]
+    # the interval overlaps with the queried period
+    if start is not None:
+        clauses.append(f'{end_col} >= ?')
+        params.append(_to_ms(start))
+    if end is not None:
+        clauses.append(f'{start_col} <= ?')
+        params.append(_to_ms(end))
+    return ' AND '.join(clauses) or '1', params
+
+
+class ResultStore:
+    """A local SQLite database of :func:`meteo_qc.FinalResult` s of many
+    stations, indexed by station, column, check and time. The values that
+    did not pass a check are stored as intervals of consecutive timestamps,
+    so the results can be queried without applying the quality control again
+    or loading the data.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        with meteo_qc.ResultStore('qc.sqlite') as store:
+            for station, df in data.items():
+                store.write(station, meteo_qc.apply_qc(df, column_mapping))
+
+            failed = store.failed_stations(
+                'persistence_check',
+                column='pressure',
+                start='2022-03-07',
+                end='2022-03-14',
+            )
+
+    Results whose ``data`` is not a list of ``[timestamp, ..., True]`` or
+    ``[start, end, n]`` rows are stored without their data, only whether
+    they passed.
+
+    :param path: the path of the database file, it is created if it does not
+        exist. ``':memory:'`` creates a temporary in memory database.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._con = sqlite3.connect(path)
+        self._con.execute('PRAGMA foreign_keys = ON')
+        self._con.executescript(SCHEMA)
+
+    def __enter__(self) -> ResultStore:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        self._con.close()
+
+    def write(self, station: str, final_res: FinalResult) -> None:
+        """Write the result of the quality control of one station in a single
+        transaction. Results of the same station of a period within the
+        period of ``final_res`` are replaced, e.g. after updating them using
+        :func:`meteo_qc.update_qc`.
+
+        :param station: the identifier of the station
+        :param final_res: the :func:`meteo_qc.FinalResult` returned by
+            :func:`meteo_qc.apply_qc`
+        """
+        data_freq = final_res['data_freq']
+        step_ms = 0
+        if data_freq is not None:
+            step_ms = pd.Timedelta(data_freq) // pd.Timedelta(1, unit='ms')
+
+        results = []
+        flags = []
+        for column, column_res in final_res['columns'].items():
+            for name, result in column_res['results'].items():
+                intervals = _flag_intervals(result, step_ms=step_ms)
+                results.append((
+                    station, column, name, result.passed, result.msg,
+                    intervals is not None,
+                ))
+                for start_ms, end_ms, n in intervals or ():
+                    flags.append((
+                        station, column, name, start_ms, end_ms, n,
+                    ))
+
+        with self._con:
+            self._con.execute(
+                'DELETE FROM runs '
+                'WHERE station = ? AND data_start >= ? AND data_end <= ?',
+                (
+                    station,
+                    final_res['data_start_date'],
+                    final_res['data_end_date'],
+                ),
+            )
+            cur = self._con.execute(
+                'INSERT INTO runs '
+                '(station, data_start, data_end, data_freq, passed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (
+                    station,
+                    final_res['data_start_date'],
+                    final_res['data_end_date'],
+                    data_freq,
+                    final_res['passed'],
+                ),
+            )
+            run_id = cur.lastrowid
+            self._con.executemany(
+                'INSERT INTO results '
+                '(run_id, station, column_name, check_name, passed, msg, '
+                'has_flags) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((run_id, *row) for row in results),
+            )
+            self._con.executemany(
+                'INSERT INTO flags '
+                '(run_id, station, column_name, check_name, start_ms, end_ms, '
+                'n) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((run_id, *row) for row in flags),
+            )
+
+    def stations(self) -> list[str]:
+        """Get the identifiers of all stations in the store."""
+        cur = self._con.execute(
+            'SELECT DISTINCT station FROM runs ORDER BY station',
+        )
+        return [station for station, in cur]
+
+    def query_flags(
+            self,
+            station: str | None = None,
+            column: str | None = None,
+            check: str | None = None,
+            start: TIME_T | None = None,
+            end: TIME_T | None = None,
+    ) -> pd.DataFrame:
+        """Query the intervals of values that did not pass a check. All
+        arguments are optional filters, timestamps without a timezone are in
+        UTC.
+
+        :param station: the identifier of the station
+        :param column: the name of the column
+        :param check: the name of the check, e.g. ``'range_check'``
+        :param start: only intervals ending at or after this timestamp
+        :param end: only intervals starting at or before this timestamp
+
+        :returns: a ``pandas.DataFrame`` with the columns ``station``,
+            ``column``, ``check``, ``start``, ``end`` (both UTC and included)
+            and ``n``, the number of values (or missing timestamps) in the
+            interval.
+        """
+        where, params = _where(
+            {'station': station, 'column_name': column, 'check_name': check},
+            start=start,
+            end=end,
+            start_col='start_ms',
+            end_col='end_ms',
+        )
+        rows = self._con.execute(
+            f'SELECT station, column_name, check_name, start_ms, end_ms, n '
+            f'FROM flags WHERE {where} '
+            f'ORDER BY station, column_name, check_name, start_ms',
+            params,
+        ).fetchall()
+        df = pd.DataFrame(rows, columns=FLAG_COLUMNS)
+        for col in ('start', 'end'):
+            df[col] = pd.to_datetime(
+                df[col].to_numpy(dtype=np.int64),
+                unit='ms',
+                utc=True,
+            )
+        return df.astype({'n': np.int64})
+
+    def _iter_failed(
+            self,
+            check: str,
+            column: str | None,
+            start: TIME_T | None,
+            end: TIME_T | None,
+    ) -> Iterator[str]:
+        where, params = _where(
+            {'check_name': check, 'column_name': column},
+            start=start,
+            end=end,
+            start_col='start_ms',
+            end_col='end_ms',
+        )
+        yield from (
+            station for station, in self._con.execute(
+                f'SELECT DISTINCT station FROM flags WHERE {where}',
+                params,
+            )
+        )
+        # results without data only know the period of the checked data
+        where, params = _where(
+            {'results.check_name': check, 'results.column_name': column},
+            start=start,
+            end=end,
+            start_col='runs.data_start',
+            end_col='runs.data_end',
+        )
+        yield from (
+            station for station, in self._con.execute(
+                f'SELECT DISTINCT results.station FROM results '
+                f'JOIN runs USING (run_id) '
+                f'WHERE NOT results.passed AND NOT results.has_flags '
+                f'AND {where}',
+                params,
+            )
+        )
+
+    def failed_stations(
+            self,
+            check: str,
+            column: str | None = None,
+            start: TIME_T | None = None,
+            end: TIME_T | None = None,
+    ) -> list[str]:
+        """Query the stations that did not pass a check, e.g. which stations
+        failed the ``persistence_check`` of the column ``pressure`` last week.
+        Timestamps without a timezone are in UTC.
+
+        :param check: the name of the check, e.g. ``'persistence_check'``
+        :param column: only the results of this column
+        :param start: only values at or after this timestamp
+        :param end: only values at or before this timestamp
+
+        :returns: the sorted identifiers of the stations
+        """
+        return sorted(set(self._iter_failed(check, column, start, end)))
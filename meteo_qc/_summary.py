@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _compute_flags
+from meteo_qc._data import _use_data_format
+from meteo_qc._data import DataFormat
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.generic import duplicate_timestamps
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+
+Resolution = Literal['hour', 'day', 'month']
+RESOLUTIONS: tuple[Resolution, ...] = ('hour', 'day', 'month')
+# the column holding the number of values (rows) per period
+N_VALUES = 'n_values'
+
+
+class QCSummary:
+    """A pyramid of the number of values that failed each check, per column,
+    at hourly, daily and monthly resolution. Create one using
+    :func:`meteo_qc.summarize_qc`.
+
+    Each resolution is a ``pandas.DataFrame`` indexed by ``column`` and
+    ``time`` (the start of the period in UTC). It has one column
+    ``n_values`` with the number of values in this period and one column per
+    check with the number of values that failed it. Only periods containing
+    any values or failures are stored.
+
+    .. code-block:: python
+
+        summary = meteo_qc.summarize_qc(df, column_mapping)
+        daily = summary['day']
+        pass_rate = 1 - daily['range_check'] / daily['n_values']
+
+    Summaries of subsequent periods can be combined using
+    :func:`meteo_qc.QCSummary.merge`, so an archive only needs to be
+    processed once.
+    """
+
+    def __init__(self, levels: dict[Resolution, pd.DataFrame]) -> None:
+        self._levels = levels
+
+    @classmethod
+    def from_hourly(cls, hourly: pd.DataFrame) -> QCSummary:
+        """Build the pyramid from the hourly counts by aggregating them to
+        daily and monthly counts.
+
+        :param hourly: a ``pandas.DataFrame`` in the format of
+            ``summary['hour']``.
+        """
+        levels: dict[Resolution, pd.DataFrame] = {'hour': hourly}
+        for resolution in RESOLUTIONS[1:]:
+            levels[resolution] = _aggregate(hourly, resolution=resolution)
+        return cls(levels)
+
+    def __getitem__(self, resolution: Resolution) -> pd.DataFrame:
+        return self._levels[resolution]
+
+    def merge(self, other: QCSummary) -> QCSummary:
+        """Merge with the summary of another period, adding up the counts.
+        Periods (or columns) of both summaries should not overlap, otherwise
+        values are counted twice.
+
+        :param other: the :func:`meteo_qc.QCSummary` to merge with
+
+        :returns: a new :func:`meteo_qc.QCSummary` containing both
+        """
+        levels: dict[Resolution, pd.DataFrame] = {}
+        for resolution in RESOLUTIONS:
+            levels[resolution] = _sum_counts(
+                pd.concat((self[resolution], other[resolution])),
+            )
+        return type(self)(levels)
+
+    def __repr__(self) -> str:
+        columns = self['hour'].index.unique(level='column').tolist()
+        return f'{type(self).__name__}(columns={columns})'
+
+
+def _sum_counts(counts: pd.DataFrame) -> pd.DataFrame:
+    counts = counts.groupby(level=['column', 'time']).sum()
+    return counts.fillna(0).astype(np.int64)
+
+
+def _aggregate(hourly: pd.DataFrame, resolution: Resolution) -> pd.DataFrame:
+    time = hourly.index.get_level_values('time')
+    assert isinstance(time, pd.DatetimeIndex)
+    unit = {'day': 'D', 'month': 'M'}[resolution]
+    period = time.tz_localize(None).to_numpy().astype(f'M8[{unit}]')
+    keys = [
+        hourly.index.get_level_values('column'),
+        pd.DatetimeIndex(period.astype('M8[s]'), tz='UTC', name='time'),
+    ]
+    return _sum_counts(hourly.groupby(keys).sum())
+
+
+def _hourly_counts(idx: pd.DatetimeIndex) -> pd.Series[int]:
+    # the index is sorted, hence counting the runs of the same hour is enough
+    hour = pd.Timedelta(hours=1) // pd.Timedelta(1, unit=idx.unit)
+    hours = idx.asi8 // hour
+    starts = np.flatnonzero(np.diff(hours, prepend=hours[:1] - 1))
+    counts = np.diff(np.append(starts, len(hours)))
+    time = pd.DatetimeIndex(
+        (hours[starts] * 3600).astype('M8[s]'),
+        tz='UTC',
+        name='time',
+    )
+    return pd.Series(counts, index=time, dtype=np.int64)
+
+
+def summarize_qc(
+        df: DataFrameLike,
+        column_mapping: ColumnMapping | QCPlan,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        data_format: DataFormat = 'rows',
+        duplicates: DuplicatePolicy = 'first',
+) -> QCSummary:
+    """
+    Apply the quality control to a ``pandas.DataFrame``, but only count the
+    number of values that failed each check per hour, day and month instead
+    of collecting them in a :func:`meteo_qc.FinalResult`. The counts are
+    computed directly from the flags of the checks (see
+    :func:`meteo_qc.register_flags`). Checks without registered flags are
+    counted using the timestamps of the ``data`` of their
+    :func:`meteo_qc.Result`.
+
+    .. code-block:: python
+
+        import meteo_qc
+
+        summary = meteo_qc.summarize_qc(df_2022, column_mapping)
+        summary = summary.merge(meteo_qc.summarize_qc(df_2023, column_mapping))
+        print(summary['month'])
+
+    :param df: The DataFrame the quality control should be applied to. This
+        can also be an arrow table, see :func:`meteo_qc.apply_qc`.
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`),
+        that assigns groups to columns or a :func:`meteo_qc.QCPlan`.
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param data_format: the format of the ``data`` of the results the checks
+        without registered flags are counted from. See
+        :func:`meteo_qc.apply_qc`.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the checks are applied. See :func:`meteo_qc.apply_qc`. ``n_values``
+        counts the resolved rows, ``duplicate_timestamps`` all rows of the
+        duplicated timestamps.
+
+    :returns: a :func:`meteo_qc.QCSummary` with the counts.
+    """  # noqa: E501
+    df = _as_dataframe(df)
+    _validate_index(df)
+    df_original, df_sorted = _sort_and_resolve(df, duplicates)
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    n_values = _hourly_counts(df_sorted.index)
+    plan = _to_plan(column_mapping)
+    column_counts = []
+    with (
+            _use_freq_options(freq_method, freq_tolerance),
+            _use_data_format(data_format),
+    ):
+        for column in df_sorted.columns:
+            column_plan = plan.for_column(column)
+            check_counts = {}
+            for check in column_plan.checks:
+                s = df_sorted[column]
+                if (
+                        check.func is duplicate_timestamps and
+                        df_sorted is not df_original
+                ):
+                    # the duplicates are counted in the original data
+                    s = df_original[column]
+                flags = _compute_flags(check.func, s, check.kwargs)
+                if flags is None:
+                    continue
+                flagged = flags.index[flags.to_numpy()]
+                assert isinstance(flagged, pd.DatetimeIndex)
+                check_counts[check.name] = _hourly_counts(flagged)
+
+            counts = {N_VALUES: n_values}
+            for name in column_plan.result_order:
+                if name in check_counts:
+                    counts[name] = check_counts[name]
+            column_counts.append(pd.DataFrame(counts))
+
+    hourly = pd.concat(column_counts, keys=df_sorted.columns, names=['column'])
+    return QCSummary.from_hourly(_sum_counts(hourly))
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import inspect
+import itertools
+from collections.abc import Callable
+from collections.abc import Hashable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from meteo_qc._arrow import _as_dataframe
+from meteo_qc._arrow import DataFrameLike
+from meteo_qc._colum_mapping import ColumnMapping
+from meteo_qc._data import _compute_flags
+from meteo_qc._data import FUNC_T
+from meteo_qc._data import FUNCS
+from meteo_qc._main import _sort_and_resolve
+from meteo_qc._main import _validate_index
+from meteo_qc._main import DuplicatePolicy
+from meteo_qc._plan import _to_plan
+from meteo_qc._plan import QCPlan
+from meteo_qc._plugins.values import _as_float_array
+from meteo_qc._plugins.values import _infer_index_freq
+from meteo_qc._plugins.values import _run_lengths
+from meteo_qc._plugins.values import _spike_dip_rates
+from meteo_qc._plugins.values import _to_full_index
+from meteo_qc._plugins.values import _use_freq_options
+from meteo_qc._plugins.values import FreqMethod
+from meteo_qc._plugins.values import persistence_check
+from meteo_qc._plugins.values import range_check
+from meteo_qc._plugins.values import spike_dip_check
+
+# check name -> argument name -> the values to try
+GRID_T = Mapping[str, Mapping[str, Sequence[Any]]]
+# counts the values failing the check for every combination of arguments
+COUNT_FUNC_T = Callable[
+    ['pd.Series[float]', list[dict[str, Any]]],
+    npt.NDArray[np.int64],
+]
+
+
+def _find_check(name: str) -> FUNC_T:
+    for funcs in FUNCS.values():
+        for func_info in funcs:
+            if func_info['func'].__name__ == name:
+                return func_info['func']
+    raise KeyError(f'unregistered check: {name!r}')
+
+
+def _validate_grid(
+        name: str,
+        func: FUNC_T,
+        grid: Mapping[str, Sequence[Any]],
+) -> None:
+    # the first parameter is the series
+    _, *params = inspect.signature(func).parameters
+    for arg in grid:
+        if arg not in params:
+            raise ValueError(f'unknown argument of {name!r}: {arg!r}')
+
+
+def _combinations(
+        name: str,
+        func: FUNC_T,
+        kwargs: Mapping[str, Any],
+        grid: Mapping[str, Sequence[Any]],
+) -> list[dict[str, Any]]:
+    _, *params = inspect.signature(func).parameters.values()
+    defaults = {
+        param.name: param.default
+        for param in params
+        if param.default is not inspect.Parameter.empty
+    }
+    for param in params:
+        if param.name not in {**defaults, **kwargs, **grid}:
+            raise ValueError(
+                f'missing argument of {name!r}: {param.name!r}. Add it to '
+                f'the grid or pass a column mapping of a group the check is '
+                f'registered for',
+            )
+    return [
+        {**defaults, **kwargs, **dict(zip(grid, values))}
+        for values in itertools.product(*grid.values())
+    ]
+
+
+def _column_kwargs(
+        name: str,
+        df: pd.DataFrame,
+        plan: QCPlan | None,
+) -> dict[str, Mapping[str, Any]]:
+    if plan is None:
+        return {column: {} for column in df.columns}
+
+    kwargs = {}
+    for column in df.columns:
+        for check in plan.for_column(column).checks:
+            if check.name == name:
+                kwargs[column] = check.kwargs
+    return kwargs
+
+
+def _count_range(
+        s: pd.Series[float],
+        combinations: list[dict[str, Any]],
+) -> npt.NDArray[np.int64]:
+    values = _as_float_array(s)
+    values = np.sort(values[~np.isnan(values)])
+    lower = np.array([c['lower_bound'] for c in combinations])
+    upper = np.array([c['upper_bound'] for c in combinations])
+    below = np.searchsorted(values, lower.astype(values.dtype), side='left')
+    not_above = np.searchsorted(
+        values,
+        upper.astype(values.dtype),
+        side='right',
+    )
+    # values below the lower and above the upper bound are only counted once
+    both = np.maximum(below - not_above, 0)
+    return below + (len(values) - not_above) - both
+
+
+def _count_spike_dip_full(
+        s: pd.Series[float],
+        combinations: list[dict[str, Any]],
+) -> npt.NDArray[np.int64]:
+    full = _to_full_index(s)
+    if full is None:
+        return np.zeros(len(combinations), dtype=np.int64)
+
+    s_full, freq_delta = full
+    changes = np.abs(np.diff(_as_float_array(s_full)))
+    changes = np.sort(changes[~np.isnan(changes)])
+    # the same computation as in the check, so the results are identical
+    allowed = np.array([
+        (freq_delta.total_seconds() / 60) * c['delta'] for c in combinations
+    ])
+    not_above = np.searchsorted(
+        changes,
+        allowed.astype(changes.dtype),
+        side='right',
+    )
+    return len(changes) - not_above
+
+
+def _count_spike_dip(
+        s: pd.Series[float],
+        combinations: list[dict[str, Any]],
+) -> npt.NDArray[np.int64]:
+    by_max_gap: dict[Any, list[int]] = {}
+    for i, c in enumerate(combinations):
+        by_max_gap.setdefault(c['max_gap'], []).append(i)
+
+    counts = np.zeros(len(combinations), dtype=np.int64)
+    for max_gap, positions in by_max_gap.items():
+        gap_combinations = [combinations[i] for i in positions]
+        if max_gap is None:
+            counts[positions] = _count_spike_dip_full(s, gap_combinations)
+        else:
+            _, rates = _spike_dip_rates(s, max_gap=max_gap)
+            rates = np.sort(rates)
+            deltas = np.array([c['delta'] for c in gap_combinations])
+            counts[positions] = len(rates) - np.searchsorted(
+                rates,
+                deltas.astype(rates.dtype),
+                side='right',
+            )
+    return counts
+
+
+def _count_persistence(
+        s: pd.Series[float],
+        combinations: list[dict[str, Any]],
+) -> npt.NDArray[np.int64]:
+    full = _to_full_index(s)
+    if full is None:
+        return np.zeros(len(combinations), dtype=np.int64)
+
+    s_full, freq_delta = full
+    values = _as_float_array(s_full)
+    isnan = np.isnan(values)
+    # the run lengths are the same for every window, see _is_persistent
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = values[1:] != values[:-1]
+    run_lengths = _run_lengths(new_run)
+    new_nan_run = np.ones(len(values), dtype=bool)
+    new_nan_run[1:] = ~(isnan[1:] & isnan[:-1])
+    nan_run_lengths = _run_lengths(new_nan_run)
+    nan_runs = np.sort(nan_run_lengths[isnan])
+    # NaNs at the beginning are also flagged if the window is longer
+    leading = isnan & (nan_run_lengths == np.arange(1, len(values) + 1))
+    leading_runs = np.sort(nan_run_lengths[leading])
+
+    runs_by_excludes: dict[tuple[Any, ...], npt.NDArray[np.int64]] = {}
+    counts = np.zeros(len(combinations), dtype=np.int64)
+    for i, c in enumerate(combinations):
+        window = c['window'] // freq_delta
+        if window < 1:
+            raise ValueError(
+                f'the window ({c["window"]}) must not be shorter than the '
+                f'temporal resolution ({freq_delta})',
+            )
+        if len(values) <= window:
+            continue
+
+        excludes = tuple(c['excludes'])
+        if excludes not in runs_by_excludes:
+            excluded = np.isin(values, np.asarray(excludes, values.dtype))
+            runs_by_excludes[excludes] = np.sort(
+                run_lengths[~isnan & ~excluded],
+            )
+        runs = runs_by_excludes[excludes]
+        counts[i] = (
+            len(runs) - np.searchsorted(runs, window, side='left') +
+            len(nan_runs) - np.searchsorted(nan_runs, window, side='left') +
+            np.searchsorted(leading_runs, window, side='left')
+        )
+    return counts
+
+
+_COUNT_FUNCS: dict[FUNC_T, COUNT_FUNC_T] = {
+    range_check: _count_range,
+    spike_dip_check: _count_spike_dip,
+    persistence_check: _count_persistence,
+}
+
+
+def _count_flags(
+        func: FUNC_T,
+        s: pd.Series[float],
+        combinations: list[dict[str, Any]],
+) -> npt.NDArray[np.int64]:
+    count_func = _COUNT_FUNCS.get(func)
+    if count_func is not None:
+        return count_func(s, combinations)
+
+    counts = np.zeros(len(combinations), dtype=np.int64)
+    for i, kwargs in enumerate(combinations):
+        flags = _compute_flags(func, s, kwargs)
+        if flags is not None:
+            counts[i] = int(flags.sum())
+    return counts
+
+
+def _hashable(value: Any) -> Hashable:
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _grid_index(grid: Mapping[str, Sequence[Any]]) -> pd.Index[Any]:
+    if not grid:
+        return pd.RangeIndex(1)
+
+    grid_values = [
+        [_hashable(value) for value in values] for values in grid.values()
+    ]
+    if len(grid_values) == 1:
+        # an object index, so e.g. a max_gap of None is not converted to NaT
+        level_values, = grid_values
+        return pd.Index(
+            level_values,
+            dtype=object,
+            name=next(iter(grid)),
+            tupleize_cols=False,
+        )
+
+    # MultiIndex.from_arrays and .from_tuples convert the levels, e.g. None
+    # and timedeltas of a max_gap to NaT and pd.Timedelta. Object levels with
+    # the unique values of the grid keep them
+    positions = [
+        {value: i for i, value in enumerate(dict.fromkeys(level_values))}
+        for level_values in grid_values
+    ]
+    codes = [
+        [level_positions[value] for value in level_values]
+        for level_positions, level_values in zip(positions, grid_values)
+    ]
+    return pd.MultiIndex(
+        levels=[
+            pd.Index(list(level_positions), dtype=object, tupleize_cols=False)
+            for level_positions in positions
+        ],
+        codes=[list(c) for c in zip(*itertools.product(*codes))],
+        names=list(grid),
+    )
+
+
+def sweep_qc(
+        df: DataFrameLike,
+        grid: GRID_T,
+        column_mapping: ColumnMapping | QCPlan | None = None,
+        freq_method: FreqMethod = 'min',
+        freq_tolerance: float = 0.05,
+        duplicates: DuplicatePolicy = 'first',
+) -> dict[str, pd.DataFrame]:
+    """
+    Count the values failing checks for every combination of the arguments
+    in ``grid``, e.g. to tune the arguments registered for a group. This is
+    much faster than applying the quality control once per combination.
+    :func:`meteo_qc.range_check`, :func:`meteo_qc.spike_dip_check` and
+    :func:`meteo_qc.persistence_check` prepare the data once per column (the
+    sorted values, changes or run lengths) and then count the values failing
+    each combination using a binary search. Other checks are applied once
+    per combination.
+
+    .. code-block:: python
+
+        import meteo_qc
+        from datetime import timedelta
+
+        column_mapping = meteo_qc.ColumnMapping()
+        column_mapping['temp'].add_group('temperature')
+
+        counts = meteo_qc.sweep_qc(
+            df,
+            {
+                'range_check': {'lower_bound': [-40, -30, -20]},
+                'persistence_check': {
+                    'window': [timedelta(hours=h) for h in range(1, 7)],
+                },
+            },
+            column_mapping,
+        )
+        print(counts['range_check'])
+
+    :param df: The DataFrame the checks should be applied to. This can also
+        be an arrow table, see :func:`meteo_qc.apply_qc`.
+    :param grid: maps the names of registered checks to the values of their
+        arguments to try.
+    :param column_mapping: A column mapping (:func:`meteo_qc.ColumnMapping`)
+        or a :func:`meteo_qc.QCPlan`. The arguments not in the grid are the
+        ones the check is applied with to each column (see
+        :func:`meteo_qc.get_plugin_args`), columns the check is not applied
+        to are not counted. Without a column mapping every column is
+        counted and the arguments not in the grid must have a default.
+    :param freq_method: the method used to infer the frequency of the data.
+        See :func:`meteo_qc.apply_qc`.
+    :param freq_tolerance: the relative tolerance used when ``freq_method`` is
+        ``'mode'``.
+    :param duplicates: how rows with the same timestamp are resolved before
+        the values failing the checks are counted. See
+        :func:`meteo_qc.apply_qc`.
+
+    :returns: a ``pandas.DataFrame`` per check, indexed by the combinations of
+        the arguments with one column of the number of values failing the
+        check per counted column of ``df``. Lists of values in the index are
+        converted to tuples.
+    """
+    df = _as_dataframe(df)
+    _validate_index(df)
+    _, df_sorted = _sort_and_resolve(df, duplicates)
+    assert isinstance(df_sorted.index, pd.DatetimeIndex)
+    _infer_index_freq(
+        df_sorted.index,
+        method=freq_method,
+        tolerance=freq_tolerance,
+    )
+    plan = None if column_mapping is None else _to_plan(column_mapping)
+    tables = {}
+    with _use_freq_options(freq_method, freq_tolerance):
+        for name, check_grid in grid.items():
+            func = _find_check(name)
+            _validate_grid(name, func, check_grid)
+            counts = {
+                column: _count_flags(
+                    func,
+                    df_sorted[column],
+                    _combinations(name, func, kwargs, check_grid),
+                )
+                for column, kwargs in _column_kwargs(
+                    name,
+                    df_sorted,
+                    plan,
+                ).items()
+            }
+            tables[name] = pd.DataFrame(
+                counts,
+                index=_grid_index(check_grid),
+                dtype=np.int64,
+            )
+    return tables
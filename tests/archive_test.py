@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import ColumnMapping
+from meteo_qc import open_archive
+from meteo_qc import write_archive
+
+
+@pytest.fixture
+def data():
+    data = pd.read_csv('testing/test_data.csv')
+    data['date'] = pd.to_datetime(data['date'], utc=True)
+    return data.set_index('date')
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    return column_mapping
+
+
+def test_archive_roundtrip(tmp_path, data, column_mapping):
+    path = str(tmp_path / 'station_1')
+    write_archive(path, data.iloc[::-1], column_mapping)
+    archive = open_archive(path)
+    pd.testing.assert_frame_equal(archive.df, data)
+    assert archive.df.index.name == 'date'
+    assert archive.column_mapping is not None
+    assert archive.column_mapping['temp'] == ['generic', 'temperature']
+    assert list(archive.column_mapping) == ['pressure_reduced', 'temp']
+    result = apply_qc(archive.df, archive.column_mapping)
+    assert result == apply_qc(data, column_mapping)
+
+
+def test_archive_is_memory_mapped(tmp_path):
+    idx = pd.date_range(
+        '2022-01-01',
+        periods=10,
+        freq='10min',
+        tz='Europe/Berlin',
+    )
+    df = pd.DataFrame(
+        {'temp': np.arange(10.0), 'flag': np.arange(10) > 5},
+        index=idx,
+    )
+    path = str(tmp_path / 'station_1')
+    write_archive(path, df)
+    archive = open_archive(path)
+    assert archive.column_mapping is None
+    values = archive.df['temp'].to_numpy()
+    assert not values.flags.writeable
+    assert isinstance(archive.df.index, pd.DatetimeIndex)
+    assert str(archive.df.index.tz) == 'Europe/Berlin'
+    assert archive.df['flag'].dtype == bool
+    # the values are read from the file
+    data = np.memmap(str(tmp_path / 'station_1' / '0.bin'), mode='r+')
+    data[:8] = np.frombuffer(np.float64(42).tobytes(), dtype=np.uint8)
+    data.flush()
+    assert archive.df['temp'].iloc[0] == 42
+
+
+def test_archive_empty(tmp_path):
+    idx = pd.DatetimeIndex([], tz='UTC')
+    df = pd.DataFrame({'temp': np.array([], dtype=float)}, index=idx)
+    write_archive(str(tmp_path), df)
+    archive = open_archive(str(tmp_path))
+    assert archive.df.empty
+    assert list(archive.df.columns) == ['temp']
+
+
+def test_write_archive_non_numeric_column(tmp_path, data):
+    data = data.assign(station='a')
+    with pytest.raises(TypeError) as exc_info:
+        write_archive(str(tmp_path), data)
+    msg, = exc_info.value.args
+    assert msg.startswith("the column 'station' must be numeric or boolean")
+
+
+def test_open_archive_not_an_archive(tmp_path):
+    (tmp_path / 'meta.json').write_text(json.dumps({'format': 'other'}))
+    with pytest.raises(ValueError) as exc_info:
+        open_archive(str(tmp_path))
+    msg, = exc_info.value.args
+    assert msg == f'{tmp_path}: not a meteo-qc-archive'
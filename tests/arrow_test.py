@@ -0,0 +1,110 @@
+import sys
+from datetime import datetime
+from datetime import timezone
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import ColumnMapping
+from meteo_qc import summarize_qc
+from meteo_qc._arrow import _as_dataframe
+
+
+@pytest.fixture
+def data():
+    data = pd.read_csv('testing/test_data.csv')
+    data['date'] = pd.to_datetime(data['date'], utc=True)
+    return data.set_index('date')
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('pressure')
+    column_mapping['pressure_persistent'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    return column_mapping
+
+
+def test_apply_qc_arrow_table(data, column_mapping):
+    table = pa.Table.from_pandas(data.reset_index(), preserve_index=False)
+    assert apply_qc(table, column_mapping) == apply_qc(data, column_mapping)
+
+
+def test_apply_qc_polars(data, column_mapping):
+    df = pl.from_pandas(data.reset_index())
+    assert apply_qc(df, column_mapping) == apply_qc(data, column_mapping)
+
+
+def test_summarize_qc_arrow_table(data, column_mapping):
+    table = pa.Table.from_pandas(data.reset_index(), preserve_index=False)
+    result = summarize_qc(table, column_mapping)
+    expected = summarize_qc(data, column_mapping)
+    pd.testing.assert_frame_equal(result['hour'], expected['hour'])
+
+
+def test_as_dataframe_does_not_copy_values():
+    values = pa.array([1.5, 2.5, 3.5])
+    table = pa.table({
+        'date': pa.array(
+            np.arange(3).astype('M8[h]').astype('M8[us]'),
+            type=pa.timestamp('us', tz='Europe/Berlin'),
+        ),
+        'temp': values,
+    })
+    df = _as_dataframe(table)
+    assert np.shares_memory(df['temp'].to_numpy(), values.to_numpy())
+    assert df.index.name == 'date'
+    assert df.index[0] == datetime(1970, 1, 1, tzinfo=timezone.utc)
+    assert isinstance(df.index, pd.DatetimeIndex)
+    assert str(df.index.tz) == 'Europe/Berlin'
+
+
+def test_as_dataframe_nulls_become_nan():
+    table = pa.table({
+        'date': pa.array([0, 1], type=pa.timestamp('s', tz='UTC')),
+        'temp': pa.array([1, None], type=pa.int64()),
+        'station': ['a', 'b'],
+    })
+    df = _as_dataframe(table)
+    np.testing.assert_array_equal(df['temp'].to_numpy(), [1, np.nan])
+    assert df['station'].tolist() == ['a', 'b']
+
+
+def test_as_dataframe_timestamps_without_timezone():
+    table = pa.table({'date': pa.array([0], type=pa.timestamp('s'))})
+    with pytest.raises(TypeError) as exc_info:
+        _as_dataframe(table)
+    msg, = exc_info.value.args
+    assert msg == "the timestamps of the column 'date' must be timezone aware"
+
+
+def test_as_dataframe_without_timestamps():
+    with pytest.raises(TypeError) as exc_info:
+        _as_dataframe(pa.table({'temp': [1.0]}))
+    msg, = exc_info.value.args
+    assert msg == 'the table must have a column of timestamps'
+
+
+def test_as_dataframe_unknown_type():
+    with pytest.raises(TypeError) as exc_info:
+        _as_dataframe({'temp': [1.0]})  # type: ignore[arg-type]
+    msg, = exc_info.value.args
+    assert msg == (
+        "expected a pandas.DataFrame or a table implementing the arrow "
+        "PyCapsule interface, not <class 'dict'>"
+    )
+
+
+def test_as_dataframe_without_pyarrow(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ImportError) as exc_info:
+        _as_dataframe(pl.DataFrame({'temp': [1.0]}))
+    msg, = exc_info.value.args
+    assert msg == (
+        'pyarrow is required, install it using: pip install meteo-qc[arrow]'
+    )
@@ -0,0 +1,196 @@
+import json
+import shutil
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from meteo_qc import get_plugin_args
+from meteo_qc._cli import _find_files
+from meteo_qc._cli import _parse_plugin_arg
+from meteo_qc._cli import main
+from meteo_qc._io import _read_file
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    shutil.copy('testing/test_data.csv', tmp_path / 'a.csv')
+    (tmp_path / 'sub').mkdir()
+    df = pd.read_csv('testing/test_data.csv', index_col=0, parse_dates=True)
+    df.to_parquet(tmp_path / 'sub' / 'b.parquet')
+    (tmp_path / 'notes.txt').write_text('not data\n')
+    return tmp_path
+
+
+@pytest.fixture
+def restore_plugin_args():
+    plugin_args = get_plugin_args()
+    before = {
+        group: {check: dict(args) for check, args in checks.items()}
+        for group, checks in plugin_args.items()
+    }
+    yield
+    for group, checks in before.items():
+        for check, args in checks.items():
+            plugin_args[group][check].clear()
+            plugin_args[group][check].update(args)
+
+
+def _records(capsys):
+    out, err = capsys.readouterr()
+    return [json.loads(line) for line in out.splitlines()], err
+
+
+def test_find_files_directory_and_glob(data_dir):
+    files = _find_files([str(data_dir), str(data_dir / '*.csv')])
+    assert files == [str(data_dir / 'a.csv'), str(data_dir / 'sub/b.parquet')]
+
+
+def test_find_files_does_not_exist(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        _find_files([str(tmp_path / 'missing.csv')])
+
+
+def test_read_file_csv_and_parquet_are_equal(data_dir):
+    csv = _read_file(str(data_dir / 'a.csv'))
+    parquet = _read_file(str(data_dir / 'sub' / 'b.parquet'))
+    assert isinstance(csv.index, pd.DatetimeIndex)
+    assert str(csv.index.tz) == 'UTC'
+    pd.testing.assert_frame_equal(csv, parquet, check_index_type=False)
+
+
+def test_read_file_timezone(data_dir):
+    df = _read_file(str(data_dir / 'a.csv'), index_col='date', tz='Etc/GMT-1')
+    assert df.index[0] == pd.Timestamp('2022-01-01 09:00', tz='UTC')
+
+
+@pytest.mark.parametrize(
+    ('s', 'expected'),
+    (
+        (
+            'temperature.range_check.upper_bound=45.5',
+            ('temperature', 'range_check', 'upper_bound', 45.5),
+        ),
+        (
+            'temperature.persistence_check.window=3h',
+            (
+                'temperature', 'persistence_check', 'window',
+                timedelta(hours=3),
+            ),
+        ),
+        # arguments of the check that were not registered
+        (
+            'generic.missing_timestamps.per_row=true',
+            ('generic', 'missing_timestamps', 'per_row', True),
+        ),
+        (
+            'temperature.spike_dip_check.max_gap=30min',
+            (
+                'temperature', 'spike_dip_check', 'max_gap',
+                timedelta(minutes=30),
+            ),
+        ),
+        (
+            'temperature.spike_dip_check.max_gap=null',
+            ('temperature', 'spike_dip_check', 'max_gap', None),
+        ),
+        (
+            'temperature.persistence_check.excludes=[0, 1]',
+            ('temperature', 'persistence_check', 'excludes', [0, 1]),
+        ),
+    ),
+)
+def test_parse_plugin_arg(s, expected):
+    assert _parse_plugin_arg(s) == expected
+
+
+@pytest.mark.parametrize(
+    's',
+    (
+        'temperature.range_check',
+        'temperature.range_check.nope=1',
+        'temperature.range_check.s=1',
+        'temperature.nope.upper_bound=1',
+    ),
+)
+def test_parse_plugin_arg_invalid(s, capsys):
+    with pytest.raises(SystemExit):
+        main(['run', '-a', s, 'testing/test_data.csv'])
+    _, err = capsys.readouterr()
+    assert 'GROUP.CHECK.ARG=VALUE' in err or 'unknown plugin argument' in err
+
+
+@pytest.mark.parametrize('jobs', ('1', '2'))
+def test_main_run(data_dir, jobs, capsys):
+    assert main(['run', str(data_dir), '-j', jobs]) == 0
+    records, err = _records(capsys)
+    assert sorted(r['path'] for r in records) == [
+        str(data_dir / 'a.csv'),
+        str(data_dir / 'sub' / 'b.parquet'),
+    ]
+    for record in records:
+        assert record['rows'] == 42
+        assert record['passed'] is False
+        results = record['result']['columns']['temp']['results']
+        assert results['missing_timestamps']['passed'] is False
+    assert '[2/2]' in err
+    assert 'processed 2 files (84 rows)' in err
+
+
+def test_main_run_column_mapping(data_dir, capsys):
+    mapping = data_dir / 'mapping.json'
+    mapping.write_text(json.dumps({'temp': ['temperature']}))
+    ret = main(['run', str(data_dir / 'a.csv'), '-m', str(mapping), '-j1'])
+    assert ret == 0
+    (record,), _ = _records(capsys)
+    columns = record['result']['columns']
+    assert 'range_check' in columns['temp']['results']
+    assert 'range_check' not in columns['pressure']['results']
+
+
+def test_main_run_column_mapping_unregistered_group(data_dir, capsys):
+    mapping = data_dir / 'mapping.json'
+    mapping.write_text(json.dumps({'temp': ['nope']}))
+    assert main(['run', str(data_dir), '-m', str(mapping)]) == 1
+    _, err = capsys.readouterr()
+    assert err == f"error: {mapping}: unregistered group: 'nope'\n"
+
+
+def test_main_run_plugin_arg(data_dir, restore_plugin_args, capsys):
+    mapping = data_dir / 'mapping.json'
+    mapping.write_text(json.dumps({'temp': ['temperature']}))
+    ret = main([
+        'run', str(data_dir / 'a.csv'), '-j1', '-m', str(mapping),
+        '-a', 'temperature.range_check.upper_bound=0',
+    ])
+    assert ret == 0
+    (record,), _ = _records(capsys)
+    results = record['result']['columns']['temp']['results']
+    assert results['range_check']['msg'] == 'out of allowed range of [-40 - 0]'
+
+
+def test_main_run_error_in_file(data_dir, tmp_path, capsys):
+    (data_dir / 'bad.csv').write_text('date,temp\nnot a date,1\n')
+    output = tmp_path / 'out.jsonl'
+    ret = main(['run', str(data_dir), '-j1', '-q', '-o', str(output)])
+    assert ret == 1
+    _, err = capsys.readouterr()
+    assert '[1/3]' not in err
+    assert '1 errors' in err
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    errors = [r for r in records if 'error' in r]
+    assert [r['path'] for r in errors] == [str(data_dir / 'bad.csv')]
+    assert errors[0]['error'].startswith('DateParseError')
+
+
+def test_main_run_no_files(tmp_path, capsys):
+    assert main(['run', str(tmp_path)]) == 1
+    _, err = capsys.readouterr()
+    assert err == 'error: no files found\n'
+
+
+def test_main_run_invalid_jobs(capsys):
+    with pytest.raises(SystemExit):
+        main(['run', 'testing/test_data.csv', '-j0'])
+    _, err = capsys.readouterr()
+    assert '--jobs must be at least 1' in err
@@ -34,3 +34,10 @@ def test_column_mapping_autodetect_from_df():
     )
     c = ColumnMapping.autodetect_from_df(df)
     assert c['pressure_mean'] == GroupList(['generic', 'pressure'])
+
+
+def test_column_mapping_iter():
+    c = ColumnMapping()
+    c['foo'].add_group('pressure')
+    c['bar']
+    assert list(c) == ['foo', 'bar']
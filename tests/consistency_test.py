@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import ColumnMapping
+from meteo_qc import consistency_check
+from meteo_qc import Result
+
+
+@pytest.fixture
+def df():
+    idx = pd.date_range('2022-01-01', periods=5, freq='10min', tz='UTC')
+    return pd.DataFrame(
+        {
+            'temp_1': [10.0, 11.0, 12.0, np.nan, 12.0],
+            'temp_2': [5.0, 5.0, 5.0, 5.0, 5.0],
+            'dew_point_1': [9.0, 11.5, 11.0, 10.0, 12.0],
+            'dew_point_2': [4.0, 4.0, 6.0, 4.0, np.nan],
+            'windspeed': [0.0, 0.0, 1.5, 0.0, 0.0],
+            'winddirection': [180.0, 190.0, 200.0, 200.0, np.nan],
+        },
+        index=idx,
+    )
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['temp_1'].add_group('temperature')
+    column_mapping['temp_2'].add_group('temperature')
+    column_mapping['dew_point_1'].add_group('dew_point')
+    column_mapping['dew_point_2'].add_group('dew_point')
+    column_mapping['windspeed'].add_group('windspeed')
+    column_mapping['winddirection'].add_group('winddirection')
+    return column_mapping
+
+
+def test_consistency_check(df, column_mapping):
+    results = consistency_check(df, column_mapping)
+    assert results == {
+        'dew_point_1': {
+            'dew_point_consistency': Result(
+                function='dew_point_consistency',
+                passed=False,
+                msg='the dew point exceeds the temperature',
+                data=[[1640995800000, 11.5, True]],
+            ),
+        },
+        'dew_point_2': {
+            'dew_point_consistency': Result(
+                function='dew_point_consistency',
+                passed=False,
+                msg='the dew point exceeds the temperature',
+                data=[[1640996400000, 6.0, True]],
+            ),
+        },
+        'winddirection': {
+            'calm_wind_consistency': Result(
+                function='calm_wind_consistency',
+                passed=False,
+                msg='the wind direction changes while the wind speed is 0',
+                data=[[1640995800000, 190.0, True]],
+            ),
+        },
+    }
+
+
+def test_consistency_check_wind_dies_down(df, column_mapping):
+    # the direction changes when the wind dies down and while it is calm
+    df['windspeed'] = [2.0, 0.0, 0.0, 1.0, 0.0]
+    df['winddirection'] = [180.0, 190.0, 200.0, 210.0, 220.0]
+    results = consistency_check(df, column_mapping)
+    assert results['winddirection']['calm_wind_consistency'].data == [
+        [1640996400000, 200.0, True],
+    ]
+
+
+def test_consistency_check_single_related_column(df, column_mapping):
+    column_mapping = ColumnMapping()
+    column_mapping['temp_2'].add_group('temperature')
+    column_mapping['dew_point_1'].add_group('dew_point')
+    column_mapping['dew_point_2'].add_group('dew_point')
+    results = consistency_check(df, column_mapping)
+    assert list(results) == ['dew_point_1', 'dew_point_2']
+    data = results['dew_point_1']['dew_point_consistency'].data
+    assert data is not None
+    assert [row[1] for row in data] == [9.0, 11.5, 11.0, 10.0, 12.0]
+    assert results['dew_point_2']['dew_point_consistency'].data == [
+        [1640996400000, 6.0, True],
+    ]
+
+
+def test_consistency_check_missing_related_group(df):
+    column_mapping = ColumnMapping()
+    column_mapping['dew_point_1'].add_group('dew_point')
+    column_mapping['windspeed'].add_group('windspeed')
+    assert consistency_check(df, column_mapping) == {}
+
+
+def test_consistency_check_passed(df, column_mapping):
+    df['dew_point_1'] = df['temp_1'] - 1
+    df['dew_point_2'] = df['temp_2'] - 1
+    results = consistency_check(df, column_mapping)
+    assert results['dew_point_1'] == {
+        'dew_point_consistency': Result(
+            function='dew_point_consistency',
+            passed=True,
+        ),
+    }
+
+
+def test_consistency_check_unaligned_groups(df, column_mapping):
+    column_mapping['other'].add_group('temperature')
+    df['other'] = 1.0
+    with pytest.raises(ValueError) as exc_info:
+        consistency_check(df, column_mapping)
+    msg, = exc_info.value.args
+    assert msg == (
+        "the group 'temperature' must have 1 or 2 columns like the group "
+        "'dew_point', not 3. Pass the stations to pair the columns "
+        'explicitly'
+    )
+
+
+def test_consistency_check_stations(df):
+    column_mapping = ColumnMapping()
+    column_mapping['temp_1'].add_group('temperature')
+    column_mapping['temp_2'].add_group('temperature')
+    # not in the order of the temperature columns
+    column_mapping['dew_point_2'].add_group('dew_point')
+    column_mapping['dew_point_1'].add_group('dew_point')
+    stations = [('temp_1', 'dew_point_1'), ('dew_point_2', 'temp_2')]
+    results = consistency_check(df, column_mapping, stations=stations)
+    assert results['dew_point_1']['dew_point_consistency'].data == [
+        [1640995800000, 11.5, True],
+    ]
+    assert results['dew_point_2']['dew_point_consistency'].data == [
+        [1640996400000, 6.0, True],
+    ]
+    # without the stations dew_point_2 is compared with temp_1
+    results = consistency_check(df, column_mapping)
+    assert results['dew_point_2']['dew_point_consistency'].passed
+
+
+def test_consistency_check_stations_single_related_column(df):
+    column_mapping = ColumnMapping()
+    column_mapping['temp_2'].add_group('temperature')
+    column_mapping['dew_point_1'].add_group('dew_point')
+    column_mapping['dew_point_2'].add_group('dew_point')
+    stations = [('dew_point_1',), ('temp_2', 'dew_point_2')]
+    results = consistency_check(df, column_mapping, stations=stations)
+    assert results == consistency_check(df, column_mapping)
+
+
+def test_consistency_check_stations_ambiguous(df, column_mapping):
+    stations = [('temp_1', 'temp_2', 'dew_point_1'), ('dew_point_2',)]
+    with pytest.raises(ValueError) as exc_info:
+        consistency_check(df, column_mapping, stations=stations)
+    msg, = exc_info.value.args
+    assert msg == (
+        "the column 'dew_point_1' must have 1 related column of the group "
+        "'temperature' in its station, not 2"
+    )
+
+
+def test_consistency_check_column_in_multiple_stations(df, column_mapping):
+    stations = [('temp_1', 'dew_point_1'), ('temp_1', 'dew_point_2')]
+    with pytest.raises(ValueError) as exc_info:
+        consistency_check(df, column_mapping, stations=stations)
+    msg, = exc_info.value.args
+    assert msg == "the column 'temp_1' is part of multiple stations"
+
+
+@pytest.mark.parametrize(
+    ('duplicates', 'expected'),
+    (
+        ('first', [[1640995800000, 11.5, True]]),
+        ('last', [[1640995200000, 10.5, True]]),
+    ),
+)
+def test_consistency_check_duplicated_timestamps(
+        df,
+        column_mapping,
+        duplicates,
+        expected,
+):
+    restart = df.iloc[[0, 1]].copy()
+    restart['dew_point_1'] = [10.5, 10.5]
+    results = consistency_check(
+        pd.concat([df, restart]),
+        column_mapping,
+        duplicates=duplicates,
+    )
+    assert results['dew_point_1']['dew_point_consistency'].data == expected
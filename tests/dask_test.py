@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import apply_qc_dask
+from meteo_qc import ColumnMapping
+from meteo_qc import mask_qc_dask
+from meteo_qc import missing_timestamps
+from meteo_qc import register
+from meteo_qc._plugins.values import range_check
+
+dd = pytest.importorskip('dask.dataframe')
+
+
+def _random_df(seed, freq='10min', periods=2000, leading_nan=False):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2022-01-01', periods=periods, freq=freq, tz='UTC')
+    # drop single timestamps and a long outage
+    keep = rng.random(periods) > 0.05
+    keep[0] = keep[-1] = True
+    keep[700:760] = False
+    idx = idx[keep]
+    temp = np.round(10 + np.cumsum(rng.normal(0, 0.2, len(idx))), 1)
+    # stuck values and spikes
+    temp[100:130] = temp[100]
+    temp[1000:1020] = temp[1000]
+    temp[rng.random(len(idx)) > 0.97] = np.nan
+    temp[temp > 15] = 60
+    pressure = np.round(1013 + rng.normal(0, 0.5, len(idx)), 1)
+    pressure[400:460] = 1013.0
+    pressure[800:900] = np.nan
+    if leading_nan:
+        # flagged by persistence_check in partitions shorter than its window
+        temp[:20] = np.nan
+        pressure[:50] = np.nan
+    return pd.DataFrame(
+        data={'temp': temp, 'pressure': pressure, 'other': temp * 2},
+        index=idx,
+    )
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    column_mapping['temp'].add_group('dew_point')
+    column_mapping['pressure'].add_group('pressure')
+    return column_mapping
+
+
+def _assert_results_equal(result, expected):
+    assert dict(result['columns']) == dict(expected['columns'])
+    assert {k: v for k, v in result.items() if k != 'columns'} == {
+        k: v for k, v in expected.items() if k != 'columns'
+    }
+
+
+@pytest.mark.parametrize('leading_nan', (False, True))
+@pytest.mark.parametrize('seed', (0, 1))
+@pytest.mark.parametrize('npartitions', (1, 3, 40, 60))
+def test_apply_qc_dask_identical_to_apply_qc(
+        seed,
+        npartitions,
+        leading_nan,
+        column_mapping,
+):
+    df = _random_df(seed, leading_nan=leading_nan)
+    ddf = dd.from_pandas(df, npartitions=npartitions)
+    result = apply_qc_dask(ddf, column_mapping, scheduler='threads')
+    _assert_results_equal(result, apply_qc(df, column_mapping))
+
+
+@pytest.mark.parametrize('seed', (0, 1))
+@pytest.mark.parametrize('npartitions', (1, 3, 40))
+def test_apply_qc_dask_data_format_intervals(
+        seed,
+        npartitions,
+        column_mapping,
+):
+    df = _random_df(seed)
+    ddf = dd.from_pandas(df, npartitions=npartitions)
+    result = apply_qc_dask(
+        ddf,
+        column_mapping,
+        scheduler='threads',
+        data_format='intervals',
+    )
+    expected = apply_qc(df, column_mapping, data_format='intervals')
+    _assert_results_equal(result, expected)
+
+
+def _steps_df():
+    # changes of exactly the allowed delta of spike_dip_check (0.3 / min) are
+    # classified differently using float32
+    idx = pd.date_range('2022-01-01', periods=600, freq='1min', tz='UTC')
+    pressure = np.round(1000 + 0.3 * (np.arange(len(idx)) % 100), 1)
+    return pd.DataFrame({'pressure': pressure}, index=idx)
+
+
+def test_apply_qc_dask_float32(column_mapping):
+    df = _steps_df()
+    ddf = dd.from_pandas(df, npartitions=5)
+    result = apply_qc_dask(ddf, column_mapping, precision='float32')
+    expected = apply_qc(df, column_mapping, precision='float32')
+    assert result != apply_qc(df, column_mapping)
+    _assert_results_equal(result, expected)
+
+
+def test_apply_qc_dask_processes(column_mapping):
+    df = _random_df(2)
+    ddf = dd.from_pandas(df, npartitions=4)
+    result = apply_qc_dask(ddf, column_mapping, scheduler='processes')
+    _assert_results_equal(result, apply_qc(df, column_mapping))
+
+
+def test_apply_qc_dask_empty_partitions(column_mapping):
+    def _drop_days(df):
+        return df.loc[(df.index < '2022-01-03') | (df.index > '2022-01-10')]
+
+    df = _random_df(3)
+    # the partitions in between are empty, the divisions are kept
+    ddf = dd.from_pandas(df, npartitions=10).map_partitions(_drop_days)
+    result = apply_qc_dask(ddf, column_mapping, scheduler='synchronous')
+    _assert_results_equal(result, apply_qc(_drop_days(df), column_mapping))
+
+
+def _jittered_df(seed, periods=4000):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2022-01-01', periods=periods, freq='1min', tz='UTC')
+    # the logger clock jitters by up to a second, few timestamps are aligned
+    # with the full index of the inferred frequency
+    idx = idx + pd.to_timedelta(rng.random(periods), unit='s')
+    keep = rng.random(periods) > 0.1
+    for start in rng.integers(0, periods, 5):
+        keep[start:start + rng.integers(5, 60)] = False
+    keep[0] = keep[-1] = True
+    idx = idx[keep]
+    temp = np.round(10 + np.cumsum(rng.normal(0, 0.2, len(idx))), 1)
+    temp[rng.random(len(idx)) > 0.9] = np.nan
+    pressure = np.round(1013 + rng.normal(0, 0.5, len(idx)), 1)
+    return pd.DataFrame({'temp': temp, 'pressure': pressure}, index=idx)
+
+
+@pytest.mark.parametrize('seed', (0, 1, 2, 3, 4))
+def test_apply_qc_dask_jittered_small_partitions(seed, column_mapping):
+    df = _jittered_df(seed)
+    ddf = dd.from_pandas(df, npartitions=60)
+    result = apply_qc_dask(ddf, column_mapping, scheduler='synchronous')
+    _assert_results_equal(result, apply_qc(df, column_mapping))
+    mask = mask_qc_dask(ddf, column_mapping, scheduler='synchronous')
+    expected = apply_qc(df, column_mapping, outputs=['mask'])['mask']
+    pd.testing.assert_frame_equal(mask.compute(scheduler='threads'), expected)
+
+
+def test_apply_qc_dask_mode_and_missing_per_row(column_mapping):
+    @register('dask_missing_per_row', per_row=True)
+    def missing_per_row(s, per_row):
+        return missing_timestamps(s, per_row=per_row)
+
+    column_mapping['other'].add_group('dask_missing_per_row')
+    df = _random_df(4)
+    ddf = dd.from_pandas(df, npartitions=6)
+    result = apply_qc_dask(
+        ddf,
+        column_mapping,
+        freq_method='mode',
+        scheduler='synchronous',
+    )
+    expected = apply_qc(df, column_mapping, freq_method='mode')
+    _assert_results_equal(result, expected)
+
+
+def _duplicates_df():
+    df = _random_df(7)
+    # the logger wrote some rows again
+    df = pd.concat([df, df.iloc[[10, 11, 1500]] + 1])
+    return df.sort_index(kind='stable')
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last', 'mean', 'flag'))
+@pytest.mark.parametrize('freq_method', ('min', 'mode'))
+def test_apply_qc_dask_duplicates(duplicates, freq_method, column_mapping):
+    df = _duplicates_df()
+    ddf = dd.from_pandas(df, npartitions=6)
+    result = apply_qc_dask(
+        ddf,
+        column_mapping,
+        freq_method=freq_method,
+        scheduler='synchronous',
+        duplicates=duplicates,
+    )
+    expected = apply_qc(
+        df,
+        column_mapping,
+        freq_method=freq_method,
+        duplicates=duplicates,
+    )
+    _assert_results_equal(result, expected)
+    results = result['columns']['temp']['results']
+    assert not results['duplicate_timestamps'].passed
+
+
+def test_apply_qc_dask_unknown_divisions(column_mapping):
+    df = _random_df(0)
+    ddf = dd.from_pandas(df, npartitions=2).clear_divisions()
+    with pytest.raises(ValueError) as excinfo:
+        apply_qc_dask(ddf, column_mapping)
+    msg, = excinfo.value.args
+    assert msg.startswith('the divisions of the dask.dataframe must be known')
+
+
+def test_apply_qc_dask_not_timezone_aware(column_mapping):
+    df = _random_df(0).tz_localize(None)
+    ddf = dd.from_pandas(df, npartitions=2)
+    with pytest.raises(TypeError):
+        apply_qc_dask(ddf, column_mapping)
+
+
+@pytest.mark.parametrize('leading_nan', (False, True))
+@pytest.mark.parametrize('npartitions', (1, 5, 40, 60))
+def test_mask_qc_dask_identical_to_apply_qc(
+        npartitions,
+        leading_nan,
+        column_mapping,
+):
+    df = _random_df(5, leading_nan=leading_nan)
+    ddf = dd.from_pandas(df, npartitions=npartitions)
+    mask = mask_qc_dask(ddf, column_mapping, scheduler='synchronous')
+    assert mask.npartitions == ddf.npartitions
+    expected = apply_qc(df, column_mapping, outputs=['mask'])['mask']
+    pd.testing.assert_frame_equal(mask.compute(scheduler='threads'), expected)
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'flag'))
+def test_mask_qc_dask_duplicates(duplicates, column_mapping):
+    df = _duplicates_df()
+    ddf = dd.from_pandas(df, npartitions=6)
+    mask = mask_qc_dask(ddf, column_mapping, duplicates=duplicates)
+    expected = apply_qc(
+        df,
+        column_mapping,
+        outputs=['mask'],
+        duplicates=duplicates,
+    )['mask']
+    pd.testing.assert_frame_equal(mask.compute(), expected)
+
+
+def test_mask_qc_dask_mask_checks(column_mapping):
+    df = _random_df(6)
+    ddf = dd.from_pandas(df, npartitions=5)
+    mask = mask_qc_dask(ddf, column_mapping, mask_checks=['range_check'])
+    expected = apply_qc(
+        df,
+        column_mapping,
+        outputs=['mask'],
+        mask_checks=['range_check'],
+    )['mask']
+    pd.testing.assert_frame_equal(mask.compute(), expected)
+
+
+def test_mask_qc_dask_partitions_shorter_than_window(column_mapping):
+    df = _random_df(6, leading_nan=True)
+    ddf = dd.from_pandas(df, npartitions=60)
+    mask = mask_qc_dask(ddf, column_mapping, mask_checks=['persistence_check'])
+    expected = apply_qc(
+        df,
+        column_mapping,
+        outputs=['mask'],
+        mask_checks=['persistence_check'],
+    )['mask']
+    assert expected['pressure'].iloc[:50].all()
+    pd.testing.assert_frame_equal(mask.compute(), expected)
+
+
+def test_mask_qc_dask_float32(column_mapping):
+    df = _steps_df()
+    ddf = dd.from_pandas(df, npartitions=5)
+    mask = mask_qc_dask(ddf, column_mapping, precision='float32')
+    expected = apply_qc(
+        df,
+        column_mapping,
+        outputs=['mask'],
+        precision='float32',
+    )['mask']
+    mask_64 = apply_qc(df, column_mapping, outputs=['mask'])['mask']
+    assert not expected.equals(mask_64)
+    pd.testing.assert_frame_equal(mask.compute(), expected)
+
+
+def test_mask_qc_dask_check_without_lookback(column_mapping):
+    @register('dask_no_lookback')
+    def no_lookback(s):
+        return range_check(s, lower_bound=0, upper_bound=100)
+
+    column_mapping['other'].add_group('dask_no_lookback')
+    ddf = dd.from_pandas(_random_df(0), npartitions=2)
+    with pytest.raises(ValueError) as excinfo:
+        mask_qc_dask(ddf, column_mapping)
+    msg, = excinfo.value.args
+    assert msg == (
+        "the check 'no_lookback' can't be applied per partition, it has no "
+        'registered report and lookback'
+    )
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import ColumnMapping
+from meteo_qc import range_check
+from meteo_qc import update_qc
+from meteo_qc._data import _use_data_format
+from meteo_qc._incremental import _merge_ranges
+from meteo_qc._incremental import _previous_flags
+
+
+def _random_df(seed, freq='10min', periods=2000, tz='UTC'):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2022-01-01', periods=periods, freq=freq, tz=tz)
+    keep = rng.random(periods) > 0.05
+    keep[0] = keep[-1] = True
+    idx = idx[keep]
+    temp = np.round(10 + np.cumsum(rng.normal(0, 0.2, len(idx))), 1)
+    temp[100:130] = temp[100]
+    temp[rng.random(len(idx)) > 0.97] = np.nan
+    temp[temp > 15] = 60
+    pressure = np.round(1013 + rng.normal(0, 0.5, len(idx)), 1)
+    pressure[400:460] = 1013.0
+    return pd.DataFrame(
+        data={'temp': temp, 'pressure': pressure, 'other': temp * 2},
+        index=idx,
+    )
+
+
+def _ts(ts, tz='UTC'):
+    return pd.Timestamp(ts, tz=tz)
+
+
+def _to_ms(ts):
+    return int(ts.timestamp() * 1000)
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    column_mapping['pressure'].add_group('pressure')
+    return column_mapping
+
+
+def _assert_results_equal(result, expected):
+    assert dict(result['columns']) == dict(expected['columns'])
+    assert {k: v for k, v in result.items() if k != 'columns'} == {
+        k: v for k, v in expected.items() if k != 'columns'
+    }
+
+
+def test_merge_ranges():
+    ts = pd.Timestamp
+    ranges = [
+        (ts('2022-01-03'), ts('2022-01-04')),
+        (ts('2022-01-01'), ts('2022-01-02')),
+        (ts('2022-01-02'), ts('2022-01-02 12:00')),
+    ]
+    assert _merge_ranges(ranges) == [
+        (ts('2022-01-01'), ts('2022-01-02 12:00')),
+        (ts('2022-01-03'), ts('2022-01-04')),
+    ]
+
+
+@pytest.mark.parametrize('seed', (0, 1, 2))
+def test_update_qc_identical_to_apply_qc(seed, column_mapping):
+    df = _random_df(seed)
+    previous = apply_qc(df, column_mapping)
+    changed_df = df.copy()
+    # introduce a spike, a stuck value and fix previously flagged values
+    changed = [
+        ('2022-01-03 10:00', '2022-01-03 11:00'),
+        ('2022-01-05 00:00', '2022-01-05 12:00'),
+        ('2022-01-01 16:00', '2022-01-01 22:00'),
+    ]
+    for (start, end), column, value in zip(
+            changed,
+            ('temp', 'pressure', 'temp'),
+            (30, 1000, 10.5),
+    ):
+        changed_df.loc[_ts(start):_ts(end), column] = value
+    result = update_qc(previous, changed_df, column_mapping, changed=changed)
+    _assert_results_equal(result, apply_qc(changed_df, column_mapping))
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last', 'mean', 'flag'))
+@pytest.mark.parametrize('freq_method', ('min', 'mode'))
+def test_update_qc_duplicates(duplicates, freq_method, column_mapping):
+    df = _random_df(8)
+    # the logger wrote some rows again
+    df = pd.concat([df, df.iloc[[10, 11, 1500]] + 1]).sort_index(kind='stable')
+    kwargs = {'freq_method': freq_method, 'duplicates': duplicates}
+    previous = apply_qc(df, column_mapping, **kwargs)
+    changed_df = df.copy()
+    start, end = _ts('2022-01-01 01:00'), _ts('2022-01-01 03:00')
+    changed_df.loc[start:end, 'temp'] = 30
+    result = update_qc(
+        previous,
+        changed_df,
+        column_mapping,
+        changed=[(start, end)],
+        **kwargs,
+    )
+    _assert_results_equal(
+        result,
+        apply_qc(changed_df, column_mapping, **kwargs),
+    )
+    results = result['columns']['temp']['results']
+    assert not results['duplicate_timestamps'].passed
+
+
+def test_update_qc_values_removed(column_mapping):
+    df = _random_df(3)
+    previous = apply_qc(df, column_mapping)
+    start, end = _ts('2022-01-06 00:00'), _ts('2022-01-06 06:00')
+    changed_df = df.drop(df.loc[start:end].index)
+    result = update_qc(
+        previous,
+        changed_df,
+        column_mapping,
+        changed=[(start, end)],
+    )
+    _assert_results_equal(result, apply_qc(changed_df, column_mapping))
+
+
+def test_update_qc_values_appended(column_mapping):
+    df = _random_df(4)
+    previous = apply_qc(df.iloc[:1500], column_mapping)
+    start = df.index[1500]
+    result = update_qc(
+        previous,
+        df,
+        column_mapping,
+        changed=[(start, df.index[-1])],
+    )
+    _assert_results_equal(result, apply_qc(df, column_mapping))
+
+
+def test_update_qc_timezone(column_mapping):
+    df = _random_df(5, tz='Europe/Berlin')
+    previous = apply_qc(df, column_mapping)
+    changed_df = df.copy()
+    changed_df.loc[
+        _ts('2022-01-04 03:00', tz=df.index.tz):
+        _ts('2022-01-04 04:00', tz=df.index.tz),
+        'temp',
+    ] = 40
+    result = update_qc(
+        previous,
+        changed_df,
+        column_mapping,
+        # naive timestamps are in the timezone of the index
+        changed=[('2022-01-04 03:00', '2022-01-04 04:00')],
+    )
+    _assert_results_equal(result, apply_qc(changed_df, column_mapping))
+
+
+def test_update_qc_nothing_changed(column_mapping):
+    df = _random_df(6)
+    previous = apply_qc(df, column_mapping)
+    result = update_qc(previous, df, column_mapping, changed=[])
+    _assert_results_equal(result, previous)
+
+
+def test_update_qc_freq_changed(column_mapping):
+    df = _random_df(7)
+    previous = apply_qc(df.resample('20min').mean(), column_mapping)
+    result = update_qc(
+        previous,
+        df,
+        column_mapping,
+        changed=[('2022-01-02', '2022-01-02 01:00')],
+    )
+    _assert_results_equal(result, apply_qc(df, column_mapping))
+
+
+def test_update_qc_range_ends_before_start(column_mapping):
+    df = _random_df(8)
+    previous = apply_qc(df, column_mapping)
+    with pytest.raises(ValueError) as exc_info:
+        update_qc(
+            previous,
+            df,
+            column_mapping,
+            changed=[('2022-01-02 01:00', '2022-01-02')],
+        )
+    msg, = exc_info.value.args
+    assert msg.startswith('the changed time range ends before it starts')
+
+
+@pytest.mark.parametrize('seed', (0, 1, 2))
+def test_update_qc_intervals_identical_to_apply_qc(seed, column_mapping):
+    df = _random_df(seed)
+    previous = apply_qc(df, column_mapping, data_format='intervals')
+    changed_df = df.copy()
+    # extend the stuck temperature and split the stuck pressure
+    changed_df.iloc[130:140, 0] = changed_df.iloc[100, 0]
+    changed_df.iloc[430, 1] = 1014.0
+    changed = [
+        (df.index[130], df.index[139]),
+        (df.index[430], df.index[430]),
+    ]
+    result = update_qc(
+        previous,
+        changed_df,
+        column_mapping,
+        changed=changed,
+        data_format='intervals',
+    )
+    _assert_results_equal(
+        result,
+        apply_qc(changed_df, column_mapping, data_format='intervals'),
+    )
+
+
+def test_update_qc_intervals_flags_at_the_edges(column_mapping):
+    df = _random_df(0)
+    previous = apply_qc(df, column_mapping, data_format='intervals')
+    changed_df = df.copy()
+    # the values are flagged at the end and the start of the changed ranges
+    changed_df.iloc[[300, 309], 1] = 2000
+    changed = [
+        (df.index[295], df.index[300]),
+        (df.index[309], df.index[312]),
+    ]
+    result = update_qc(
+        previous,
+        changed_df,
+        column_mapping,
+        changed=changed,
+        data_format='intervals',
+    )
+    expected = apply_qc(changed_df, column_mapping, data_format='intervals')
+    _assert_results_equal(result, expected)
+    range_res = expected['columns']['pressure']['results']['range_check']
+    assert range_res.data is not None
+    assert [row[:3] for row in range_res.data] == [
+        [_to_ms(df.index[300]), _to_ms(df.index[300]), 1],
+        [_to_ms(df.index[309]), _to_ms(df.index[309]), 1],
+    ]
+
+
+def test_previous_flags_from_intervals():
+    idx = pd.date_range('2022-01-01', periods=10, freq='10min', tz='UTC')
+    s = pd.Series([1, 60, 60, 2, 60, 3, 4, 5, 60, 60], index=idx, dtype=float)
+    result = range_check(s, lower_bound=0, upper_bound=50)
+    with _use_data_format('intervals'):
+        intervals = range_check(s, lower_bound=0, upper_bound=50)
+    flags = _previous_flags(intervals, idx, data_format='intervals')
+    assert flags is not None
+    # all values, with an unflagged value before the value after every run
+    positions = [0, 1, 2, 3, 3, 4, 5, 5, 6, 7, 8, 9]
+    assert flags.index.tolist() == idx[positions].tolist()
+    assert flags.tolist() == [
+        False, True, True, False, False, True, False, False, False, False,
+        True, True,
+    ]
+    # intervals with values that are not in the index can't be recovered
+    assert _previous_flags(intervals, idx[[0, 1, 3]], 'intervals') is None
+    # the rows are not intervals
+    assert _previous_flags(result, idx, data_format='intervals') is None
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import ColumnMapping
+from meteo_qc import iter_qc
+
+
+@pytest.fixture
+def data():
+    data = pd.read_csv('testing/test_data.csv')
+    data['date'] = pd.to_datetime(data['date'], utc=True)
+    return data.set_index('date')
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('pressure')
+    column_mapping['pressure_persistent'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    return column_mapping
+
+
+def test_iter_qc_identical_to_apply_qc(data, column_mapping):
+    expected = apply_qc(data, column_mapping)
+    results = iter_qc(data, column_mapping)
+    assert results.passed is True
+    columns = list(results)
+    assert [column for column, _ in columns] == list(data.columns)
+    assert dict(columns) == dict(expected['columns'])
+    assert results.passed is expected['passed']
+    assert results.data_start_date == expected['data_start_date']
+    assert results.data_end_date == expected['data_end_date']
+    assert results.data_freq == expected['data_freq']
+
+
+def test_iter_qc_passed_on_the_fly():
+    idx = pd.date_range('2022-01-01', periods=5, freq='10min', tz='UTC')
+    df = pd.DataFrame({'a': [1.0, 2, 3, 4, 5], 'b': [1.0, 2, None, 4, 5]}, idx)
+    results = iter_qc(df, ColumnMapping())
+    column, column_res = next(results)
+    assert (column, column_res['passed'], results.passed) == ('a', True, True)
+    # passed is updated with every column
+    column, column_res = next(results)
+    assert (column, column_res['passed'], results.passed) == (
+        'b', False, False,
+    )
+    with pytest.raises(StopIteration):
+        next(results)
+
+
+def test_iter_qc_parallel(data, column_mapping):
+    expected = apply_qc(data, column_mapping)
+    results = iter_qc(data, column_mapping, max_workers=2)
+    assert dict(results) == dict(expected['columns'])
+    assert results.passed is expected['passed']
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last', 'mean', 'flag'))
+@pytest.mark.parametrize('max_workers', (1, 2))
+def test_iter_qc_duplicates(data, column_mapping, duplicates, max_workers):
+    # the logger wrote two rows again
+    data = pd.concat([data, data.iloc[[20, 21]] + 1])
+    expected = apply_qc(
+        data,
+        column_mapping,
+        freq_method='mode',
+        duplicates=duplicates,
+    )
+    results = iter_qc(
+        data,
+        column_mapping,
+        max_workers=max_workers,
+        freq_method='mode',
+        duplicates=duplicates,
+    )
+    assert dict(results) == dict(expected['columns'])
+    assert results.passed is expected['passed'] is False
+    assert results.data_freq == expected['data_freq']
+
+
+def test_iter_qc_close(data, column_mapping):
+    results = iter_qc(data, column_mapping, max_workers=2)
+    next(results)
+    results.close()
+    with pytest.raises(StopIteration):
+        next(results)
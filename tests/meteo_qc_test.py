@@ -1,15 +1,28 @@
 from datetime import timedelta
 from datetime import timezone
+from typing import Any
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from meteo_qc import apply_qc
 from meteo_qc import ColumnMapping
+from meteo_qc import duplicate_timestamps
 from meteo_qc import get_plugin_args
+from meteo_qc import infer_freq
+from meteo_qc import missing_timestamps
 from meteo_qc import persistence_check
+from meteo_qc import range_check
 from meteo_qc import register
 from meteo_qc import Result
+from meteo_qc import robust_outlier_check
+from meteo_qc import seasonal_range_check
+from meteo_qc import spike_dip_check
+from meteo_qc._main import _with_precision
+from meteo_qc._plugins.values import _freq_cache
+from meteo_qc._plugins.values import _robust_outlier_flags
+from meteo_qc._plugins.values import _seasonal_range_flags
 
 
 @pytest.fixture(scope='session')
@@ -131,7 +144,7 @@ def test_generic_checks_are_applied_as_default(data, idx_name):
     results = apply_qc(data, column_mapping)
     for col in results['columns']:
         assert set(results['columns'][col]['results'].keys()) == {
-            'missing_timestamps', 'null_values',
+            'missing_timestamps', 'duplicate_timestamps', 'null_values',
         }
         assert results['columns'][col]['passed'] is False
     pressure_res = results['columns']['pressure_reduced']['results']
@@ -144,13 +157,17 @@ def test_generic_checks_are_applied_as_default(data, idx_name):
     assert pressure_res['missing_timestamps'].msg == (
         'missing 1 timestamps (assumed frequency: 10min)'
     )
-    assert pressure_res['missing_timestamps'].data == [[1641033600000, None]]
+    assert pressure_res['missing_timestamps'].data == [
+        [1641033600000, 1641033600000, 1],
+    ]
     assert temp_res['missing_timestamps'].passed is False
     assert temp_res['missing_timestamps'].function == 'missing_timestamps'
     assert temp_res['missing_timestamps'].msg == (
         'missing 1 timestamps (assumed frequency: 10min)'
     )
-    assert temp_res['missing_timestamps'].data == [[1641033600000, None]]
+    assert temp_res['missing_timestamps'].data == [
+        [1641033600000, 1641033600000, 1],
+    ]
 
     # null values are detected
     assert pressure_res['null_values'].passed is False
@@ -162,6 +179,72 @@ def test_generic_checks_are_applied_as_default(data, idx_name):
     assert sunshine_res['null_values'].passed is True
 
 
+def test_missing_timestamps_reported_as_gaps():
+    idx = pd.date_range(
+        start='2022-01-01 10:00',
+        end='2022-01-01 12:00',
+        freq='10min',
+        tz='UTC',
+    )
+    # one gap of a single timestamp and one gap of three timestamps
+    idx = idx.delete([2, 6, 7, 8])
+    s = pd.Series(range(len(idx)), index=idx, name='a', dtype=float)
+    result = missing_timestamps(s)
+    assert result.passed is False
+    assert result.msg == 'missing 4 timestamps (assumed frequency: 10min)'
+    assert result.data == [
+        [1641032400000, 1641032400000, 1],
+        [1641034800000, 1641036000000, 3],
+    ]
+
+
+def test_missing_timestamps_gap_with_unaligned_timestamp():
+    idx = pd.DatetimeIndex(
+        [
+            '2022-01-01 10:00', '2022-01-01 10:10', '2022-01-01 10:25',
+            '2022-01-01 10:50', '2022-01-01 11:00',
+        ],
+        tz='UTC',
+    )
+    s = pd.Series([1, 2, 3, 4, 5], index=idx, name='a', dtype=float)
+    result = missing_timestamps(s)
+    assert result.msg == 'missing 3 timestamps (assumed frequency: 10min)'
+    assert result.data == [[1641032400000, 1641033600000, 3]]
+
+
+def test_missing_timestamps_per_row():
+    idx = pd.date_range(
+        start='2022-01-01 10:00',
+        end='2022-01-01 11:00',
+        freq='10min',
+        tz='UTC',
+    )
+    idx = idx.delete([2, 3])
+    s = pd.Series(range(len(idx)), index=idx, name='a', dtype=float)
+    result = missing_timestamps(s, per_row=True)
+    assert result.passed is False
+    assert result.msg == 'missing 2 timestamps (assumed frequency: 10min)'
+    assert result.data == [[1641032400000, None], [1641033000000, None]]
+
+
+def test_missing_timestamps_per_row_with_unaligned_timestamp():
+    idx = pd.DatetimeIndex(
+        [
+            '2022-01-01 10:00', '2022-01-01 10:10', '2022-01-01 10:25',
+            '2022-01-01 10:50', '2022-01-01 11:00',
+        ],
+        tz='UTC',
+    )
+    s = pd.Series([1, 2, 3, 4, 5], index=idx, name='a', dtype=float)
+    result = missing_timestamps(s, per_row=True)
+    assert result.msg == 'missing 3 timestamps (assumed frequency: 10min)'
+    assert result.data == [
+        [1641032400000, None],
+        [1641033000000, None],
+        [1641033600000, None],
+    ]
+
+
 def test_changed_column_mapping_pressure_checks(data):
     column_mapping = ColumnMapping()
     column_mapping['pressure_reduced'].add_group('pressure')
@@ -262,6 +345,47 @@ def test_spike_dip_check_timestamp_correct():
     ]
 
 
+def test_spike_dip_check_max_gap():
+    idx = pd.DatetimeIndex(
+        [
+            '2022-01-01 10:00', '2022-01-01 10:10', '2022-01-01 10:20',
+            '2022-01-01 10:50', '2022-01-01 11:00', '2022-01-03 11:00',
+        ],
+        tz='UTC',
+    )
+    s = pd.Series([1.0, 4.0, np.nan, 10.0, 10.5, 50.0], index=idx)
+    # 3 / 10min, 6 / 40min (after a NaN), 0.5 / 10min, gap of 2 days
+    result = spike_dip_check(s, delta=0.2, max_gap=timedelta(hours=1))
+    assert result == Result(
+        function='spike_dip_check',
+        passed=False,
+        msg='spikes or dips detected. Exceeded allowed delta of 0.2 / min',
+        data=[[1641031800000, 4.0, True]],
+    )
+    result = spike_dip_check(s, delta=0.1, max_gap=timedelta(minutes=30))
+    assert result.data is not None
+    assert [row[0] for row in result.data] == [1641031800000]
+    result = spike_dip_check(s, delta=0.1, max_gap=timedelta(minutes=40))
+    assert result.data is not None
+    assert [row[0] for row in result.data] == [
+        1641031800000, 1641034200000,
+    ]
+    # without max_gap only values 10min apart are compared
+    result = spike_dip_check(s, delta=0.1)
+    assert result.data is not None
+    assert [row[0] for row in result.data] == [1641031800000]
+
+
+def test_spike_dip_check_max_gap_large_gap():
+    idx = pd.DatetimeIndex(
+        ['1900-01-01 00:00', '1900-01-01 00:01', '2100-01-01 00:00'],
+        tz='UTC',
+    ).as_unit('s')
+    s = pd.Series([1.0, 2.0, 100.0], index=idx)
+    result = spike_dip_check(s, delta=0.5, max_gap=timedelta(days=1))
+    assert result.data == [[-2208988740000, 2.0, True]]
+
+
 def test_changed_column_mapping_pressure_persistence_check(data):
     column_mapping = ColumnMapping()
     column_mapping['pressure_persistent'].add_group('pressure')
@@ -405,3 +529,542 @@ def test_get_plugin_args(data):
     column_mapping['temp'].add_group('temperature')
     result = apply_qc(df=data, column_mapping=column_mapping)
     assert result['columns']['temp']['results']['range_check'].passed is True
+
+
+@pytest.fixture
+def jittered_df():
+    idx = pd.date_range(
+        start='2022-01-01 10:00',
+        end='2022-01-01 12:00',
+        freq='10min',
+        tz='UTC',
+    )
+    # one timestamp is off by 2 seconds and one is missing
+    idx = idx.delete([3, 5]).insert(3, idx[3] + pd.Timedelta(seconds=2))
+    return pd.DataFrame(
+        data={'a': range(len(idx)), 'b': range(len(idx))},
+        index=idx,
+        dtype=float,
+    )
+
+
+@pytest.mark.parametrize(
+    ('method', 'expected'),
+    (('min', '598s'), ('mode', '10min')),
+)
+def test_infer_freq_methods(jittered_df, method, expected):
+    assert infer_freq(jittered_df['a'], method=method) == expected
+
+
+@pytest.mark.parametrize(
+    ('method', 'expected'),
+    (('min', '0h'), ('mode', '10min')),
+)
+def test_infer_freq_methods_duplicated_timestamp(method, expected):
+    idx = pd.date_range(
+        start='2022-01-01 10:00',
+        end='2022-01-01 11:00',
+        freq='10min',
+        tz='UTC',
+    )
+    idx = idx.insert(3, idx[3])
+    s = pd.Series(range(len(idx)), index=idx, dtype=float)
+    assert infer_freq(s, method=method) == expected
+
+
+def test_infer_freq_mode_within_tolerance():
+    idx = pd.DatetimeIndex(
+        [
+            '2022-01-01 10:00:00', '2022-01-01 10:05:00',
+            '2022-01-01 10:10:00', '2022-01-01 10:19:59',
+            '2022-01-01 10:30:00', '2022-01-01 10:40:00',
+        ],
+        tz='UTC',
+    )
+    s = pd.Series([1, 2, 3, 4, 5, 6], index=idx, dtype=float)
+    assert infer_freq(s, method='mode', tolerance=0) == '5min'
+    assert infer_freq(s, method='mode', tolerance=0.01) == '10min'
+
+
+def test_infer_freq_unknown_method(jittered_df):
+    with pytest.raises(ValueError) as exc_info:
+        infer_freq(jittered_df['a'], method='max')  # type: ignore[arg-type]
+
+    msg, = exc_info.value.args
+    assert msg == "unknown frequency inference method: 'max'"
+
+
+def test_infer_freq_is_memoized_per_index(jittered_df):
+    s = jittered_df['a']
+    infer_freq(s, method='mode')
+    # all views on the same index share the cached value
+    cache = _freq_cache(jittered_df['b'].index)
+    assert cache is _freq_cache(jittered_df.index)
+    assert cache == {('mode', 0.05): '10min'}
+    # a different index is not shared
+    assert _freq_cache(jittered_df.index.copy()) == {}
+
+
+@pytest.mark.parametrize(
+    ('method', 'expected'),
+    (('min', '598s'), ('mode', '10min')),
+)
+def test_apply_qc_freq_method(jittered_df, method, expected):
+    column_mapping = ColumnMapping()
+    result = apply_qc(jittered_df, column_mapping, freq_method=method)
+    assert result['data_freq'] == expected
+
+
+def test_apply_qc_freq_method_is_used_by_checks(jittered_df):
+    column_mapping = ColumnMapping()
+    result = apply_qc(jittered_df, column_mapping, freq_method='mode')
+    missing = result['columns']['a']['results']['missing_timestamps']
+    # 10:30 is not on the grid and 10:50 is missing
+    assert missing.msg == 'missing 2 timestamps (assumed frequency: 10min)'
+    # outside of apply_qc the default is used again
+    assert infer_freq(jittered_df['a']) == '598s'
+
+
+def test_apply_qc_float32_identical_to_float64(data):
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('pressure')
+    column_mapping['pressure_persistent'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    result = apply_qc(data, column_mapping, precision='float32')
+    assert result == apply_qc(data, column_mapping)
+
+
+def test_with_precision_float32_column_not_copied():
+    idx = pd.date_range('2022-01-01', periods=3, freq='10min', tz='UTC')
+    s = pd.Series([1.0, 2.0, 3.0], index=idx)
+    assert _with_precision(s, 'float32').dtype == np.float32
+    s_32 = s.astype(np.float32)
+    assert _with_precision(s_32, 'float32') is s_32
+    assert _with_precision(s, 'float64') is s
+
+
+def test_apply_qc_float32_decimal_values():
+    rng = np.random.default_rng(0)
+    idx = pd.date_range('2022-01-01', periods=5000, freq='1min', tz='UTC')
+    # pressure and temperature with a resolution of 0.1
+    pressure = np.round(1013 + np.cumsum(rng.normal(0, 0.1, len(idx))), 1)
+    pressure[1000:1400] = pressure[1000]
+    temp = np.round(10 + np.cumsum(rng.normal(0, 0.15, len(idx))), 1)
+    temp[rng.random(len(idx)) > 0.99] = np.nan
+    df = pd.DataFrame({'pressure': pressure, 'temp': temp}, index=idx)
+    column_mapping = ColumnMapping()
+    column_mapping['pressure'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    get_plugin_args()['temperature']['persistence_check']['excludes'] = [10.1]
+    try:
+        result = apply_qc(df, column_mapping, precision='float32')
+        expected = apply_qc(df, column_mapping)
+    finally:
+        del get_plugin_args()['temperature']['persistence_check']['excludes']
+    for column, column_res in result['columns'].items():
+        for name, res in column_res['results'].items():
+            if name != 'spike_dip_check':
+                assert res == expected['columns'][column]['results'][name]
+
+    # only changes of exactly the allowed delta (0.3 / min) differ
+    for column in ('pressure', 'temp'):
+        res = result['columns'][column]['results']['spike_dip_check']
+        res_64 = expected['columns'][column]['results']['spike_dip_check']
+        assert res.data is not None and res_64.data is not None
+        flagged = {row[0] for row in res.data}
+        flagged_64 = {row[0] for row in res_64.data}
+        change = df[column].diff().abs()
+        assert isinstance(change.index, pd.DatetimeIndex)
+        change.index = pd.Index(change.index.as_unit('ms').asi8)
+        for ts in flagged ^ flagged_64:
+            assert change[ts] == pytest.approx(0.3, abs=1.2e-4)
+
+    persistence = result['columns']['pressure']['results']['persistence_check']
+    assert persistence.data is not None
+    assert persistence.data[-1][1] == pressure[1000]
+
+
+def _mask_from_results(df, result, checks=None):
+    expected = pd.DataFrame(False, index=df.index, columns=df.columns)
+    for column in df.columns:
+        for name, res in result['columns'][column]['results'].items():
+            if name == 'missing_timestamps' or (checks and name not in checks):
+                continue
+            flagged = [row[0] for row in res.data or []]
+            flagged_idx = pd.to_datetime(flagged, unit='ms', utc=True)
+            expected.loc[df.index.isin(flagged_idx), column] = True
+    return expected
+
+
+@pytest.mark.parametrize('mask_checks', (None, ['range_check']))
+def test_apply_qc_outputs(data, mask_checks):
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    column_mapping['pressure'].add_group('pressure')
+    column_mapping['pressure_reduced'].add_group('pressure')
+    expected = apply_qc(data, column_mapping)
+    result = apply_qc(
+        data,
+        column_mapping,
+        outputs=['cleaned', 'mask'],
+        mask_checks=mask_checks,
+    )
+    assert dict(result['columns']) == dict(expected['columns'])
+    mask = _mask_from_results(data, expected, checks=mask_checks)
+    pd.testing.assert_frame_equal(result['mask'], mask)
+    assert result['mask'].to_numpy().any()
+    pd.testing.assert_frame_equal(
+        result['cleaned'],
+        data.astype(float).mask(mask),
+    )
+
+
+def test_apply_qc_outputs_float32():
+    idx = pd.date_range('2022-01-01', periods=6, freq='10min', tz='UTC')
+    df = pd.DataFrame(
+        {
+            'pressure': np.array(
+                [1013.3, 1013.4, 800, 1013.4, 1013.2, 1013.3],
+                dtype=np.float32,
+            ),
+            'count': [1, 2, 3, 4, 5, 6],
+        },
+        index=idx,
+    )
+    column_mapping = ColumnMapping()
+    column_mapping['pressure'].add_group('pressure')
+    result = apply_qc(
+        df,
+        column_mapping,
+        outputs=['cleaned'],
+        precision='float32',
+    )
+    assert 'mask' not in result
+    cleaned = result['cleaned']
+    assert cleaned['pressure'].dtype == np.float32
+    # the spike and the dip
+    assert cleaned['pressure'].isna().tolist() == [
+        False, False, True, True, False, False,
+    ]
+    assert cleaned['count'].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+
+def test_apply_qc_unknown_output(data):
+    with pytest.raises(ValueError) as exc_info:
+        apply_qc(
+            data,
+            ColumnMapping(),
+            outputs=['clean'],  # type: ignore[list-item]
+        )
+    msg, = exc_info.value.args
+    assert msg == "unknown output: 'clean'"
+
+
+def _brute_force_outliers(s, window, threshold, min_spread, min_values):
+    # the definition of the rolling median and MAD, one window at a time
+    flags = []
+    for ts, value in s.items():
+        in_window = s[(s.index > ts - window) & (s.index <= ts)].dropna()
+        if len(in_window) < min_values:
+            flags.append(False)
+            continue
+        median = np.median(in_window)
+        mad = np.median(np.abs(in_window - median))
+        spread = max(1.4826 * mad, min_spread)
+        flags.append(bool(abs(value - median) > threshold * spread))
+    return flags
+
+
+@pytest.mark.parametrize('seed', (0, 1, 2))
+@pytest.mark.parametrize('chunk_size', (7, 4_000_000))
+def test_robust_outlier_check_matches_definition(
+        seed,
+        chunk_size,
+        monkeypatch,
+):
+    monkeypatch.setattr('meteo_qc._plugins.values._CHUNK_SIZE', chunk_size)
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2022-01-01', periods=300, freq='1min', tz='UTC')
+    idx = idx[rng.random(len(idx)) > 0.1]
+    values = np.round(
+        10 + np.linspace(0, 3, len(idx)) + rng.normal(0, 0.5, len(idx)),
+        1,
+    )
+    values[rng.random(len(idx)) > 0.95] = np.nan
+    values[[20, 100, 101, 200]] = [17, 3, 4, 20]
+    s = pd.Series(values, index=idx, dtype=float)
+    kwargs: dict[str, Any] = {
+        'window': timedelta(minutes=30),
+        'threshold': 2,
+        'min_spread': 0.1,
+        'min_values': 5,
+    }
+    flags = _robust_outlier_flags(s, **kwargs)
+    assert flags.tolist() == _brute_force_outliers(s, **kwargs)
+    assert flags.to_numpy()[[20, 100, 101, 200]].all()
+
+
+def test_robust_outlier_check():
+    idx = pd.date_range('2022-01-01', periods=30, freq='10min', tz='UTC')
+    s = pd.Series(np.linspace(10, 13, len(idx)), index=idx, dtype=float)
+    s.iloc[10] = 20
+    result = robust_outlier_check(
+        s,
+        window=timedelta(hours=1),
+        threshold=5,
+        min_spread=0.5,
+    )
+    assert result == Result(
+        function='robust_outlier_check',
+        passed=False,
+        msg=(
+            'outliers detected. Deviated from the median of the previous '
+            '1:00:00 by more than 5 times the MAD'
+        ),
+        data=[[1641001200000, 20.0, True]],
+    )
+    result = robust_outlier_check(
+        s,
+        window=timedelta(hours=1),
+        threshold=float('inf'),
+        min_spread=0,
+    )
+    assert result == Result(function='robust_outlier_check', passed=True)
+    s.iloc[10] = 11
+    result = robust_outlier_check(
+        s,
+        window=timedelta(hours=1),
+        threshold=5,
+        min_spread=0.5,
+    )
+    assert result == Result(function='robust_outlier_check', passed=True)
+
+
+def test_robust_outlier_check_registered():
+    plugin_args = get_plugin_args()
+    assert plugin_args['pressure']['robust_outlier_check'] == {
+        'window': timedelta(hours=3),
+        'threshold': 5,
+        'min_spread': 0.5,
+    }
+    assert 'robust_outlier_check' not in plugin_args['windspeed']
+
+
+def test_seasonal_range_check_by_month():
+    idx = pd.DatetimeIndex(
+        ['2022-01-15 12:00', '2022-07-15 12:00', '2022-12-31 23:30'],
+        tz='UTC',
+    )
+    s = pd.Series([30.0, 30.0, 10.0], index=idx)
+    lower = [-20] * 12
+    upper = [25] * 5 + [40] * 3 + [25] * 4
+    result = seasonal_range_check(s, lower_bounds=lower, upper_bounds=upper)
+    assert result == Result(
+        function='seasonal_range_check',
+        passed=False,
+        msg='out of allowed range by month',
+        data=[[1642248000000, 30.0, True]],
+    )
+    # in local time the last value is in January
+    s.index = idx.tz_convert('Europe/Berlin')
+    upper[0] = 5
+    flags = _seasonal_range_flags(s, lower_bounds=lower, upper_bounds=upper)
+    assert flags.tolist() == [True, False, True]
+
+
+def test_seasonal_range_check_by_hour_and_day_of_year():
+    idx = pd.date_range('2024-12-31', periods=48, freq='1h', tz='UTC')
+    s = pd.Series(np.arange(48.0), index=idx)
+    flags = _seasonal_range_flags(
+        s,
+        lower_bounds=[0] * 24,
+        upper_bounds=[100] * 23 + [22],
+        period='hour',
+    )
+    assert s[flags].tolist() == [23.0, 47.0]
+    flags = _seasonal_range_flags(
+        s,
+        lower_bounds=[24] + [0] * 365,
+        upper_bounds=[100] * 365 + [23],
+        period='dayofyear',
+    )
+    assert flags.sum() == 0
+    assert seasonal_range_check(
+        s,
+        lower_bounds=[0] * 24,
+        upper_bounds=[47] * 24,
+        period='hour',
+    ) == Result(function='seasonal_range_check', passed=True)
+
+
+def test_seasonal_range_check_invalid_table():
+    idx = pd.date_range('2022-01-01', periods=3, freq='1h', tz='UTC')
+    s = pd.Series([1.0, 2.0, 3.0], index=idx)
+    with pytest.raises(ValueError) as exc_info:
+        seasonal_range_check(s, lower_bounds=[0] * 12, upper_bounds=[10] * 24)
+    msg, = exc_info.value.args
+    assert msg == 'a bounds table by month must have 12 values, not 24'
+
+
+def test_seasonal_range_check_not_registered_by_default():
+    for checks in get_plugin_args().values():
+        assert 'seasonal_range_check' not in checks
+
+
+def test_apply_qc_data_format_intervals(data):
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    column_mapping['pressure'].add_group('pressure')
+    column_mapping['pressure_persistent'].add_group('pressure')
+    expected = apply_qc(data, column_mapping)
+    result = apply_qc(data, column_mapping, data_format='intervals')
+    assert result['passed'] == expected['passed']
+    for column, column_res in result['columns'].items():
+        for name, res in column_res['results'].items():
+            res_rows = expected['columns'][column]['results'][name]
+            assert res.passed == res_rows.passed
+            if name == 'missing_timestamps' or res_rows.data is None:
+                assert res == res_rows
+                continue
+            # every row belongs to one interval starting with it
+            rows = {row[0]: row[1] for row in res_rows.data}
+            assert res.data is not None
+            assert sum(row[2] for row in res.data) == len(rows)
+            for start, end, n, value in res.data:
+                assert rows[start] == value
+                assert end in rows
+                assert n == 1 or end > start
+
+
+def test_flagged_intervals_of_stuck_values():
+    idx = pd.date_range('2022-01-01', periods=36000, freq='1s', tz='UTC')
+    values = np.round(5 + np.sin(np.arange(len(idx)) / 100), 3)
+    s = pd.Series(values, index=idx, dtype=float)
+    # stuck for 6 hours, the values after the first 5 hours are flagged
+    s.iloc[5000:26600] = 2.5
+    s.iloc[30000:30010] = np.nan
+    column_mapping = ColumnMapping()
+    column_mapping['windspeed'].add_group('windspeed')
+    result = apply_qc(
+        s.to_frame('windspeed'),
+        column_mapping,
+        data_format='intervals',
+    )
+    results = result['columns']['windspeed']['results']
+    assert results['persistence_check'].data == [
+        [1641018199000, 1641021799000, 3601, 2.5],
+    ]
+    assert results['null_values'].data == [
+        [1641025200000, 1641025209000, 10, None],
+    ]
+    assert results['range_check'].passed
+
+
+def test_apply_qc_data_format_intervals_mask_of_check_without_flags(data):
+    @register('intervals_without_flags')
+    def temp_range(s):
+        return range_check(s, lower_bound=0, upper_bound=3)
+
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('intervals_without_flags')
+    result = apply_qc(
+        data,
+        column_mapping,
+        outputs=['mask'],
+        data_format='intervals',
+    )
+    expected = apply_qc(data, column_mapping, outputs=['mask'])
+    pd.testing.assert_frame_equal(result['mask'], expected['mask'])
+
+
+def test_apply_qc_unknown_data_format(data):
+    with pytest.raises(ValueError) as exc_info:
+        apply_qc(
+            data,
+            ColumnMapping(),
+            data_format='columns',  # type: ignore[arg-type]
+        )
+    msg, = exc_info.value.args
+    assert msg == "unknown data format: 'columns'"
+
+
+def _restarted_logger_df():
+    idx = pd.date_range('2022-01-01', periods=12, freq='10min', tz='UTC')
+    df = pd.DataFrame(
+        {'temp': np.arange(12, dtype=float), 'count': np.arange(12)},
+        index=idx,
+    )
+    # the logger wrote two rows again after restarting
+    restart = pd.DataFrame(
+        {'temp': [4.5, 6.0], 'count': [40, 50]},
+        index=idx[[4, 5]],
+    )
+    return pd.concat([df, restart])
+
+
+def test_duplicate_timestamps():
+    s = _restarted_logger_df()['temp'].sort_index(kind='stable')
+    result = duplicate_timestamps(s)
+    assert result == Result(
+        function='duplicate_timestamps',
+        passed=False,
+        msg='found 2 duplicated timestamps',
+        data=[
+            [1640997600000, 4.0, True],
+            [1640997600000, 4.5, True],
+            [1640998200000, 5.0, True],
+            [1640998200000, 6.0, True],
+        ],
+    )
+    assert duplicate_timestamps(s[~s.index.duplicated()]).passed
+
+
+@pytest.mark.parametrize(
+    ('duplicates', 'temp', 'count'),
+    (
+        ('first', [4.0, 5.0], [4, 5]),
+        ('last', [4.5, 6.0], [40, 50]),
+        ('mean', [4.25, 5.5], [22, 27.5]),
+        ('flag', [np.nan, np.nan], [np.nan, np.nan]),
+    ),
+)
+def test_apply_qc_resolves_duplicates(duplicates, temp, count):
+    df = _restarted_logger_df()
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    result = apply_qc(
+        df,
+        column_mapping,
+        outputs=['cleaned'],
+        mask_checks=['range_check'],
+        duplicates=duplicates,
+    )
+    assert result['data_freq'] == '10min'
+    results = result['columns']['temp']['results']
+    assert results['duplicate_timestamps'].msg == (
+        'found 2 duplicated timestamps'
+    )
+    duplicates_data = results['duplicate_timestamps'].data
+    assert duplicates_data is not None
+    assert len(duplicates_data) == 4
+    assert results['missing_timestamps'].passed
+    assert results['spike_dip_check'].passed
+    assert results['persistence_check'].passed
+    assert results['null_values'].passed is (duplicates != 'flag')
+
+    cleaned = result['cleaned']
+    assert cleaned.index.is_unique
+    assert len(cleaned) == 12
+    np.testing.assert_array_equal(cleaned['temp'].iloc[4:6], temp)
+    np.testing.assert_array_equal(cleaned['count'].iloc[4:6], count)
+
+
+def test_apply_qc_unknown_duplicates_policy(data):
+    with pytest.raises(ValueError) as exc_info:
+        apply_qc(
+            data,
+            ColumnMapping(),
+            duplicates='drop',  # type: ignore[arg-type]
+        )
+    msg, = exc_info.value.args
+    assert msg == "unknown duplicates policy: 'drop'"
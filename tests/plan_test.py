@@ -0,0 +1,156 @@
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import apply_qc_sharded
+from meteo_qc import ColumnMapping
+from meteo_qc import compile_plan
+from meteo_qc import get_plugin_args
+from meteo_qc import register
+from meteo_qc import Result
+from meteo_qc import summarize_qc
+
+
+@pytest.fixture(scope='module')
+def data():
+    data = pd.read_csv('testing/test_data.csv')
+    data['date'] = pd.to_datetime(data['date'], utc=True)
+    return data.set_index('date')
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    column_mapping['temp'].add_group('dew_point')
+    column_mapping['pressure'].add_group('pressure')
+    return column_mapping
+
+
+CALLS: list[int] = []
+
+
+@register('plan_b', limit=2)
+@register('plan_a', limit=1)
+def counted_check(s, limit):
+    CALLS.append(limit)
+    return Result(function=counted_check.__name__, passed=True, msg=str(limit))
+
+
+def test_apply_qc_with_plan_is_equal(data, column_mapping):
+    expected = apply_qc(data, column_mapping)
+    result = apply_qc(data, compile_plan(column_mapping))
+    assert result == expected
+    for column, column_res in expected['columns'].items():
+        assert list(result['columns'][column]['results']) == list(
+            column_res['results'],
+        )
+
+
+BUILTINS = (
+    'missing_timestamps', 'null_values', 'range_check', 'spike_dip_check',
+    'persistence_check',
+)
+
+
+def test_plan_checks_are_ordered_by_cost(column_mapping):
+    column_plan = compile_plan(column_mapping).for_column('temp')
+    # other tests may register checks for the generic group
+    assert [c.name for c in column_plan.checks if c.name in BUILTINS] == [
+        'null_values', 'range_check', 'missing_timestamps',
+        'spike_dip_check', 'persistence_check',
+    ]
+    costs = [c.cost for c in column_plan.checks]
+    assert costs == sorted(costs)
+    assert tuple(n for n in column_plan.result_order if n in BUILTINS) == (
+        BUILTINS
+    )
+
+
+def test_plan_check_registered_for_multiple_groups_is_applied_once(data):
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('plan_a')
+    column_mapping['temp'].add_group('plan_b')
+    plan = compile_plan(column_mapping)
+    CALLS.clear()
+    result = apply_qc(data[['temp']], plan)
+    # the arguments of the last group are used, like without a plan
+    assert CALLS == [2]
+    assert result == apply_qc(data[['temp']], column_mapping)
+    assert result['columns']['temp']['results']['counted_check'].msg == '2'
+
+
+def test_plan_default_for_unmapped_columns(column_mapping):
+    plan = compile_plan(column_mapping)
+    assert 'other' not in plan.columns
+    names = [c.name for c in plan.for_column('other').checks]
+    assert [n for n in names if n in BUILTINS] == [
+        'null_values', 'missing_timestamps',
+    ]
+
+
+def test_plan_plugin_args(data, column_mapping):
+    plan = compile_plan(
+        column_mapping,
+        plugin_args={'dew_point': {'range_check': {'upper_bound': 0}}},
+    )
+    range_check, = (
+        c for c in plan.for_column('temp').checks if c.name == 'range_check'
+    )
+    assert range_check.kwargs == {'lower_bound': -60, 'upper_bound': 0}
+    # the registered arguments are not changed
+    assert get_plugin_args()['dew_point']['range_check']['upper_bound'] == 50
+    result = apply_qc(data, plan)
+    msg = result['columns']['temp']['results']['range_check'].msg
+    assert msg == 'out of allowed range of [-60 - 0]'
+
+
+def test_plan_is_immutable(column_mapping):
+    plan = compile_plan(column_mapping)
+    check, = (
+        c for c in plan.for_column('pressure').checks
+        if c.name == 'range_check'
+    )
+    with pytest.raises(TypeError):
+        check.kwargs['lower_bound'] = 0  # type: ignore[index]
+    with pytest.raises(TypeError):
+        plan.columns['temp'] = plan.default  # type: ignore[index]
+
+
+def test_plan_is_not_changed_by_plugin_args(column_mapping):
+    plan = compile_plan(column_mapping)
+    plugin_args = get_plugin_args()
+    plugin_args['pressure']['range_check']['lower_bound'] = 0
+    try:
+        check, = (
+            c for c in plan.for_column('pressure').checks
+            if c.name == 'range_check'
+        )
+        assert check.kwargs['lower_bound'] == 860
+    finally:
+        plugin_args['pressure']['range_check']['lower_bound'] = 860
+
+
+@pytest.mark.parametrize(
+    ('plugin_args', 'msg'),
+    (
+        ({'nope': {}}, "unregistered group: 'nope'"),
+        (
+            {'pressure': {'nope': {}}},
+            "unregistered check for group 'pressure': 'nope'",
+        ),
+    ),
+)
+def test_plan_invalid_plugin_args(column_mapping, plugin_args, msg):
+    with pytest.raises(KeyError) as exc_info:
+        compile_plan(column_mapping, plugin_args=plugin_args)
+
+    assert exc_info.value.args == (msg,)
+
+
+def test_summarize_qc_and_apply_qc_sharded_with_plan(data, column_mapping):
+    plan = compile_plan(column_mapping)
+    summary = summarize_qc(data, plan)
+    assert summary['day'].equals(summarize_qc(data, column_mapping)['day'])
+    result = apply_qc_sharded(data, plan, shards=2, max_workers=2)
+    assert result == apply_qc(data, column_mapping)
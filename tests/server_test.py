@@ -0,0 +1,235 @@
+import http.client
+import io
+import json
+import os
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pyarrow
+import pytest
+
+from meteo_qc._cli import main
+from meteo_qc._server import _Job
+from meteo_qc._server import QCServer
+
+MAPPING = json.dumps({'temp': ['temperature']})
+
+
+@pytest.fixture(scope='module')
+def csv_data():
+    with open('testing/test_data.csv', 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def server():
+    with QCServer(('127.0.0.1', 0), jobs=1, max_pending=2) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def _request(server, path, data=None, headers=None):
+    host, port = server.server_address
+    req = urllib.request.Request(
+        f'http://{host}:{port}{path}',
+        data=data,
+        headers=headers or {},
+    )
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def _post_qc(server, data, path='/qc', mapping=MAPPING, **headers):
+    if mapping is not None:
+        headers['X-Column-Mapping'] = mapping
+    return _request(server, path, data=data, headers=headers)
+
+
+def _job(data):
+    return _Job(data=data, fmt='csv', mapping=None, index_col=None, tz='UTC')
+
+
+def test_health(server):
+    assert _request(server, '/health') == (200, {'status': 'ok'})
+
+
+def test_not_found(server):
+    status, body = _request(server, '/nope')
+    assert status == 404
+    assert body == {'error': 'not found: /nope'}
+    status, _ = _post_qc(server, b'', path='/nope')
+    assert status == 404
+
+
+def test_qc_csv(server, csv_data):
+    status, body = _post_qc(server, csv_data)
+    assert status == 200
+    assert body['rows'] == 42
+    assert body['passed'] is False
+    assert body['seconds'] > 0
+    columns = body['result']['columns']
+    assert 'range_check' in columns['temp']['results']
+    assert 'range_check' not in columns['pressure']['results']
+
+
+def test_qc_without_column_mapping_autodetects(server, csv_data):
+    status, body = _post_qc(server, csv_data, mapping=None)
+    assert status == 200
+    results = body['result']['columns']['pressure']['results']
+    assert 'range_check' in results
+
+
+def _to_arrow(df, stream):
+    table = pyarrow.Table.from_pandas(df)
+    sink = io.BytesIO()
+    if stream:
+        writer = pyarrow.ipc.new_stream(sink, table.schema)
+    else:
+        writer = pyarrow.ipc.new_file(sink, table.schema)
+    with writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+@pytest.mark.parametrize(
+    ('content_type', 'to_bytes'),
+    (
+        (
+            'application/vnd.apache.parquet',
+            lambda df: df.to_parquet(),
+        ),
+        (
+            'application/vnd.apache.arrow.file',
+            lambda df: _to_arrow(df, stream=False),
+        ),
+        (
+            'application/vnd.apache.arrow.stream',
+            lambda df: _to_arrow(df, stream=True),
+        ),
+    ),
+)
+def test_qc_binary_formats(server, csv_data, content_type, to_bytes):
+    df = pd.read_csv(io.BytesIO(csv_data), parse_dates=['date'])
+    status, body = _post_qc(
+        server,
+        to_bytes(df),
+        **{'Content-Type': content_type},
+    )
+    assert status == 200
+    _, expected = _post_qc(server, csv_data)
+    assert body['result'] == expected['result']
+
+
+@pytest.mark.parametrize(
+    ('path', 'data', 'mapping', 'msg'),
+    (
+        ('/qc?format=xlsx', b'', MAPPING, "unknown format: 'xlsx'"),
+        ('/qc', b'', '{"temp": "temperature"}', 'must map column names'),
+        ('/qc', b'', '{"temp": ["nope"]}', "unregistered group: 'nope'"),
+        ('/qc', b'date,temp\nfoo,1\n', MAPPING, 'DateParseError'),
+    ),
+)
+def test_qc_bad_request(server, path, data, mapping, msg):
+    status, body = _post_qc(server, data, path=path, mapping=mapping)
+    assert status == 400
+    assert msg in body['error']
+
+
+def test_qc_body_too_large(csv_data):
+    with QCServer(('127.0.0.1', 0), max_body_size=10) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        status, body = _post_qc(server, csv_data)
+        server.shutdown()
+        thread.join()
+    assert status == 413
+    assert body == {'error': 'the body exceeds 10 bytes'}
+
+
+@pytest.mark.parametrize('length', ('abc', '-1'))
+def test_qc_invalid_content_length(server, length):
+    host, port = server.server_address
+    conn = http.client.HTTPConnection(host, port)
+    try:
+        conn.putrequest('POST', '/qc')
+        conn.putheader('Content-Length', length)
+        conn.endheaders()
+        resp = conn.getresponse()
+        assert resp.status == 400
+        assert json.load(resp) == {
+            'error': f'invalid Content-Length: {length!r}',
+        }
+    finally:
+        conn.close()
+
+
+def test_workers_are_restarted_after_a_worker_died(server, csv_data):
+    for pid in list(server._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+    # the request in flight when the pool breaks may fail, later ones don't
+    statuses = [_post_qc(server, csv_data)[0] for _ in range(3)]
+    assert statuses[-1] == 200
+    assert set(statuses) <= {200, 500}
+
+
+def test_requests_are_batched_and_rejected_when_busy(server, csv_data):
+    # keep the only worker busy, so the dispatcher waits after the first job
+    blocker = server._executor.submit(time.sleep, 1)
+    first = server.submit(_job(csv_data))
+    while server.pending:
+        time.sleep(0.01)
+
+    futures = [server.submit(_job(csv_data)) for _ in range(2)]
+    assert server.pending == 2
+    status, body = _post_qc(server, csv_data)
+    assert status == 503
+    assert body == {'error': 'too many pending requests'}
+
+    blocker.result()
+    assert [f.result()[0] for f in (first, *futures)] == [200, 200, 200]
+    metrics = server.metrics.snapshot()
+    assert metrics['batches'] == 2
+    assert metrics['mean_batch_size'] == 1.5
+    assert metrics['rejected'] == 1
+
+
+def test_metrics(server, csv_data):
+    status, metrics = _request(server, '/metrics')
+    assert status == 200
+    assert metrics['requests'] == 0
+    assert metrics['latency_seconds']['p50'] is None
+
+    _post_qc(server, csv_data)
+    _post_qc(server, b'date,temp\nfoo,1\n')
+    status, metrics = _request(server, '/metrics')
+    assert metrics['requests'] == 2
+    assert metrics['errors'] == 1
+    assert metrics['rows'] == 42
+    assert metrics['pending'] == 0
+    assert metrics['rows_per_second'] > 0
+    latency = metrics['latency_seconds']
+    assert 0 < latency['p50'] <= latency['p99'] <= latency['max']
+
+
+def test_main_serve(monkeypatch):
+    calls = []
+    monkeypatch.setattr('meteo_qc._cli.serve', lambda **kw: calls.append(kw))
+    assert main(['serve', '--port', '0', '-j2', '--max-pending', '3']) == 0
+    assert calls == [{
+        'host': '127.0.0.1',
+        'port': 0,
+        'jobs': 2,
+        'batch_size': 8,
+        'max_pending': 3,
+        'plugin_args': [],
+    }]
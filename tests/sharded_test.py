@@ -0,0 +1,181 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import apply_qc_sharded
+from meteo_qc import ColumnMapping
+from meteo_qc import missing_timestamps
+from meteo_qc import register
+from meteo_qc import spike_dip_check
+
+
+def _random_df(seed, freq='10min', periods=2000, tz='UTC'):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2022-01-01', periods=periods, freq=freq, tz=tz)
+    # drop single timestamps and a long outage
+    keep = rng.random(periods) > 0.05
+    keep[0] = keep[-1] = True
+    keep[700:760] = False
+    idx = idx[keep]
+    temp = np.round(10 + np.cumsum(rng.normal(0, 0.2, len(idx))), 1)
+    # stuck values
+    temp[100:130] = temp[100]
+    temp[1000:1020] = temp[1000]
+    temp[rng.random(len(idx)) > 0.97] = np.nan
+    temp[temp > 15] = 60
+    pressure = np.round(1013 + rng.normal(0, 0.5, len(idx)), 1)
+    pressure[400:460] = 1013.0
+    pressure[800:900] = np.nan
+    return pd.DataFrame(
+        data={'temp': temp, 'pressure': pressure, 'other': temp * 2},
+        index=idx,
+    )
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    column_mapping['temp'].add_group('dew_point')
+    column_mapping['pressure'].add_group('pressure')
+    return column_mapping
+
+
+def _assert_results_equal(result, expected):
+    assert dict(result['columns']) == dict(expected['columns'])
+    assert {k: v for k, v in result.items() if k != 'columns'} == {
+        k: v for k, v in expected.items() if k != 'columns'
+    }
+
+
+@pytest.mark.parametrize('seed', (0, 1, 2))
+@pytest.mark.parametrize('shards', (2, 5, 13))
+def test_apply_qc_sharded_identical_to_apply_qc(seed, shards, column_mapping):
+    df = _random_df(seed)
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(df, column_mapping, shards=shards, max_workers=2)
+    _assert_results_equal(result, expected)
+    assert list(result['columns']['temp']['results']) == list(
+        expected['columns']['temp']['results'],
+    )
+
+
+def test_apply_qc_sharded_unaligned_timestamps(column_mapping):
+    df = _random_df(3)
+    # shift some timestamps off the full index
+    idx = df.index.to_series()
+    idx.iloc[[50, 550, 1200]] += pd.Timedelta(minutes=3)
+    df.index = pd.DatetimeIndex(idx)
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(df, column_mapping, shards=4, max_workers=2)
+    _assert_results_equal(result, expected)
+
+
+def test_apply_qc_sharded_per_row_missing_timestamps(column_mapping):
+    register('sharded_per_row', per_row=True)(missing_timestamps)
+    column_mapping['temp'].add_group('sharded_per_row')
+    df = _random_df(4)
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(df, column_mapping, shards=3, max_workers=2)
+    _assert_results_equal(result, expected)
+
+
+def test_apply_qc_sharded_too_short_for_shards(column_mapping):
+    df = _random_df(5).iloc[:30]
+    expected = apply_qc(df, column_mapping)
+    # the persistence window of 6 hours does not allow to split 5 hours
+    result = apply_qc_sharded(df, column_mapping, shards=4, max_workers=2)
+    _assert_results_equal(result, expected)
+
+
+def test_apply_qc_sharded_custom_check_is_applied(column_mapping):
+    @register('sharded_custom', window=timedelta(hours=1))
+    def custom_check(s, window):
+        from meteo_qc import persistence_check
+        return persistence_check(s, window=window)
+
+    column_mapping['temp'].add_group('sharded_custom')
+    df = _random_df(6)
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(df, column_mapping, shards=3, max_workers=2)
+    _assert_results_equal(result, expected)
+    assert 'custom_check' in result['columns']['temp']['results']
+
+
+def test_apply_qc_sharded_spike_dip_check_max_gap(column_mapping):
+    register(
+        'sharded_spike_gap',
+        delta=0.1,
+        max_gap=timedelta(hours=2),
+    )(spike_dip_check)
+    column_mapping['other'].add_group('sharded_spike_gap')
+    df = _random_df(8)
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(df, column_mapping, shards=7, max_workers=2)
+    _assert_results_equal(result, expected)
+    assert not result['columns']['other']['results']['spike_dip_check'].passed
+
+
+def test_apply_qc_sharded_no_missing_timestamps(column_mapping):
+    idx = pd.date_range('2022-01-01', periods=3000, freq='1min', tz='UTC')
+    df = pd.DataFrame({'temp': np.linspace(10, 20, 3000)}, index=idx)
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(df, column_mapping, shards=3, max_workers=2)
+    _assert_results_equal(result, expected)
+    assert result['columns']['temp']['results']['missing_timestamps'].passed
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last', 'mean', 'flag'))
+@pytest.mark.parametrize('freq_method', ('min', 'mode'))
+def test_apply_qc_sharded_duplicates(duplicates, freq_method, column_mapping):
+    df = _random_df(9)
+    # the logger wrote some rows again
+    df = pd.concat([df, df.iloc[[10, 11, 1500]] + 1])
+    expected = apply_qc(
+        df,
+        column_mapping,
+        freq_method=freq_method,
+        duplicates=duplicates,
+    )
+    result = apply_qc_sharded(
+        df,
+        column_mapping,
+        shards=3,
+        max_workers=2,
+        freq_method=freq_method,
+        duplicates=duplicates,
+    )
+    _assert_results_equal(result, expected)
+    results = result['columns']['temp']['results']
+    assert not results['duplicate_timestamps'].passed
+
+
+@pytest.mark.parametrize('transport', ('pickle', 'shared_memory'))
+def test_apply_qc_sharded_transport(transport, column_mapping):
+    df = _random_df(7)
+    expected = apply_qc(df, column_mapping)
+    result = apply_qc_sharded(
+        df,
+        column_mapping,
+        shards=3,
+        max_workers=2,
+        transport=transport,
+    )
+    _assert_results_equal(result, expected)
+
+
+def test_apply_qc_sharded_unknown_transport(column_mapping):
+    with pytest.raises(ValueError) as exc_info:
+        apply_qc_sharded(
+            _random_df(8),
+            column_mapping,
+            transport='mpi',  # type: ignore[arg-type]
+        )
+
+    msg, = exc_info.value.args
+    assert msg == "unknown transport: 'mpi'"
@@ -0,0 +1,84 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc._shm import attach_frame
+from meteo_qc._shm import detach
+from meteo_qc._shm import SharedFrame
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        data={
+            'temp': [10.5, np.nan, 11.0, 12.0],
+            'count': [1, 2, 3, 4],
+            'station': ['a', 'b', 'c', 'd'],
+        },
+        index=pd.date_range(
+            '2022-01-01',
+            periods=4,
+            freq='10min',
+            tz='Europe/Berlin',
+            name='date',
+        ),
+    )
+
+
+def test_shared_frame_round_trip(df):
+    with SharedFrame(df) as shared:
+        with attach_frame(shared.spec) as shared_df:
+            pd.testing.assert_frame_equal(shared_df, df)
+            assert isinstance(shared_df.index, pd.DatetimeIndex)
+            assert isinstance(df.index, pd.DatetimeIndex)
+            assert shared_df.index.freq == df.index.freq
+            del shared_df
+
+
+def test_shared_frame_columns_are_read_only_views(df):
+    with SharedFrame(df, columns=['temp']) as shared:
+        with attach_frame(shared.spec) as shared_df:
+            assert list(shared_df.columns) == ['temp']
+            assert not shared_df['temp'].to_numpy().flags.writeable
+            # writing to the block is visible in the rebuilt DataFrame
+            block = shared_memory.SharedMemory(
+                name=shared.spec.columns[0][1].name,
+            )
+            block_values = np.ndarray((4,), dtype=float, buffer=block.buf)
+            block_values[0] = 42
+            assert shared_df['temp'].iloc[0] == 42
+            del block_values, shared_df
+            block.close()
+
+
+def test_shared_frame_not_shareable_column_is_sent_along(df):
+    with SharedFrame(df, columns=['station']) as shared:
+        _, block_spec = shared.spec.columns[0]
+        assert block_spec.name is None
+        with attach_frame(shared.spec) as shared_df:
+            assert shared_df['station'].tolist() == ['a', 'b', 'c', 'd']
+            del shared_df
+
+
+def test_shared_frame_blocks_are_freed_on_close(df):
+    with SharedFrame(df) as shared:
+        name = shared.spec.index_block.name
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_detach_copies_data_and_index(df):
+    with SharedFrame(df, columns=['temp']) as shared:
+        with attach_frame(shared.spec) as shared_df:
+            s = detach(shared_df['temp'])
+            assert s is not None
+            assert not np.shares_memory(
+                s.to_numpy(),
+                shared_df['temp'].to_numpy(),
+            )
+            del shared_df
+
+    pd.testing.assert_series_equal(s, df['temp'])
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import buddy_check
+from meteo_qc import StationIndex
+from meteo_qc._spatial import _buddy_flags
+
+
+def _network(n_stations, seed=0):
+    rng = np.random.default_rng(seed)
+    coords = pd.DataFrame(
+        {
+            'lat': 51 + rng.random(n_stations),
+            'lon': 7 + rng.random(n_stations) * 1.5,
+            'elevation': rng.random(n_stations) * 500,
+        },
+        index=[f'station_{i}' for i in range(n_stations)],
+    )
+    idx = pd.date_range('2022-01-01', periods=48, freq='1h', tz='UTC')
+    weather = 10 + 5 * np.sin(np.arange(len(idx)) / 24 * 2 * np.pi)
+    temp = (
+        weather[:, None] -
+        0.0065 * coords['elevation'].to_numpy() +
+        rng.normal(0, 0.2, (len(idx), n_stations))
+    )
+    return coords, pd.DataFrame(temp, index=idx, columns=coords.index)
+
+
+def test_station_index_neighbours():
+    coords = pd.DataFrame(
+        {'lat': [51.0, 51.0, 51.0, 60.0], 'lon': [7.0, 7.1, 7.3, 7.0]},
+        index=['a', 'b', 'c', 'far'],
+    )
+    stations = StationIndex(coords, radius=50, max_neighbours=8)
+    assert stations.neighbours('a').tolist() == ['b', 'c']
+    assert stations.neighbours('c').tolist() == ['b', 'a']
+    assert stations.neighbours('far').tolist() == []
+    assert repr(stations) == 'StationIndex(n_stations=4)'
+
+
+def test_station_index_same_coordinates():
+    coords = pd.DataFrame(
+        {'lat': [51.0, 51.0, 51.0], 'lon': [7.0, 7.0, 7.0]},
+        index=['a', 'b', 'c'],
+    )
+    stations = StationIndex(coords, max_neighbours=1)
+    for station in ('a', 'b', 'c'):
+        neighbours = stations.neighbours(station).tolist()
+        assert len(neighbours) == 1
+        assert station not in neighbours
+
+
+def test_station_index_unique():
+    coords = pd.DataFrame({'lat': [51.0, 51.0], 'lon': [7.0, 7.1]}, ['a', 'a'])
+    with pytest.raises(ValueError) as exc_info:
+        StationIndex(coords)
+    msg, = exc_info.value.args
+    assert msg == 'the station identifiers must be unique'
+
+
+def test_buddy_check_faulty_sensor():
+    coords, temp = _network(200)
+    temp.iloc[10:14, 5] += 4
+    # a large real change affecting all stations passes
+    temp.iloc[30:] -= 8
+    stations = StationIndex(coords, radius=30)
+    results = buddy_check(temp, stations, lapse_rate=0.0065)
+    failed = [station for station, res in results.items() if not res.passed]
+    assert failed == ['station_5']
+    result = results['station_5']
+    assert result.function == 'buddy_check'
+    assert result.msg == (
+        'deviates from the neighbouring stations by more than 3 times their '
+        'spread'
+    )
+    assert result.data is not None
+    assert [row[0] for row in result.data] == [
+        int(ts.timestamp() * 1000) for ts in temp.index[10:14]
+    ]
+
+
+def test_buddy_check_elevation_without_lapse_rate():
+    coords, temp = _network(200)
+    stations = StationIndex(coords, radius=30)
+    results = buddy_check(temp, stations, min_spread=0.5)
+    # the highest and lowest stations differ from their neighbours
+    assert not all(res.passed for res in results.values())
+
+
+def test_buddy_check_min_neighbours():
+    coords, temp = _network(5)
+    temp.iloc[10, 0] += 10
+    stations = StationIndex(coords, radius=500)
+    results = buddy_check(temp, stations, min_neighbours=5)
+    assert all(res.passed for res in results.values())
+    results = buddy_check(temp, stations, min_neighbours=4, lapse_rate=0.0065)
+    assert not results['station_0'].passed
+
+
+def test_buddy_check_missing_values():
+    coords, temp = _network(50)
+    temp.iloc[:, 1:] = np.nan
+    stations = StationIndex(coords, radius=100)
+    results = buddy_check(temp, stations)
+    assert all(res.passed for res in results.values())
+
+
+def test_buddy_check_unknown_station():
+    coords, temp = _network(10)
+    stations = StationIndex(coords.iloc[1:])
+    with pytest.raises(KeyError) as exc_info:
+        buddy_check(temp, stations)
+    msg, = exc_info.value.args
+    assert msg == "stations missing in the station index: ['station_0']"
+
+
+def test_buddy_flags_in_chunks(monkeypatch):
+    coords, temp = _network(100)
+    temp.iloc[::7, ::3] += 3
+    stations = StationIndex(coords, radius=30)
+    args = (temp, stations, 3, 1, 3, 0.0065)
+    expected = _buddy_flags(*args)
+    monkeypatch.setattr('meteo_qc._spatial._CHUNK_SIZE', 1000)
+    pd.testing.assert_frame_equal(_buddy_flags(*args), expected)
+    assert expected.to_numpy().any()
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last'))
+def test_buddy_check_duplicated_timestamps(duplicates):
+    coords, temp = _network(20)
+    stations = StationIndex(coords, radius=500)
+    restart = temp.iloc[10:12].copy()
+    restart.iloc[:, 0] += 10
+    results = buddy_check(
+        pd.concat([temp, restart]),
+        stations,
+        lapse_rate=0.0065,
+        duplicates=duplicates,
+    )
+    if duplicates == 'first':
+        assert all(res.passed for res in results.values())
+    else:
+        result = results['station_0']
+        assert result.data is not None
+        assert [row[0] for row in result.data] == [
+            int(ts.timestamp() * 1000) for ts in temp.index[10:12]
+        ]
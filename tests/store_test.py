@@ -0,0 +1,141 @@
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import ColumnMapping
+from meteo_qc import Result
+from meteo_qc import ResultStore
+from meteo_qc._store import _flag_intervals
+
+
+@pytest.fixture
+def data():
+    data = pd.read_csv('testing/test_data.csv')
+    data['date'] = pd.to_datetime(data['date'], utc=True)
+    return data.set_index('date')
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('pressure')
+    column_mapping['pressure_persistent'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    return column_mapping
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / 'qc.sqlite')) as store:
+        yield store
+
+
+@pytest.mark.parametrize(
+    ('data', 'expected'),
+    (
+        pytest.param(None, [], id='no data'),
+        pytest.param(
+            [[0, 1.0, True], [600000, 1.0, True], [1800000, None, True]],
+            [(0, 600000, 2), (1800000, 1800000, 1)],
+            id='values',
+        ),
+        pytest.param(
+            [[600000, 1200000, 2], [3000000, 3000000, 1]],
+            [(600000, 1200000, 2), (3000000, 3000000, 1)],
+            id='gaps',
+        ),
+        pytest.param(
+            [[0, 600000, 2, 1.0], [1800000, 1800000, 1, None]],
+            [(0, 600000, 2), (1800000, 1800000, 1)],
+            id='intervals',
+        ),
+        pytest.param([['a', 'b']], None, id='unknown'),
+    ),
+)
+def test_flag_intervals(data, expected):
+    result = Result('check', passed=False, data=data)
+    assert _flag_intervals(result, step_ms=600000) == expected
+
+
+def test_query_flags_matches_result(store, data, column_mapping):
+    final_res = apply_qc(data, column_mapping)
+    store.write('station_1', final_res)
+    flags = store.query_flags(
+        station='station_1',
+        column='pressure_persistent',
+        check='persistence_check',
+    )
+    rows = final_res['columns']['pressure_persistent']['results'][
+        'persistence_check'
+    ].data
+    assert rows is not None
+    assert flags['n'].sum() == len(rows)
+    first = pd.Timestamp(rows[0][0], unit='ms', tz='UTC')
+    last = pd.Timestamp(rows[-1][0], unit='ms', tz='UTC')
+    assert flags['start'].iloc[0] == first
+    assert flags['end'].iloc[-1] == last
+    assert list(flags.columns) == [
+        'station', 'column', 'check', 'start', 'end', 'n',
+    ]
+
+
+def test_failed_stations(store, data, column_mapping):
+    store.write('station_1', apply_qc(data, column_mapping))
+    clean = data.copy()
+    clean['pressure_persistent'] = clean['pressure_reduced']
+    store.write('station_2', apply_qc(clean, column_mapping))
+    assert store.stations() == ['station_1', 'station_2']
+
+    failed = store.failed_stations(
+        'persistence_check',
+        column='pressure_persistent',
+    )
+    assert failed == ['station_1']
+    start, end = data.index[0], data.index[-1]
+    assert store.failed_stations(
+        'persistence_check',
+        start=start,
+        end=end,
+    ) == ['station_1']
+    # outside of the period with data
+    assert store.failed_stations(
+        'persistence_check',
+        start=end + pd.Timedelta(days=1),
+    ) == []
+    # naive timestamps are in UTC
+    assert store.failed_stations(
+        'persistence_check',
+        end=start.tz_localize(None) - pd.Timedelta(days=1),
+    ) == []
+
+
+def test_failed_stations_result_without_flags(store, data):
+    final_res = apply_qc(data, ColumnMapping())
+    final_res['columns']['temp']['results']['custom'] = Result(
+        'custom',
+        passed=False,
+        msg='failed',
+        data=[['a']],  # type: ignore[list-item]
+    )
+    store.write('station_1', final_res)
+    assert store.failed_stations('custom') == ['station_1']
+    assert store.failed_stations('custom', start='2100-01-01') == []
+    assert store.query_flags(check='custom').empty
+
+
+def test_write_replaces_results_of_same_period(store, data, column_mapping):
+    store.write('station_1', apply_qc(data, column_mapping))
+    clean = data.copy()
+    clean['pressure_persistent'] = clean['pressure_reduced']
+    store.write('station_1', apply_qc(clean, column_mapping))
+    assert store.failed_stations('persistence_check') == []
+    assert store.query_flags(column='pressure_persistent').shape[0] > 0
+
+
+def test_store_persists(tmp_path, data, column_mapping):
+    path = str(tmp_path / 'qc.sqlite')
+    with ResultStore(path) as store:
+        store.write('station_1', apply_qc(data, column_mapping))
+        expected = store.query_flags()
+    with ResultStore(path) as store:
+        pd.testing.assert_frame_equal(store.query_flags(), expected)
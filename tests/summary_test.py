@@ -0,0 +1,188 @@
+import pandas as pd
+import pytest
+
+from meteo_qc import apply_qc
+from meteo_qc import ColumnMapping
+from meteo_qc import range_check
+from meteo_qc import register
+from meteo_qc import register_flags
+from meteo_qc import Result
+from meteo_qc import summarize_qc
+
+
+@pytest.fixture
+def data():
+    data = pd.read_csv('testing/test_data.csv')
+    data['date'] = pd.to_datetime(data['date'], utc=True)
+    return data.set_index('date')
+
+
+@pytest.fixture
+def column_mapping():
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('pressure')
+    column_mapping['pressure_persistent'].add_group('pressure')
+    column_mapping['temp'].add_group('temperature')
+    return column_mapping
+
+
+def test_summarize_qc_counts_match_apply_qc(data, column_mapping):
+    summary = summarize_qc(data, column_mapping)
+    results = apply_qc(data, column_mapping)['columns']
+    totals = summary['hour'].groupby(level='column').sum()
+    for column in ('pressure_reduced', 'pressure_persistent', 'temp'):
+        for check in ('range_check', 'null_values', 'persistence_check'):
+            data = results[column]['results'][check].data or []
+            assert totals.loc[column, check] == len(data)
+
+    assert totals.loc['temp', 'n_values'] == 42
+    assert totals.loc['temp', 'missing_timestamps'] == 1
+
+
+def test_summarize_qc_hourly_counts(data, column_mapping):
+    hourly = summarize_qc(data, column_mapping)['hour'].loc['pressure_reduced']
+    assert hourly.index[0] == pd.Timestamp('2022-01-01 10:00', tz='UTC')
+    # 10:40 is missing
+    assert hourly['n_values'].iloc[0] == 5
+    assert hourly['missing_timestamps'].iloc[0] == 1
+    assert hourly['range_check'].iloc[0] == 2
+    assert hourly['null_values'].iloc[0] == 1
+    assert hourly['n_values'].sum() == 42
+
+
+def test_summarize_qc_pyramid_levels(data, column_mapping):
+    summary = summarize_qc(data, column_mapping)
+    daily = summary['day']
+    monthly = summary['month']
+    assert daily.index.get_level_values('time').unique().tolist() == [
+        pd.Timestamp('2022-01-01', tz='UTC'),
+    ]
+    assert monthly.index.get_level_values('time').unique().tolist() == [
+        pd.Timestamp('2022-01-01', tz='UTC'),
+    ]
+    hourly_totals = summary['hour'].groupby(level='column').sum()
+    pd.testing.assert_frame_equal(
+        daily.droplevel('time'),
+        hourly_totals,
+        check_names=False,
+    )
+    pd.testing.assert_frame_equal(daily, monthly)
+
+
+def test_summarize_qc_merge(column_mapping):
+    idx = pd.date_range(
+        start='2022-01-31 22:00',
+        end='2022-02-01 02:00',
+        freq='10min',
+        tz='UTC',
+        inclusive='left',
+    )
+    df = pd.DataFrame(
+        data={'temp': [10.0] * 12 + [100.0] * 12},
+        index=idx,
+    )
+    first = summarize_qc(df.iloc[:18], column_mapping)
+    second = summarize_qc(df.iloc[18:], column_mapping)
+    merged = first.merge(second)
+    full = summarize_qc(df, column_mapping)
+    for resolution in ('hour', 'day', 'month'):
+        pd.testing.assert_frame_equal(
+            merged[resolution][['n_values', 'range_check']],
+            full[resolution][['n_values', 'range_check']],
+        )
+    monthly = merged['month'].loc['temp']
+    assert monthly['n_values'].tolist() == [12, 12]
+    assert monthly['range_check'].tolist() == [0, 12]
+
+
+def test_summarize_qc_check_without_flags_uses_result_data(data):
+    @register('summary_custom')
+    def negative(s):
+        data = [[int(t.timestamp() * 1000), v] for t, v in s[s < 0].items()]
+        return Result(negative.__name__, passed=not data, data=data or None)
+
+    column_mapping = ColumnMapping()
+    column_mapping['negative'].add_group('summary_custom')
+    df = data[['temp']].rename(columns={'temp': 'negative'}) - 2
+    summary = summarize_qc(df, column_mapping)
+    totals = summary['day'].loc['negative']
+    assert totals['negative'].iloc[0] == int((df['negative'] < 0).sum())
+
+
+def test_summarize_qc_check_with_registered_flags(data):
+    def over_1000_flags(s):
+        return s.gt(1000)
+
+    @register('summary_flags')
+    @register_flags(over_1000_flags)
+    def over_1000(s):
+        raise AssertionError('flags must be used')
+
+    column_mapping = ColumnMapping()
+    column_mapping['pressure_reduced'].add_group('summary_flags')
+    summary = summarize_qc(data, column_mapping)
+    totals = summary['day'].loc['pressure_reduced']
+    expected = int((data['pressure_reduced'] > 1000).sum())
+    assert totals['over_1000'].iloc[0] == expected
+
+
+def test_summarize_qc_data_format_intervals(data):
+    @register('summary_intervals')
+    def temp_range(s):
+        # no flags registered, the intervals of range_check are counted
+        return range_check(s, lower_bound=0, upper_bound=3)
+
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('summary_intervals')
+    summary = summarize_qc(data, column_mapping, data_format='intervals')
+    totals = summary['day'].loc['temp']
+    assert totals['temp_range'].iloc[0] == 20
+    pd.testing.assert_frame_equal(
+        summary['hour'],
+        summarize_qc(data, column_mapping)['hour'],
+    )
+
+
+def test_summarize_qc_unknown_data_format(data, column_mapping):
+    with pytest.raises(ValueError) as exc_info:
+        summarize_qc(
+            data,
+            column_mapping,
+            data_format='columns',  # type: ignore[arg-type]
+        )
+    msg, = exc_info.value.args
+    assert msg == "unknown data format: 'columns'"
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last', 'mean', 'flag'))
+@pytest.mark.parametrize('freq_method', ('min', 'mode'))
+def test_summarize_qc_duplicates(
+        data,
+        column_mapping,
+        duplicates,
+        freq_method,
+):
+    # the logger wrote two rows again
+    data = pd.concat([data, data.iloc[[20, 21]] + 1])
+    summary = summarize_qc(
+        data,
+        column_mapping,
+        freq_method=freq_method,
+        duplicates=duplicates,
+    )
+    results = apply_qc(
+        data,
+        column_mapping,
+        freq_method=freq_method,
+        duplicates=duplicates,
+    )['columns']
+    totals = summary['hour'].groupby(level='column').sum()
+    for check in (
+            'duplicate_timestamps', 'range_check', 'null_values',
+            'persistence_check',
+    ):
+        data = results['temp']['results'][check].data or []
+        assert totals.loc['temp', check] == len(data)
+
+    assert totals.loc['temp', 'duplicate_timestamps'] == 4
+    assert totals.loc['temp', 'n_values'] == 42
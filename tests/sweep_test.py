@@ -0,0 +1,251 @@
+import itertools
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo_qc import ColumnMapping
+from meteo_qc import compile_plan
+from meteo_qc import null_values
+from meteo_qc import persistence_check
+from meteo_qc import range_check
+from meteo_qc import spike_dip_check
+from meteo_qc import sweep_qc
+
+
+def _random_df(seed, periods=3000):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2022-01-01', periods=periods, freq='10min', tz='UTC')
+    keep = rng.random(periods) > 0.05
+    keep[:3] = True
+    idx = idx[keep]
+    temp = np.round(10 + np.cumsum(rng.normal(0, 0.3, len(idx))), 1)
+    temp[100:130] = temp[100]
+    temp[500:520] = 0
+    temp[rng.random(len(idx)) > 0.97] = np.nan
+    temp[:2] = np.nan
+    pressure = np.round(1013 + rng.normal(0, 1, len(idx)), 1)
+    pressure[400:460] = np.nan
+    return pd.DataFrame({'temp': temp, 'pressure': pressure}, index=idx)
+
+
+def _expected_counts(df, func, grid):
+    rows = []
+    for values in itertools.product(*grid.values()):
+        kwargs = dict(zip(grid, values))
+        rows.append([
+            len(func(df[column], **kwargs).data or []) for column in df
+        ])
+    return rows
+
+
+@pytest.mark.parametrize('seed', (0, 1))
+@pytest.mark.parametrize(
+    ('func', 'grid'),
+    (
+        pytest.param(
+            range_check,
+            {
+                'lower_bound': [-10, 0, 5, 1013],
+                'upper_bound': [0, 10, 15, 1013.5, 1020],
+            },
+            id='range_check',
+        ),
+        pytest.param(
+            spike_dip_check,
+            {'delta': [0.01, 0.03, 0.05, 0.1, 0.3]},
+            id='spike_dip_check',
+        ),
+        pytest.param(
+            spike_dip_check,
+            {
+                'delta': [0.01, 0.03, 0.1],
+                'max_gap': [None, timedelta(minutes=20), timedelta(hours=2)],
+            },
+            id='spike_dip_check_max_gap',
+        ),
+        pytest.param(
+            persistence_check,
+            {
+                'window': [
+                    timedelta(minutes=10),
+                    timedelta(minutes=25),
+                    timedelta(hours=1),
+                    timedelta(hours=3),
+                    timedelta(days=30),
+                ],
+                'excludes': [[], [0]],
+            },
+            id='persistence_check',
+        ),
+    ),
+)
+def test_sweep_qc_identical_to_check(seed, func, grid):
+    df = _random_df(seed)
+    counts = sweep_qc(df, {func.__name__: grid})[func.__name__]
+    assert counts.to_numpy().tolist() == _expected_counts(df, func, grid)
+    assert counts.index.names == list(grid)
+    assert list(counts.columns) == ['temp', 'pressure']
+
+
+def test_sweep_qc_index():
+    df = _random_df(0)
+    counts = sweep_qc(
+        df,
+        {'persistence_check': {'window': [timedelta(hours=1)]}},
+    )['persistence_check']
+    assert counts.index.tolist() == [timedelta(hours=1)]
+    assert counts.index.name == 'window'
+    grid: dict[str, list[Any]] = {
+        'window': [timedelta(hours=1)],
+        'excludes': [[0]],
+    }
+    counts = sweep_qc(df, {'persistence_check': grid})['persistence_check']
+    assert counts.index.tolist() == [(timedelta(hours=1), (0,))]
+
+
+def test_sweep_qc_index_none():
+    df = _random_df(0)
+    grid = {'max_gap': [None, timedelta(hours=1)]}
+    counts = sweep_qc(
+        df,
+        {'spike_dip_check': {'delta': [0.1], **grid}},
+    )['spike_dip_check']
+    assert isinstance(counts.index, pd.MultiIndex)
+    assert counts.index.levels[1].dtype == object
+    assert counts.index.get_loc((0.1, None)) == 0
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    counts = sweep_qc(
+        df,
+        {'spike_dip_check': grid},
+        column_mapping,
+    )['spike_dip_check']
+    assert counts.index.tolist() == [None, timedelta(hours=1)]
+
+
+def test_sweep_qc_index_none_multiple_arguments():
+    df = _random_df(1)
+    max_gap = [None, timedelta(minutes=20), timedelta(hours=2)]
+    counts = sweep_qc(
+        df,
+        {'spike_dip_check': {'delta': [0.03, 0.1], 'max_gap': max_gap}},
+    )['spike_dip_check']
+    assert isinstance(counts.index, pd.MultiIndex)
+    assert counts.index.levels[1].tolist() == max_gap
+    for delta in (0.03, 0.1):
+        for gap in max_gap:
+            result = spike_dip_check(df['temp'], delta=delta, max_gap=gap)
+            assert counts['temp'][(delta, gap)] == len(result.data or [])
+
+
+def test_sweep_qc_column_mapping():
+    df = _random_df(0)
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    counts = sweep_qc(
+        df,
+        {'range_check': {'lower_bound': [0, 5]}},
+        column_mapping,
+    )['range_check']
+    # the upper bound registered for the temperature is used, the pressure
+    # is not checked by range_check
+    assert list(counts.columns) == ['temp']
+    assert counts['temp'].tolist() == [
+        len(range_check(df['temp'], lower_bound=lb, upper_bound=50).data or [])
+        for lb in (0, 5)
+    ]
+
+
+def test_sweep_qc_plan():
+    df = _random_df(0)
+    column_mapping = ColumnMapping()
+    column_mapping['temp'].add_group('temperature')
+    plan = compile_plan(
+        column_mapping,
+        plugin_args={'temperature': {'range_check': {'upper_bound': 15}}},
+    )
+    counts = sweep_qc(
+        df,
+        {'range_check': {'lower_bound': [0]}},
+        plan,
+    )['range_check']
+    assert counts['temp'].tolist() == [
+        len(range_check(df['temp'], lower_bound=0, upper_bound=15).data or []),
+    ]
+
+
+def test_sweep_qc_unknown_argument():
+    with pytest.raises(ValueError) as exc_info:
+        sweep_qc(_random_df(0), {'range_check': {'lower': [0]}})
+    msg, = exc_info.value.args
+    assert msg == "unknown argument of 'range_check': 'lower'"
+
+
+def test_sweep_qc_missing_argument():
+    with pytest.raises(ValueError) as exc_info:
+        sweep_qc(_random_df(0), {'range_check': {'lower_bound': [0]}})
+    msg, = exc_info.value.args
+    assert msg == (
+        "missing argument of 'range_check': 'upper_bound'. Add it to the "
+        'grid or pass a column mapping of a group the check is registered for'
+    )
+
+
+def test_sweep_qc_other_checks():
+    df = _random_df(0)
+    counts = sweep_qc(df, {'null_values': {}})['null_values']
+    assert counts.to_numpy().tolist() == _expected_counts(df, null_values, {})
+
+
+def test_sweep_qc_unregistered_check():
+    with pytest.raises(KeyError) as exc_info:
+        sweep_qc(_random_df(0), {'nope': {}})
+    msg, = exc_info.value.args
+    assert msg == "unregistered check: 'nope'"
+
+
+def test_sweep_qc_window_too_short():
+    with pytest.raises(ValueError) as exc_info:
+        sweep_qc(
+            _random_df(0),
+            {'persistence_check': {'window': [timedelta(minutes=5)]}},
+        )
+    msg, = exc_info.value.args
+    assert msg == (
+        'the window (0:05:00) must not be shorter than the temporal '
+        'resolution (0 days 00:10:00)'
+    )
+
+
+@pytest.mark.parametrize('duplicates', ('first', 'last', 'mean', 'flag'))
+def test_sweep_qc_duplicated_timestamps(duplicates):
+    df = _random_df(0)
+    # a restart of the logger, writing the values of an hour again
+    restart = df.iloc[200:206] + 0.5
+    df_duplicated = pd.concat([df, restart])
+    grid: dict[str, dict[str, list[Any]]] = {
+        'range_check': {'lower_bound': [-10, 5], 'upper_bound': [1020]},
+        'spike_dip_check': {'delta': [0.03, 0.1]},
+        'persistence_check': {'window': [timedelta(hours=1)]},
+    }
+    counts = sweep_qc(df_duplicated, grid, duplicates=duplicates)
+    resolved = df.copy()
+    if duplicates == 'last':
+        resolved.loc[restart.index] = restart
+    elif duplicates == 'mean':
+        resolved.loc[restart.index] = (df.loc[restart.index] + restart) / 2
+    elif duplicates == 'flag':
+        resolved.loc[restart.index] = np.nan
+    expected = sweep_qc(resolved, grid)
+    for name in grid:
+        pd.testing.assert_frame_equal(counts[name], expected[name])
+
+
+def test_sweep_qc_unknown_duplicates_policy():
+    with pytest.raises(ValueError) as exc_info:
+        sweep_qc(_random_df(0), {}, duplicates='drop')  # type: ignore[arg-type]  # noqa: E501
+    msg, = exc_info.value.args
+    assert msg == "unknown duplicates policy: 'drop'"